@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from typing import Dict, List, Any, Iterable
+
+import gzip
+from enum import Enum
+
+import msgpack
+import numpy as np
+
+from core.knowledgebase.EmbeddingCodec import EmbeddingCodec
+
+
+class EmbeddingsMode(Enum):
+    NONE = "none"
+    FLOAT16 = "float16"
+    FLOAT32 = "float32"
+
+
+class CompactExporter:
+    """
+    Encodes node and edge dicts (as produced by Utils.node_to_dict/edge_to_dict)
+    into a columnar, msgpack-encoded graph export. The REST API additionally
+    gzips it for clients that accept it and sends it with Content-Encoding: gzip.
+
+    Layout of the decoded msgpack map:
+        strings     - table of interned strings (labels, relationship types, string property values)
+        nodes       - {id: [int], labels: [[string idx]], properties: {key: column}}
+        edges       - {id: [int], start: [int], end: [int], label: [string idx], properties: {key: column}}
+        embeddings  - optional {ids: [int], dim: int, dtype: 'float16' or 'float32', data: bytes}
+
+    A property column is either {"s": [string idx or -1]} when every value is a string,
+    or {"v": [value or None]} otherwise; both are aligned with the element order.
+    """
+
+    FORMAT_VERSION = 1
+    MEDIA_TYPE = "application/x-msgpack"
+
+    def __init__(self: CompactExporter, embeddings_mode: EmbeddingsMode = EmbeddingsMode.NONE) -> None:
+        self.embeddings_mode = embeddings_mode
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = dict()
+        return
+
+    def _intern(self: CompactExporter, value: str) -> int:
+        idx = self.string_ids.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = idx
+        return idx
+
+    @staticmethod
+    def _add_properties(columns: Dict[str, List[Any]], properties: Dict[str, Any], row: int) -> None:
+        for key, value in properties.items():
+            column = columns.get(key)
+            if column is None:
+                column = [None] * row
+                columns[key] = column
+            column.append(value)
+        for key, column in columns.items():
+            if len(column) == row:
+                column.append(None)
+        return
+
+    def _encode_columns(self: CompactExporter, columns: Dict[str, List[Any]]) -> Dict[str, Dict[str, List[Any]]]:
+        encoded = dict()
+        for key, column in columns.items():
+            if all(v is None or isinstance(v, str) for v in column):
+                encoded[key] = {"s": [-1 if v is None else self._intern(v) for v in column]}
+            else:
+                encoded[key] = {"v": column}
+        return encoded
+
+    def encode(self: CompactExporter, records: Iterable[Dict[str, Any]]) -> bytes:
+        nodes = {"id": [], "labels": []}
+        edges = {"id": [], "start": [], "end": [], "label": []}
+        node_columns, edge_columns = dict(), dict()
+        embedding_ids, embedding_vectors = [], []
+
+        for record in records:
+            properties = dict(record['properties'])
+            embeddings = EmbeddingCodec.pop_from_properties(properties)
+            if record['type'] == 'node':
+                CompactExporter._add_properties(node_columns, properties, len(nodes['id']))
+                nodes['id'].append(record['id'])
+                nodes['labels'].append([self._intern(label) for label in record['labels']])
+                if embeddings is not None and self.embeddings_mode != EmbeddingsMode.NONE:
+                    embedding_ids.append(record['id'])
+                    embedding_vectors.append(embeddings)
+            else:
+                CompactExporter._add_properties(edge_columns, properties, len(edges['id']))
+                edges['id'].append(record['id'])
+                edges['start'].append(record['start'])
+                edges['end'].append(record['end'])
+                edges['label'].append(self._intern(record['label']))
+
+        nodes['properties'] = self._encode_columns(node_columns)
+        edges['properties'] = self._encode_columns(edge_columns)
+
+        export = {
+            "format_version": CompactExporter.FORMAT_VERSION,
+            "strings": self.strings,
+            "nodes": nodes,
+            "edges": edges,
+        }
+        if embedding_vectors:
+            matrix = np.asarray(embedding_vectors, dtype=self.embeddings_mode.value)
+            export["embeddings"] = {
+                "ids": embedding_ids,
+                "dim": matrix.shape[1],
+                "dtype": self.embeddings_mode.value,
+                "data": matrix.tobytes(),
+            }
+
+        return msgpack.packb(export, use_bin_type=True)
+
+    @staticmethod
+    def compress(payload: bytes) -> bytes:
+        return gzip.compress(payload, compresslevel=6)
+
+    @staticmethod
+    def decode(payload: bytes, with_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """
+        Inverse of encode, back to node and edge dicts. Embeddings are only restored with
+        with_embeddings, as a float32 vector under the `embeddings` key of the node dict.
+        """
+        export = msgpack.unpackb(payload, raw=False)
+        strings = export['strings']
+
+        def rows(columns: Dict[str, Dict[str, List[Any]]], n: int) -> List[Dict[str, Any]]:
+            properties = [dict() for _ in range(n)]
+            for key, column in columns.items():
+                if 's' in column:
+                    values = [None if i < 0 else strings[i] for i in column['s']]
+                else:
+                    values = column['v']
+                for props, value in zip(properties, values):
+                    if value is not None:
+                        props[key] = value
+            return properties
+
+        nodes, edges = export['nodes'], export['edges']
+        node_properties = rows(nodes['properties'], len(nodes['id']))
+        edge_properties = rows(edges['properties'], len(edges['id']))
+
+        out = [{"id": i, "labels": [strings[l] for l in labels], "properties": p, "type": "node"}
+               for i, labels, p in zip(nodes['id'], nodes['labels'], node_properties)]
+        if with_embeddings and 'embeddings' in export:
+            embeddings = export['embeddings']
+            matrix = np.frombuffer(embeddings['data'], dtype=embeddings['dtype']).reshape(-1, embeddings['dim'])
+            row_by_id = dict(zip(embeddings['ids'], matrix.astype(np.float32)))
+            for node in out:
+                if node['id'] in row_by_id:
+                    node['embeddings'] = row_by_id[node['id']]
+        out += [{"id": i, "start": s, "end": e, "label": strings[l], "properties": p, "type": "relationship"}
+                for i, s, e, l, p in zip(edges['id'], edges['start'], edges['end'], edges['label'], edge_properties)]
+        return out
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import Dict, Any, Iterator, Optional
+
+import re
+
+import mgclient
+
+from core.knowledgebase.Utils import Utils
+from core.knowledgebase.QueryLog import QueryLog
+from core.knowledgebase.EmbeddingCodec import EmbeddingCodec
+
+
+class CypherGuard:
+    """
+    Checks and result formatting for Cypher written by agents.
+
+    Only single read-only statements are accepted, a LIMIT is appended to queries that
+    don't end with one, and results are rendered row by row until either the row cap or
+    the token budget is reached, with a notice telling the agent what was left out.
+    Problems are returned as text instead of raised, so the agent can fix its query.
+    """
+
+    READ_CLAUSES = ('MATCH', 'OPTIONAL MATCH', 'WITH', 'UNWIND', 'RETURN')
+    HIDDEN_PROPERTIES = {EmbeddingCodec.PROPERTY, EmbeddingCodec.PACKED_PROPERTY, EmbeddingCodec.DTYPE_PROPERTY}
+
+    @staticmethod
+    def check(query: str) -> Optional[str]:
+        """Why the query may not run, or None if it may."""
+        shape = QueryLog.normalize(query).rstrip(' ;')
+        if not shape:
+            return "The query is empty."
+        if ';' in shape:
+            return "Only a single statement is allowed per query."
+        if not shape.upper().startswith(CypherGuard.READ_CLAUSES) or QueryLog.writes(shape):
+            return ("Only read-only queries are allowed: start with MATCH, OPTIONAL MATCH, WITH, UNWIND "
+                    "or RETURN, and don't use CREATE, MERGE, SET, DELETE, REMOVE or CALL.")
+        return None
+
+    @staticmethod
+    def with_limit(query: str, limit: int) -> str:
+        """The query without comments, with a LIMIT appended unless it already ends with one."""
+        # Comments are dropped first, so a trailing one can neither hide an existing LIMIT nor swallow the new one
+        query = QueryLog.strip_comments(query).strip().rstrip(';').rstrip()
+        if re.search(r'\bLIMIT\s+(\?|\$\w+)$', QueryLog.normalize(query), re.IGNORECASE):
+            return query
+        return f"{query}\nLIMIT {limit}"
+
+    @staticmethod
+    def render_value(value: Any) -> str:
+        if isinstance(value, mgclient.Node):
+            labels = ''.join(f":{label}" for label in sorted(value.labels))
+            return f"({labels} {CypherGuard.render_properties(value.properties)})"
+        if isinstance(value, mgclient.Relationship):
+            return f"[:{value.type} {CypherGuard.render_properties(value.properties)}]"
+        if isinstance(value, mgclient.Path):
+            parts = [CypherGuard.render_value(value.nodes[0])]
+            for relationship, node in zip(value.relationships, value.nodes[1:]):
+                parts.append(f"-{CypherGuard.render_value(relationship)}->{CypherGuard.render_value(node)}")
+            return ''.join(parts)
+        if isinstance(value, list):
+            return '[' + ', '.join(CypherGuard.render_value(v) for v in value) + ']'
+        if isinstance(value, dict):
+            return CypherGuard.render_properties(value)
+        return repr(value) if isinstance(value, str) else str(value)
+
+    @staticmethod
+    def render_properties(properties: Dict[str, Any]) -> str:
+        # Embeddings are hundreds of numbers the agent can't use
+        return '{' + ', '.join(f"{k}: {CypherGuard.render_value(v)}" for k, v in properties.items()
+                               if k not in CypherGuard.HIDDEN_PROPERTIES) + '}'
+
+    @staticmethod
+    def render(rows: Iterator[Dict[str, Any]], max_rows: int, token_budget: int) -> str:
+        """
+        Renders rows, one per line, until max_rows or token_budget is reached. rows should yield
+        at most max_rows + 1 rows; the extra one only tells that the result was cut off.
+        """
+        lines = []
+        used = 0
+        notice = None
+        try:
+            for n, row in enumerate(rows):
+                if n == max_rows:
+                    notice = (f"[Showing the first {max_rows} rows; the query returned more. "
+                              f"Filter further, aggregate or use a smaller LIMIT.]")
+                    break
+                line = ', '.join(f"{column}: {CypherGuard.render_value(value)}" for column, value in row.items())
+                used += Utils.estimate_tokens(line)
+                if used > token_budget:
+                    notice = (f"[Showing {len(lines)} rows; the rest did not fit into the result size limit. "
+                              f"Return fewer properties or fewer rows.]")
+                    break
+                lines.append(line)
+        except TimeoutError as e:
+            notice = f"[{e} Showing the {len(lines)} rows returned before that. Make the query more selective.]"
+        except mgclient.DatabaseError as e:
+            return f"The query failed: {e}"
+        finally:
+            rows.close()
+
+        if not lines and notice is None:
+            return "No results."
+        return '\n'.join(lines + ([notice] if notice else []))
+
+
+if __name__ == '__main__':
+    print(CypherGuard.check("MATCH (n) DETACH DELETE n"))
+    print(CypherGuard.with_limit("MATCH (n) RETURN n.name // names", 101))
@@ -1,11 +1,12 @@
-from typing import List
+from typing import List, Dict, Tuple, Optional
 
 
 class CypherQueryHandler:
 
     @staticmethod
     def get_check_if_db_empty_query() -> str:
-        return (f"MATCH (n)"
+        return (f"MATCH (n) "
+                f"WHERE NOT n:SyncVersion AND NOT n:SyncTombstone "
                 f"RETURN count(n) AS nodes")
 
     @staticmethod
@@ -20,9 +21,128 @@ class CypherQueryHandler:
                 f"WITH project(p) AS file_specific_subgraph "
                 f"RETURN file_specific_subgraph")
 
+    @staticmethod
+    def get_stream_nodes_query(property_name: str, value: str) -> str:
+        return (f"MATCH (n {{ {property_name}: '{value}' }}) "
+                f"RETURN ID(n) as id, labels(n) as labels, properties(n) as properties")
+
+    @staticmethod
+    def get_stream_edges_query(property_name: str, value: str) -> str:
+        return (f"MATCH (n {{ {property_name}: '{value}' }})-[r]->(m {{ {property_name}: '{value}' }}) "
+                f"RETURN ID(r) as id, ID(n) as start, ID(m) as end, type(r) as label, properties(r) as properties")
+
+    @staticmethod
+    def get_snapshot_nodes_query() -> str:
+        return (f"MATCH (n) "
+                f"WHERE NOT n:SyncVersion AND NOT n:SyncTombstone "
+                f"RETURN ID(n) as id, labels(n) as labels, properties(n) as properties")
+
+    @staticmethod
+    def get_snapshot_edges_query() -> str:
+        return (f"MATCH (n)-[r]->(m) "
+                f"WHERE NOT n:SyncVersion AND NOT m:SyncVersion "
+                f"RETURN ID(r) as id, ID(n) as start, ID(m) as end, type(r) as label, properties(r) as properties")
+
+    @staticmethod
+    def get_snapshot_sync_versions_query() -> str:
+        return (f"MATCH (v:SyncVersion) "
+                f"RETURN v.repo as repo, v.version as version")
+
+    @staticmethod
+    def escape_name(name: str) -> str:
+        return "`" + name.replace("`", "``") + "`"
+
+    @staticmethod
+    def get_restore_index_queries() -> Tuple[str, str]:
+        # Restored nodes are looked up by their id in the snapshot while their edges are created
+        return ("CREATE INDEX ON :SnapshotRestore(snapshot_id)",
+                "DROP INDEX ON :SnapshotRestore(snapshot_id)")
+
+    @staticmethod
+    def get_restore_nodes_query(labels: List[str]) -> str:
+        label_string = ''.join(f":{CypherQueryHandler.escape_name(label)}" for label in ['SnapshotRestore'] + labels)
+        return (f"UNWIND $rows as row "
+                f"CREATE (n{label_string}) "
+                f"SET n += row.properties, n.snapshot_id = row.id")
+
+    @staticmethod
+    def get_restore_edges_query(label: str) -> str:
+        return (f"UNWIND $rows as row "
+                f"MATCH (n:SnapshotRestore {{ snapshot_id: row.start }}), (m:SnapshotRestore {{ snapshot_id: row.end }}) "
+                f"CREATE (n)-[r:{CypherQueryHandler.escape_name(label)}]->(m) "
+                f"SET r += row.properties")
+
+    @staticmethod
+    def get_finish_restore_query() -> str:
+        return (f"MATCH (n:SnapshotRestore) "
+                f"REMOVE n:SnapshotRestore, n.snapshot_id")
+
+    @staticmethod
+    def get_discard_restore_query() -> str:
+        return (f"MATCH (n:SnapshotRestore) "
+                f"DETACH DELETE n")
+
+    @staticmethod
+    def get_restore_sync_versions_query() -> str:
+        # Node ids change on restore, so clients must reload: every known version falls below the new floor
+        return (f"UNWIND $rows as row "
+                f"MERGE (v:SyncVersion {{ repo: row.repo }}) "
+                f"ON CREATE SET v.version = 0 "
+                f"SET v.version = CASE WHEN row.version > v.version THEN row.version ELSE v.version END + 1 "
+                f"SET v.floor_version = v.version, "
+                f"v.embeddings_version = coalesce(v.embeddings_version, 0) + 1")
+
+    @staticmethod
+    def get_neighbour_node_ids_query(node_ids: List[int], exclude_ids: List[int], limit: int,
+                                     relationship_types: Optional[List[str]] = None,
+                                     repo_path: Optional[str] = None) -> str:
+        conditions = [f"NOT ID(m) IN {exclude_ids}"]
+        if relationship_types is not None:
+            conditions.append(f"type(r) IN {CypherQueryHandler.string_list(relationship_types)}")
+        if repo_path is not None:
+            conditions.append(f"m.repo_path = '{repo_path}'")
+        # One hop from the given nodes; without ORDER BY the LIMIT stops the expansion early
+        return (f"UNWIND {node_ids} as start_id "
+                f"MATCH (n)-[r]-(m) "
+                f"WHERE ID(n) = start_id AND {' AND '.join(conditions)} "
+                f"WITH DISTINCT m "
+                f"LIMIT {limit} "
+                f"RETURN ID(m) as id")
+
+    @staticmethod
+    def get_nodes_by_ids_query(node_ids: List[int]) -> str:
+        return (f"UNWIND {node_ids} as node_id "
+                f"MATCH (n) "
+                f"WHERE ID(n) = node_id "
+                f"RETURN ID(n) as id, labels(n) as labels, properties(n) as properties")
+
+    @staticmethod
+    def get_edges_between_query(node_ids: List[int], limit: int,
+                                relationship_types: Optional[List[str]] = None) -> str:
+        type_filter = ""
+        if relationship_types is not None:
+            type_filter = f"AND type(r) IN {CypherQueryHandler.string_list(relationship_types)} "
+        return (f"UNWIND {node_ids} as node_id "
+                f"MATCH (n)-[r]->(m) "
+                f"WHERE ID(n) = node_id AND ID(m) IN {node_ids} "
+                f"{type_filter}"
+                f"RETURN ID(r) as id, ID(n) as start, ID(m) as end, type(r) as label, properties(r) as properties "
+                f"LIMIT {limit}")
+
+    @staticmethod
+    def get_structure_nodes_query(repo_path: str) -> str:
+        return (f"MATCH (n {{ repo_path: '{repo_path}' }}) "
+                f"RETURN ID(n) as id, labels(n)[0] as label, n.name as name")
+
+    @staticmethod
+    def get_structure_edges_query(repo_path: str) -> str:
+        return (f"MATCH (n {{ repo_path: '{repo_path}' }})-[r]->(m {{ repo_path: '{repo_path}' }}) "
+                f"RETURN ID(r) as id, ID(n) as start, ID(m) as end")
+
     @staticmethod
     def get_delete_all_query() -> str:
         return (f"MATCH (n) "
+                f"WHERE NOT n:SyncVersion "
                 "DETACH DELETE n")
 
     @staticmethod
@@ -38,32 +158,246 @@ class CypherQueryHandler:
                 f"DETACH DELETE n")
 
     @staticmethod
-    def get_rename_file_query(old_file_path: str, new_file_path: str) -> str:
-        return (f"MATCH (n)"
-                f"WHERE n.file_path = '{old_file_path}'"
-                f"SET n.file_path = '{new_file_path}'")
+    def get_rename_file_query(old_file_path: str, new_file_path: str, sync_version: int) -> str:
+        return (f"MATCH (n) "
+                f"WHERE n.file_path = '{old_file_path}' "
+                f"SET n.file_path = '{new_file_path}', n.sync_version = {sync_version}")
+
+    @staticmethod
+    def string_list(values: List[str]) -> str:
+        """Cypher list literal of already escaped strings."""
+        return '[' + ', '.join(f"'{v}'" for v in values) + ']'
+
+    @staticmethod
+    def get_graph_ids_for_files_query(file_paths: List[str]) -> str:
+        return (f"MATCH (n) "
+                f"WHERE n.file_path IN {CypherQueryHandler.string_list(file_paths)} "
+                f"OPTIONAL MATCH (n)-[r]-() "
+                f"RETURN n.repo_path as repo_path, "
+                f"collect(DISTINCT ID(n)) as node_ids, "
+                f"collect(DISTINCT ID(r)) as edge_ids")
+
+    @staticmethod
+    def get_delete_graph_for_files_query(file_paths: List[str]) -> str:
+        return (f"MATCH (n) "
+                f"WHERE n.file_path IN {CypherQueryHandler.string_list(file_paths)} "
+                f"DETACH DELETE n")
+
+    @staticmethod
+    def get_neighbour_file_paths_query(file_paths: List[str]) -> str:
+        return (f"MATCH (n)-[]-(m) "
+                f"WHERE n.file_path IN {CypherQueryHandler.string_list(file_paths)} "
+                f"AND m.file_path IS NOT NULL "
+                f"RETURN collect(DISTINCT m.file_path) as file_paths")
+
+    @staticmethod
+    def get_repo_paths_for_files_query(file_paths: List[str]) -> str:
+        return (f"MATCH (n) "
+                f"WHERE n.file_path IN {CypherQueryHandler.string_list(file_paths)} "
+                f"RETURN collect(DISTINCT n.repo_path) as repo_paths")
+
+    @staticmethod
+    def get_rename_files_queries(renames: List[Tuple[str, str]], sync_version: int) -> List[str]:
+        # Two passes, so that chains and swaps (a -> b, b -> a) match only the original paths
+        pairs = ', '.join(f"['{old}', '{new}']" for old, new in renames)
+        return [(f"UNWIND [{pairs}] as pair "
+                 f"MATCH (n) "
+                 f"WHERE n.file_path = pair[0] "
+                 f"SET n.renamed_file_path = pair[1]"),
+                (f"MATCH (n) "
+                 f"WHERE n.renamed_file_path IS NOT NULL "
+                 f"SET n.file_path = n.renamed_file_path, n.sync_version = {sync_version} "
+                 f"REMOVE n.renamed_file_path")]
+
+    @staticmethod
+    def get_repo_paths_for_file_query(file_path: str) -> str:
+        return (f"MATCH (n) "
+                f"WHERE n.file_path = '{file_path}' "
+                f"RETURN collect(DISTINCT n.repo_path) as repo_paths")
+
+    @staticmethod
+    def get_graph_ids_for_file_query(file_path: str) -> str:
+        return (f"MATCH (n) "
+                f"WHERE n.file_path = '{file_path}' "
+                f"OPTIONAL MATCH (n)-[r]-() "
+                f"RETURN n.repo_path as repo_path, "
+                f"collect(DISTINCT ID(n)) as node_ids, "
+                f"collect(DISTINCT ID(r)) as edge_ids")
+
+    @staticmethod
+    def get_sync_state_query(repo_path: str) -> str:
+        return (f"MATCH (v:SyncVersion {{ repo: '{repo_path}' }}) "
+                f"RETURN v.version as version, v.floor_version as floor_version, "
+                f"v.embeddings_version as embeddings_version")
+
+    @staticmethod
+    def get_bump_embeddings_version_query(repo_paths: List[str]) -> str:
+        return (f"UNWIND {CypherQueryHandler.string_list(repo_paths)} as repo "
+                f"MERGE (v:SyncVersion {{ repo: repo }}) "
+                f"ON CREATE SET v.version = 0, v.floor_version = 0 "
+                f"SET v.embeddings_version = coalesce(v.embeddings_version, 0) + 1")
+
+    @staticmethod
+    def get_bump_sync_version_query(repo_path: str, retention: int, reset: bool) -> str:
+        if reset:
+            floor_version = "v.version"
+        else:
+            # Only the last `retention` versions can be asked for; the floor moves up behind them
+            floor_version = (f"CASE WHEN v.version - {retention} > v.floor_version "
+                             f"THEN v.version - {retention} ELSE v.floor_version END")
+        # Tombstones used to be a list on the node; they are SyncTombstone nodes now
+        return (f"MERGE (v:SyncVersion {{ repo: '{repo_path}' }}) "
+                f"ON CREATE SET v.version = 0, v.floor_version = 0 "
+                f"WITH v, v.floor_version as previous_floor_version "
+                f"SET v.version = v.version + 1 "
+                f"SET v.floor_version = {floor_version} "
+                f"REMOVE v.tombstones "
+                f"RETURN v.version as version, v.floor_version as floor_version, previous_floor_version")
+
+    @staticmethod
+    def get_add_tombstones_query(repo_path: str, sync_version: int) -> str:
+        # One node per deleted element, so a new version never rewrites the tombstones of earlier ones
+        return (f"UNWIND $rows as row "
+                f"CREATE (:SyncTombstone {{ repo: '{repo_path}', version: {sync_version}, "
+                f"kind: row.kind, id: row.id }})")
+
+    @staticmethod
+    def get_prune_tombstones_query(repo_path: str, floor_version: int) -> str:
+        return (f"MATCH (t:SyncTombstone {{ repo: '{repo_path}' }}) "
+                f"WHERE t.version <= {floor_version} "
+                f"DELETE t")
+
+    @staticmethod
+    def get_reset_all_sync_versions_query() -> str:
+        return (f"MATCH (v:SyncVersion) "
+                f"SET v.version = v.version + 1 "
+                f"SET v.floor_version = v.version "
+                f"REMOVE v.tombstones")
+
+    @staticmethod
+    def get_stamp_sync_version_queries(repo_path: str, sync_version: int) -> List[str]:
+        return [(f"MATCH (n {{ repo_path: '{repo_path}' }}) "
+                 f"WHERE n.sync_version IS NULL "
+                 f"SET n.sync_version = {sync_version}, n.sync_created_version = {sync_version}"),
+                (f"MATCH (n {{ repo_path: '{repo_path}' }})-[r]->(m {{ repo_path: '{repo_path}' }}) "
+                 f"WHERE r.sync_version IS NULL "
+                 f"SET r.sync_version = {sync_version}, r.sync_created_version = {sync_version}")]
+
+    @staticmethod
+    def get_restamp_sync_version_queries(node_ids: List[int], edge_ids: List[int], sync_version: int) -> List[str]:
+        # Changed elements keep sync_created_version, so clients see them as changed rather than added
+        return [(f"MATCH (n) WHERE ID(n) IN {node_ids} "
+                 f"SET n.sync_version = {sync_version}"),
+                (f"MATCH ()-[r]->() WHERE ID(r) IN {edge_ids} "
+                 f"SET r.sync_version = {sync_version}")]
+
+    @staticmethod
+    def get_scope_nodes_query(repo_path: str, file_paths: List[str], hidden_properties: List[str]) -> str:
+        # The nodes of the files and their neighbours: what an update query for the files can reach.
+        # Properties come as [key, value] pairs without the hidden ones, so embeddings are never sent
+        return (f"MATCH (n {{ repo_path: '{repo_path}' }}) "
+                f"WHERE n.file_path IN {CypherQueryHandler.string_list(file_paths)} "
+                f"OPTIONAL MATCH (n)--(m {{ repo_path: '{repo_path}' }}) "
+                f"WITH collect(DISTINCT n) + collect(DISTINCT m) as scope "
+                f"UNWIND scope as x "
+                f"WITH DISTINCT x "
+                f"WITH x, properties(x) as p "
+                f"RETURN ID(x) as id, labels(x) as label, x.sync_version as sync_version, x.sync_hash as sync_hash, "
+                f"[k IN keys(p) WHERE NOT k IN {CypherQueryHandler.string_list(hidden_properties)} "
+                f"| [k, p[k]]] as properties")
+
+    @staticmethod
+    def get_scope_edges_query(repo_path: str, file_paths: List[str], hidden_properties: List[str]) -> str:
+        return (f"MATCH (n {{ repo_path: '{repo_path}' }})-[r]-(m {{ repo_path: '{repo_path}' }}) "
+                f"WHERE n.file_path IN {CypherQueryHandler.string_list(file_paths)} "
+                f"WITH DISTINCT r "
+                f"WITH r, properties(r) as p "
+                f"RETURN ID(r) as id, type(r) as label, r.sync_version as sync_version, r.sync_hash as sync_hash, "
+                f"[k IN keys(p) WHERE NOT k IN {CypherQueryHandler.string_list(hidden_properties)} "
+                f"| [k, p[k]]] as properties")
+
+    @staticmethod
+    def get_set_sync_hash_queries() -> Tuple[str, str]:
+        return ((f"UNWIND $rows as row "
+                 f"MATCH (n) WHERE ID(n) = row.id "
+                 f"SET n.sync_hash = row.hash"),
+                (f"UNWIND $rows as row "
+                 f"MATCH ()-[r]->() WHERE ID(r) = row.id "
+                 f"SET r.sync_hash = row.hash"))
+
+    @staticmethod
+    def get_changed_nodes_query(repo_path: str, since: int) -> str:
+        return (f"MATCH (n {{ repo_path: '{repo_path}' }}) "
+                f"WHERE n.sync_version > {since} "
+                f"RETURN ID(n) as id, labels(n) as labels, properties(n) as properties")
+
+    @staticmethod
+    def get_changed_edges_query(repo_path: str, since: int) -> str:
+        return (f"MATCH (n {{ repo_path: '{repo_path}' }})-[r]->(m {{ repo_path: '{repo_path}' }}) "
+                f"WHERE r.sync_version > {since} "
+                f"RETURN ID(r) as id, ID(n) as start, ID(m) as end, type(r) as label, properties(r) as properties")
+
+    @staticmethod
+    def get_tombstones_query(repo_path: str, since: int) -> str:
+        return (f"MATCH (t:SyncTombstone {{ repo: '{repo_path}' }}) "
+                f"WHERE t.version > {since} "
+                f"RETURN t.kind as kind, t.id as id")
 
     @staticmethod
     def get_strings_to_embed_query(file_path: str) -> str:
         return (f"MATCH (n) "
-                f"OPTIONAL MATCH (n)-[r]->(m) "
                 f"WHERE n.file_path = '{file_path}' "
+                f"OPTIONAL MATCH (n)-[r]->(m) "
                 f"RETURN ID(n) as Node_ID, "
                 f"n.name as Node_Name, "
                 f"labels(n)[0] as Node_Type, "
                 f"collect({{Neighbour_Name: m.name, Neighbour_Type: labels(m)[0], Relationship_Type: type(r)}}) as Connections")
 
     @staticmethod
-    def get_node_description_query(node_id: int) -> str:
+    def get_strings_to_embed_for_files_query(file_paths: List[str]) -> str:
         return (f"MATCH (n) "
-                f"WHERE ID(n) = {node_id} "
+                f"WHERE n.file_path IN {CypherQueryHandler.string_list(file_paths)} "
+                f"OPTIONAL MATCH (n)-[r]->(m) "
+                f"RETURN ID(n) as Node_ID, "
+                f"n.name as Node_Name, "
+                f"labels(n)[0] as Node_Type, "
+                f"collect({{Neighbour_Name: m.name, Neighbour_Type: labels(m)[0], Relationship_Type: type(r)}}) as Connections")
+
+    @staticmethod
+    def get_set_embeddings_batch_query(embeddings_by_id: Dict[int, List[float]]) -> str:
+        rows = ', '.join(f"{{id: {node_id}, embeddings: {emb}}}" for node_id, emb in embeddings_by_id.items())
+        return (f"UNWIND [{rows}] as row "
+                f"MATCH (n) "
+                f"WHERE ID(n) = row.id "
+                f"SET n.embeddings = row.embeddings "
+                f"REMOVE n.embeddings_packed, n.embeddings_dtype "
+                f"RETURN DISTINCT n.repo_path as repo_path")
+
+    @staticmethod
+    def get_set_packed_embeddings_batch_query(packed_by_id: Dict[int, str], dtype: str) -> str:
+        rows = ', '.join(f"{{id: {node_id}, packed: '{packed}'}}" for node_id, packed in packed_by_id.items())
+        return (f"UNWIND [{rows}] as row "
+                f"MATCH (n) "
+                f"WHERE ID(n) = row.id "
+                f"SET n.embeddings_packed = row.packed, n.embeddings_dtype = '{dtype}' "
+                f"REMOVE n.embeddings "
+                f"RETURN DISTINCT n.repo_path as repo_path")
+
+    @staticmethod
+    def get_nodes_description_query(node_ids: List[int], max_neighbours: int) -> str:
+        # Outgoing and incoming edges are aggregated one after the other, so they don't multiply
+        return (f"MATCH (n) "
+                f"WHERE ID(n) IN {node_ids} "
                 f"OPTIONAL MATCH (n)-[r1]->(m) "
+                f"WITH n, count(r1) as Out_Degree, "
+                f"collect({{ Neighbour_Name: m.name, Neighbour_Type: labels(m)[0], Relationship_Type: type(r1) }})[..{max_neighbours}] as Out_Connections "
                 f"OPTIONAL MATCH (p)-[r2]->(n) "
-                f"RETURN ID(n) as Node_ID,  "
+                f"WITH n, Out_Degree, Out_Connections, count(r2) as In_Degree, "
+                f"collect({{ Neighbour_Name: p.name, Neighbour_Type: labels(p)[0], Relationship_Type: type(r2) }})[..{max_neighbours}] as In_Connections "
+                f"RETURN ID(n) as Node_ID, "
                 f"n.name as Node_Name, "
                 f"labels(n)[0] as Node_Type, "
-                "collect({ Neighbour_Name: m.name, Neighbour_Type: labels(m)[0], Relationship_Type: type(r1) }) as In_Connections, "
-                "collect({ Neighbour_Name: p.name, Neighbour_Type: labels(p)[0], Relationship_Type: type(r2) }) as Out_Connections")
+                f"Out_Connections, Out_Degree, In_Connections, In_Degree")
 
     @staticmethod
     def get_set_embeddings_query(node_id: str, embeddings: List[float]) -> str:
@@ -71,18 +405,6 @@ class CypherQueryHandler:
                 f"WHERE ID(n) = {node_id} "
                 f"SET n.embeddings =  {embeddings} ")
 
-    @staticmethod
-    def get_tmp_create_query(embeddings: List[float]) -> str:
-        return (f"MATCH (n) "
-                f"WITH count(n) as N "
-                f"UNWIND range(1, N) as id "
-                f"CREATE (:Temp {{name: 'temp_'+id, embeddings: {embeddings} }}) ")
-
-    @staticmethod
-    def get_tmp_delete_query() -> str:
-        return (f"MATCH (n:Temp) "
-                f"DETACH DELETE n ")
-
     @staticmethod
     def get_schema_for_repo_query(repo_path: str) -> str:
         return (f"MATCH p=(n {{ repo_path: '{repo_path}' }})-[r]->(m {{ repo_path: '{repo_path}' }}) "
@@ -91,21 +413,36 @@ class CypherQueryHandler:
                 f"YIELD schema "
                 f"RETURN schema")
 
-    @staticmethod
-    def get_vector_search_query() -> str:
-        return ("MATCH (m) "
-                "WHERE (NOT m.name STARTS WITH 'temp') OR (m.name IS NULL) "
-                "WITH COLLECT(m) as nodes "
-                "MATCH (tmp) "
-                "WHERE tmp.name STARTS WITH 'temp' "
-                "WITH COLLECT(tmp) as temps, nodes "
-                "CALL node_similarity.cosine_pairwise('embeddings', nodes, temps) YIELD node1, node2, similarity as cosine_similarity "
-                "RETURN ID(node1), cosine_similarity "
-                "ORDER BY cosine_similarity DESC "
-                "LIMIT 3")
-
     @staticmethod
     def get_embeddings_for_node_query(node_id: int) -> str:
         return (f"MATCH (m) "
                 f"WHERE ID(m) = {node_id} "
-                f"RETURN m.embeddings as embeddings")
+                f"RETURN m.embeddings as embeddings, m.embeddings_packed as packed, m.embeddings_dtype as dtype")
+
+    @staticmethod
+    def get_embeddings_for_nodes_query(node_ids: List[int]) -> str:
+        return (f"MATCH (m) "
+                f"WHERE ID(m) IN {node_ids} "
+                f"RETURN ID(m) as id, m.embeddings as embeddings, m.embeddings_packed as packed, m.embeddings_dtype as dtype")
+
+    @staticmethod
+    def get_node_embeddings_for_repo_query(repo_path: str) -> str:
+        return (f"MATCH (m {{ repo_path: '{repo_path}' }}) "
+                f"WHERE m.embeddings IS NOT NULL OR m.embeddings_packed IS NOT NULL "
+                f"RETURN ID(m) as id, m.embeddings as embeddings, m.embeddings_packed as packed, m.embeddings_dtype as dtype")
+
+    @staticmethod
+    def get_create_symbol_index_queries() -> List[str]:
+        return ["CREATE INDEX ON :Symbol(name)",
+                "CREATE INDEX ON :Symbol(repo_path)"]
+
+    @staticmethod
+    def get_symbol_definition_query(repo_path: str, name: str) -> str:
+        return (f"MATCH (s:Symbol {{ name: '{name}' }}) "
+                f"WHERE s.repo_path = '{repo_path}' "
+                f"RETURN labels(s) as Labels, "
+                f"s.qualname as Qualname, "
+                f"s.path as Path, "
+                f"s.lineno as Lineno, "
+                f"s.end_lineno as End_Lineno "
+                f"ORDER BY Path, Lineno")
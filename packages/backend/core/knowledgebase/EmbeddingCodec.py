@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Dict, List, Any, Optional
+
+import base64
+from enum import Enum
+
+import numpy as np
+
+from core.knowledgebase import constants
+
+
+class EmbeddingStorage(Enum):
+    FLOAT = "float"
+    FLOAT16 = "float16"
+    INT8 = "int8"
+
+
+class EmbeddingCodec:
+    """
+    Converts node embeddings to and from the node properties they are stored in.
+
+    FLOAT keeps the vector as a list property `embeddings` (8-byte doubles per value).
+    FLOAT16 and INT8 store it packed and base64-encoded in `embeddings_packed`, with the
+    format in `embeddings_dtype`, since Memgraph has no byte array property type.
+    INT8 vectors are scaled per vector to [-127, 127]; the float32 scale precedes the values.
+
+    Memgraph's node_similarity module can only read the FLOAT form, so with compact
+    storage vectors are decoded and scored in Python.
+    """
+
+    PROPERTY = 'embeddings'
+    PACKED_PROPERTY = 'embeddings_packed'
+    DTYPE_PROPERTY = 'embeddings_dtype'
+
+    def __init__(self: EmbeddingCodec, storage: Optional[EmbeddingStorage] = None) -> None:
+        self.storage = storage or EmbeddingStorage(constants.NODE_EMBEDDINGS_STORAGE)
+        return
+
+    @property
+    def compact(self: EmbeddingCodec) -> bool:
+        return self.storage != EmbeddingStorage.FLOAT
+
+    def encode(self: EmbeddingCodec, vector: List[float]) -> str:
+        """Packed, base64-encoded form of vector. Only for compact storage."""
+        values = np.asarray(vector, dtype=np.float32)
+        if self.storage == EmbeddingStorage.FLOAT16:
+            payload = values.astype(np.float16).tobytes()
+        elif self.storage == EmbeddingStorage.INT8:
+            max_abs = float(np.abs(values).max()) if values.size else 0.0
+            scale = max_abs / 127 if max_abs > 0 else 1.0
+            quantized = np.clip(np.rint(values / scale), -127, 127).astype(np.int8)
+            payload = np.float32(scale).tobytes() + quantized.tobytes()
+        else:
+            raise ValueError("FLOAT embeddings are stored as lists, not packed")
+        return base64.b64encode(payload).decode('ascii')
+
+    @staticmethod
+    def decode(embeddings: Optional[List[float]], packed: Optional[str] = None,
+               dtype: Optional[str] = None) -> Optional[np.ndarray]:
+        """float32 vector from either stored form, or None if the node has no embeddings."""
+        if embeddings is not None:
+            return np.asarray(embeddings, dtype=np.float32)
+        if packed is None:
+            return None
+        payload = base64.b64decode(packed)
+        if dtype == EmbeddingStorage.FLOAT16.value:
+            return np.frombuffer(payload, dtype=np.float16).astype(np.float32)
+        if dtype == EmbeddingStorage.INT8.value:
+            scale = np.frombuffer(payload[:4], dtype=np.float32)[0]
+            return np.frombuffer(payload[4:], dtype=np.int8).astype(np.float32) * scale
+        raise ValueError(f"Unknown embeddings dtype: {dtype}")
+
+    @staticmethod
+    def decode_row(row: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Decodes a query row with `embeddings`, `packed` and `dtype` columns."""
+        return EmbeddingCodec.decode(row.get('embeddings'), row.get('packed'), row.get('dtype'))
+
+    @staticmethod
+    def pop_from_properties(properties: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Removes any stored form of the embeddings from a node's properties and returns the vector."""
+        return EmbeddingCodec.decode(properties.pop(EmbeddingCodec.PROPERTY, None),
+                                     properties.pop(EmbeddingCodec.PACKED_PROPERTY, None),
+                                     properties.pop(EmbeddingCodec.DTYPE_PROPERTY, None))
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+from typing import Dict, List, Any, Tuple, Set, Optional
+
+import threading
+from collections import Counter, deque
+
+from core.knowledgebase import constants
+from core.knowledgebase.MemgraphManager import MemgraphManager
+
+
+class GraphSummarizer:
+    """
+    Level-of-detail view of a repo graph: nodes are grouped into communities by
+    label propagation, and each community is shown as one super-node with edges
+    weighted by the number of relationships between communities.
+
+    Summaries are cached per repo and keyed by the repo's change version. A refresh
+    reads only the nodes and edges changed since the cached version (the whole
+    structure only the first time, or when those changes are no longer known), keeps
+    the previous communities, and re-evaluates only nodes whose neighbourhood changed
+    (and the neighbours of nodes that switch community). Only the clusters of those
+    nodes are summarized again, so small writes cost work proportional to the change,
+    not to the repo. Every repo has its own lock, so a refresh never blocks others.
+    Nodes without relationships are collected in the UNLINKED cluster.
+    """
+
+    _summarizers: Dict[str, GraphSummarizer] = dict()
+    # Guards _summarizers only; refreshes take the lock of their summarizer
+    _lock = threading.Lock()
+
+    UNLINKED = -1
+    # Label updates allowed per node and refresh, so oscillating labels can't loop forever
+    MAX_UPDATES_PER_NODE = 10
+
+    def __init__(self: GraphSummarizer, repo_path: str) -> None:
+        self.repo_path = repo_path
+        self.version: Optional[int] = None
+        self.nodes: Dict[int, Dict[str, Any]] = dict()
+        self.edges: Dict[int, Tuple[int, int]] = dict()
+        self.adjacency: Dict[int, Counter] = dict()
+        self.communities: Dict[int, int] = dict()
+        self.cluster_members: Dict[int, Set[int]] = dict()
+        self.clusters: Dict[int, Dict[str, Any]] = dict()
+        self.weights: Counter = Counter()
+        self.summary: Dict[str, Any] = dict()
+        self.lock = threading.Lock()
+        return
+
+    @staticmethod
+    def for_repo(repo_path: str, mm: MemgraphManager) -> GraphSummarizer:
+        """The repo's summarizer, refreshed if the repo changed since it was computed."""
+        with GraphSummarizer._lock:
+            summarizer = GraphSummarizer._summarizers.get(repo_path)
+            if summarizer is None:
+                summarizer = GraphSummarizer(repo_path)
+                GraphSummarizer._summarizers[repo_path] = summarizer
+        with summarizer.lock:
+            version = mm.get_sync_state(repo_path)['version']
+            if summarizer.version != version:
+                summarizer.refresh(mm, version)
+        return summarizer
+
+    @staticmethod
+    def refresh_cached(repo_path: str, mm: MemgraphManager) -> None:
+        """Brings the repo's summary up to date after a write, if a summary was ever requested for it."""
+        if repo_path in GraphSummarizer._summarizers:
+            GraphSummarizer.for_repo(repo_path, mm)
+        return
+
+    @staticmethod
+    def build_adjacency(nodes: Dict[int, Any], edges: List[Tuple[int, int]]) -> Dict[int, Counter]:
+        # Undirected, weighted by the number of relationships between two nodes
+        adjacency = {node_id: Counter() for node_id in nodes}
+        for start, end in edges:
+            if start == end or start not in adjacency or end not in adjacency:
+                continue
+            adjacency[start][end] += 1
+            adjacency[end][start] += 1
+        return adjacency
+
+    @staticmethod
+    def propagate(adjacency: Dict[int, Counter], communities: Dict[int, int], dirty: Set[int],
+                  previous: Optional[Dict[int, int]] = None) -> int:
+        """
+        Asynchronous label propagation starting from the dirty nodes, in place.
+        A node takes the community with the highest edge weight among its neighbours,
+        keeping its own on ties, otherwise the smallest id. The community every moved
+        node had before is recorded in `previous`. Returns the number of updates.
+        """
+        queue = deque(sorted(dirty))
+        queued = set(queue)
+        budget = GraphSummarizer.MAX_UPDATES_PER_NODE * max(len(queue), 1)
+        updates = 0
+        while queue and updates < budget:
+            node_id = queue.popleft()
+            queued.discard(node_id)
+            weights = Counter()
+            for neighbour, weight in adjacency[node_id].items():
+                weights[communities[neighbour]] += weight
+            if not weights:
+                continue
+            best_weight = max(weights.values())
+            current = communities[node_id]
+            if weights.get(current) == best_weight:
+                continue
+            if previous is not None:
+                previous.setdefault(node_id, current)
+            communities[node_id] = min(c for c, w in weights.items() if w == best_weight)
+            updates += 1
+            for neighbour in adjacency[node_id]:
+                if neighbour not in queued:
+                    queue.append(neighbour)
+                    queued.add(neighbour)
+        return updates
+
+    def refresh(self: GraphSummarizer, mm: MemgraphManager, version: int) -> None:
+        changes = None
+        if self.version is not None:
+            changes = mm.export_changes_for_repo_path(self.repo_path, self.version)
+        if changes is None or changes['reset']:
+            self._load(mm)
+            self._summarize()
+        else:
+            # Changes newer than the state read are applied again next time, which is harmless
+            version = changes['version']
+            self._summarize(self._apply(changes))
+        self.version = version
+        self.summary = {
+            "version": version,
+            "clusters": sorted(self.clusters.values(), key=lambda c: (-c['size'], c['id'])),
+            "edges": [{"start": a, "end": b, "weight": w} for (a, b), w in sorted(self.weights.items())],
+        }
+        return
+
+    def _load(self: GraphSummarizer, mm: MemgraphManager) -> None:
+        nodes, edges = mm.repo_structure(self.repo_path)
+        adjacency = GraphSummarizer.build_adjacency(nodes, list(edges.values()))
+
+        # New nodes start in a community of their own; changed ones keep theirs as the starting point
+        communities = {node_id: self.communities.get(node_id, node_id) for node_id in nodes}
+        dirty = {node_id for node_id, neighbours in adjacency.items()
+                 if self.adjacency.get(node_id) != neighbours}
+        # Nodes left in a community whose founding node is gone are re-evaluated too
+        dirty.update(node_id for node_id, community in communities.items()
+                     if community not in nodes and community != node_id)
+        GraphSummarizer.propagate(adjacency, communities, dirty)
+
+        self.nodes, self.edges, self.adjacency, self.communities = nodes, edges, adjacency, communities
+        return
+
+    def _link(self: GraphSummarizer, start: int, end: int, weight: int) -> None:
+        if start == end:
+            return
+        for a, b in ((start, end), (end, start)):
+            if a in self.adjacency:
+                self.adjacency[a][b] += weight
+                if self.adjacency[a][b] <= 0:
+                    del self.adjacency[a][b]
+        return
+
+    def _apply(self: GraphSummarizer, changes: Dict[str, Any]) -> Dict[int, Optional[int]]:
+        """Applies a change export to the graph and communities. Returns the cluster every touched node was in."""
+        before: Dict[int, Optional[int]] = dict()
+        dirty: Set[int] = set()
+
+        def touch(node_id: int) -> None:
+            if node_id not in before:
+                before[node_id] = self.cluster_of(node_id) if node_id in self.nodes else None
+            dirty.add(node_id)
+            return
+
+        deleted_nodes = [d['id'] for d in changes['deleted'] if d['type'] == 'node' and d['id'] in self.nodes]
+        for deleted in changes['deleted']:
+            ends = self.edges.pop(deleted['id'], None) if deleted['type'] == 'relationship' else None
+            if ends is not None:
+                for node_id in ends:
+                    if node_id in self.nodes:
+                        touch(node_id)
+                self._link(ends[0], ends[1], -1)
+        for node_id in deleted_nodes:
+            touch(node_id)
+            for neighbour in list(self.adjacency[node_id]):
+                touch(neighbour)
+                del self.adjacency[neighbour][node_id]
+            # Nodes in the community it founded are re-evaluated, as in a full refresh
+            for member in self.cluster_members.get(node_id, ()):
+                touch(member)
+            del self.nodes[node_id], self.adjacency[node_id], self.communities[node_id]
+
+        records = changes['added'] + changes['changed']
+        for node in (r for r in records if r['type'] == 'node'):
+            touch(node['id'])
+            self.nodes[node['id']] = {"label": node['labels'][0] if node['labels'] else None,
+                                      "name": node['properties'].get('name')}
+            self.adjacency.setdefault(node['id'], Counter())
+            self.communities.setdefault(node['id'], node['id'])
+        for edge in (r for r in records if r['type'] == 'relationship'):
+            if edge['id'] in self.edges or edge['start'] not in self.nodes or edge['end'] not in self.nodes:
+                continue
+            self.edges[edge['id']] = (edge['start'], edge['end'])
+            touch(edge['start'])
+            touch(edge['end'])
+            self._link(edge['start'], edge['end'], 1)
+
+        dirty.difference_update(deleted_nodes)
+        previous: Dict[int, int] = dict()
+        GraphSummarizer.propagate(self.adjacency, self.communities, dirty, previous)
+        for node_id, community in previous.items():
+            before.setdefault(node_id, community)
+        return before
+
+    def cluster_of(self: GraphSummarizer, node_id: int) -> int:
+        if not self.adjacency.get(node_id):
+            return GraphSummarizer.UNLINKED
+        return self.communities[node_id]
+
+    def members(self: GraphSummarizer, cluster_id: int) -> List[int]:
+        with self.lock:
+            return sorted(self.cluster_members.get(cluster_id, ()))
+
+    def _summarize(self: GraphSummarizer, before: Optional[Dict[int, Optional[int]]] = None) -> None:
+        """
+        Updates the members, summaries and edge weights of the clusters the nodes in
+        `before` (node id -> previous cluster) left or joined; of all clusters without it.
+        """
+        if before is None:
+            self.cluster_members = dict()
+            for node_id in self.nodes:
+                self.cluster_members.setdefault(self.cluster_of(node_id), set()).add(node_id)
+            self.clusters, self.weights = dict(), Counter()
+            touched = set(self.cluster_members)
+        else:
+            touched = set()
+            for node_id, previous in before.items():
+                if previous is not None:
+                    self.cluster_members.get(previous, set()).discard(node_id)
+                    touched.add(previous)
+                if node_id in self.nodes:
+                    cluster_id = self.cluster_of(node_id)
+                    self.cluster_members.setdefault(cluster_id, set()).add(node_id)
+                    touched.add(cluster_id)
+
+        for cluster_id in touched:
+            member_ids = self.cluster_members.get(cluster_id)
+            if not member_ids:
+                self.cluster_members.pop(cluster_id, None)
+                self.clusters.pop(cluster_id, None)
+                continue
+            if cluster_id == GraphSummarizer.UNLINKED:
+                name = "Unlinked"
+            else:
+                # Named after its best connected member
+                hub = max(member_ids, key=lambda i: (sum(self.adjacency[i].values()), -i))
+                name = self.nodes[hub]['name'] or self.nodes[hub]['label']
+            labels = Counter(self.nodes[i]['label'] for i in member_ids)
+            self.clusters[cluster_id] = {
+                "id": cluster_id,
+                "name": name,
+                "size": len(member_ids),
+                "labels": dict(labels.most_common(constants.SUMMARY_TOP_LABELS)),
+            }
+
+        for key in [k for k in self.weights if k[0] in touched or k[1] in touched]:
+            del self.weights[key]
+        for cluster_id in touched:
+            for node_id in self.cluster_members.get(cluster_id, ()):
+                for neighbour, weight in self.adjacency[node_id].items():
+                    a, b = self.communities[node_id], self.communities[neighbour]
+                    # Counted from the side of the smaller community, unless only the other side was touched
+                    if a < b or (a > b and b not in touched):
+                        weights_key = (a, b) if a < b else (b, a)
+                        self.weights[weights_key] += weight
+        return
@@ -1,13 +1,56 @@
 import os
+import hashlib
+import logging
 import pathlib
 
+from core.knowledgebase import constants
 from core.knowledgebase.MemgraphManager import MemgraphManager
+from core.knowledgebase.Snapshot import Snapshot
 from core.knowledgebase.notes.CollectionManager import CollectionManager
 
+logger = logging.getLogger(__name__)
+
 
 class Initializer:
+    MOCK_REPOS_PATH = os.path.join(os.path.dirname(__file__), 'mock_repos')
+    MOCK_CYPHERLS_PATH = os.path.join(os.path.dirname(__file__), 'mock_cypherls')
+
+    @staticmethod
+    def mock_data_fingerprint() -> str:
+        """Changes with the mock notes, their cypherl files and the directory they are in, which ends up in the graph."""
+        digest = hashlib.sha1()
+        for directory in (Initializer.MOCK_REPOS_PATH, Initializer.MOCK_CYPHERLS_PATH):
+            for path in sorted(pathlib.Path(directory).rglob('*')):
+                if path.is_file():
+                    digest.update(str(path).encode())
+                    digest.update(path.read_bytes())
+        return digest.hexdigest()
+
     @staticmethod
     def init_vault_mock_data() -> None:
+        """Restores the mock data from its snapshot if that is up to date, otherwise builds it and takes the snapshot."""
+        snapshot_path = constants.MOCK_SNAPSHOT_PATH
+        fingerprint = Initializer.mock_data_fingerprint()
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                Snapshot.restore_file(snapshot_path, source=fingerprint)
+                return
+            except ValueError as e:
+                logger.info(f"Rebuilding the mock data instead of restoring {snapshot_path}: {e}")
+            except Exception:
+                logger.warning(f"Restoring the mock data from {snapshot_path} failed, rebuilding it", exc_info=True)
+                MemgraphManager().discard_restore()
+
+        Initializer.build_vault_mock_data()
+        if snapshot_path:
+            try:
+                Snapshot.write(snapshot_path, source=fingerprint)
+            except OSError:
+                logger.warning(f"Writing the mock data snapshot to {snapshot_path} failed", exc_info=True)
+        return
+
+    @staticmethod
+    def build_vault_mock_data() -> None:
         mm = MemgraphManager()
         cm = CollectionManager()
 
@@ -17,9 +60,8 @@ class Initializer:
         history_repo_name = 'History'
         tech_repo_name = 'Technology'
 
-        mock_repos_path = os.path.join(os.path.dirname(__file__), 'mock_repos')
-        mock_cypherls_path = os.path.join(
-            os.path.dirname(__file__), 'mock_cypherls')
+        mock_repos_path = Initializer.MOCK_REPOS_PATH
+        mock_cypherls_path = Initializer.MOCK_CYPHERLS_PATH
 
         history_repo_path = os.path.join(mock_repos_path, history_repo_name)
         tech_repo_path = os.path.join(mock_repos_path, tech_repo_name)
@@ -38,7 +80,7 @@ class Initializer:
             cypherl_path = os.path.join(
                 mock_cypherls_path, history_repo_name, note) + '_cypherl.txt'
             cm_history.add_file(note_path)
-            mm.run_update_query(pathlib.Path(cypherl_path).read_text())
+            mm.run_update_query(pathlib.Path(cypherl_path).read_text(), history_repo_path)
             mm.update_embeddings(note_path)
 
         for note in tech_notes:
@@ -47,7 +89,7 @@ class Initializer:
             cypherl_path = os.path.join(
                 mock_cypherls_path, tech_repo_name, note) + '_cypherl.txt'
             cm_tech.add_file(note_path)
-            mm.run_update_query(pathlib.Path(cypherl_path).read_text())
+            mm.run_update_query(pathlib.Path(cypherl_path).read_text(), tech_repo_path)
             mm.update_embeddings(note_path)
 
         return
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import time
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+from core.knowledgebase.Metrics import Metrics
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback that times the LLM calls of an agent and counts their tokens."""
+
+    def __init__(self: LLMMetricsHandler, operation: str) -> None:
+        self.operation = operation
+        self.started: Dict[Any, float] = dict()
+        return
+
+    def on_llm_start(self: LLMMetricsHandler, serialized: Dict[str, Any], prompts: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self.started[run_id] = time.perf_counter()
+        return
+
+    def on_chat_model_start(self: LLMMetricsHandler, serialized: Dict[str, Any], messages: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self.started[run_id] = time.perf_counter()
+        return
+
+    def on_llm_end(self: LLMMetricsHandler, response: Any, *, run_id: Any, **kwargs: Any) -> None:
+        started = self.started.pop(run_id, None)
+        if started is None:
+            return
+        usage = dict()
+        if response.generations and response.generations[0]:
+            usage = Metrics.token_usage(getattr(response.generations[0][0], 'message', None))
+        if not usage:
+            # Older wrappers only report usage for the whole call
+            usage = Metrics.provider_token_usage(response.llm_output or {})
+        Metrics.observe_llm(self.operation, time.perf_counter() - started, usage)
+        return
+
+    def on_llm_error(self: LLMMetricsHandler, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        self.started.pop(run_id, None)
+        return
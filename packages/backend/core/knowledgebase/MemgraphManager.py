@@ -1,26 +1,108 @@
 from __future__ import annotations
-from typing import Optional, Dict, List, Any, Iterator
+from typing import Optional, Dict, List, Any, Iterator, Tuple
 
 import json
 import os
+import hashlib
+import sys
+import time
+import logging
+import threading
 from pathlib import Path
+from contextlib import contextmanager
 
-from gqlalchemy import Memgraph
+import mgclient
+import numpy as np
 
 from core.knowledgebase import constants
+from core.knowledgebase.Metrics import Metrics
+from core.knowledgebase.QueryLog import QueryLog
+from core.knowledgebase.CypherGuard import CypherGuard
 from core.knowledgebase.Utils import Utils
+from core.knowledgebase.EmbeddingCodec import EmbeddingCodec
 from core.knowledgebase.CypherQueryHandler import CypherQueryHandler as CQ
 from core.knowledgebase.notes.Embeddings import Embeddings
 
+logger = logging.getLogger(__name__)
+
+
+class MeteredMemgraph:
+    """
+    gqlalchemy connection that records the latency and row count of every query,
+    labelled with the name of the MemgraphManager method that ran it, and passes
+    slow queries on to the slow query log.
+    """
+
+    def __init__(self: MeteredMemgraph, db: Any) -> None:
+        self.db = db
+        return
+
+    @staticmethod
+    def _caller() -> str:
+        # Frame 0 is _caller, 1 is execute/execute_and_fetch, 2 is the method running the query
+        return sys._getframe(2).f_code.co_name
+
+    def execute(self: MeteredMemgraph, query: str, *args: Any, **kwargs: Any) -> None:
+        kind = MeteredMemgraph._caller()
+        start = time.perf_counter()
+        try:
+            self.db.execute(query, *args, **kwargs)
+        finally:
+            MeteredMemgraph._observe(kind, query, time.perf_counter() - start)
+        return
+
+    def execute_and_fetch(self: MeteredMemgraph, query: str, *args: Any, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        kind = MeteredMemgraph._caller()
+        return MeteredMemgraph._metered(kind, query, self.db.execute_and_fetch(query, *args, **kwargs))
+
+    @staticmethod
+    def _metered(kind: str, query: str, rows: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        # The query runs when the first row is requested, so timing starts there
+        start = time.perf_counter()
+        count = 0
+        try:
+            for row in rows:
+                count += 1
+                yield row
+        finally:
+            MeteredMemgraph._observe(kind, query, time.perf_counter() - start, count)
+        return
+
+    @staticmethod
+    def _observe(kind: str, query: str, seconds: float, rows: Optional[int] = None) -> None:
+        Metrics.observe_query(kind, seconds, rows)
+        QueryLog.record(kind, query, seconds, rows)
+        return
+
+    def __getattr__(self: MeteredMemgraph, name: str) -> Any:
+        return getattr(self.db, name)
+
 
 class MemgraphManager:
+    # Left out of change fingerprints: embeddings are versioned on their own, the rest is bookkeeping
+    UNVERSIONED_PROPERTIES = [EmbeddingCodec.PROPERTY, EmbeddingCodec.PACKED_PROPERTY, EmbeddingCodec.DTYPE_PROPERTY,
+                              'sync_version', 'sync_created_version', 'sync_hash']
+
     def __init__(self: MemgraphManager) -> None:
-        self.db = Memgraph(host=constants.MEMGRAPH_HOST,
-                           port=constants.MEMGRAPH_PORT)
+        self._db: Optional[MeteredMemgraph] = None
         return
 
-    def run_update_query(self: MemgraphManager, query: str) -> None:
-        self.db.execute(query)
+    @property
+    def db(self: MemgraphManager) -> MeteredMemgraph:
+        # gqlalchemy takes long to import, so it is loaded by the first query instead of at startup
+        if self._db is None:
+            from gqlalchemy import Memgraph
+            self._db = MeteredMemgraph(Memgraph(host=constants.MEMGRAPH_HOST,
+                                                port=constants.MEMGRAPH_PORT))
+        return self._db
+
+    def run_update_query(self: MemgraphManager, query: str, repo_path: Optional[str] = None,
+                         file_paths: Optional[List[str]] = None) -> None:
+        if repo_path is None:
+            self.db.execute(query)
+            return
+        with self.versioned_update(repo_path, file_paths):
+            self.db.execute(query)
         return
 
     def run_select_query(self: MemgraphManager, query: str) -> Iterator[Dict[str, Any]]:
@@ -28,8 +110,79 @@ class MemgraphManager:
         return res
 
     @staticmethod
-    def select_query_tool(query: str) -> List[Any]:
-        return list(MemgraphManager().run_select_query(query))
+    def select_query_tool(query: str) -> str:
+        """
+        Runs Cypher written by an agent: read-only single statements only, with a LIMIT added
+        if missing, a timeout, a row cap and a bounded result size. Returns the rendered rows.
+        """
+        error = CypherGuard.check(query)
+        if error is not None:
+            return error
+        max_rows = constants.AGENT_QUERY_MAX_ROWS
+        # One row more than shown, so cut-off results can be told apart from complete ones
+        rows = MemgraphManager._stream_guarded(CypherGuard.with_limit(query, max_rows + 1), max_rows + 1,
+                                               constants.AGENT_QUERY_TIMEOUT_SECONDS)
+        return CypherGuard.render(rows, max_rows, constants.AGENT_QUERY_TOKEN_BUDGET)
+
+    @staticmethod
+    def _stream_guarded(query: str, max_rows: int, timeout: float) -> Iterator[Dict[str, Any]]:
+        """
+        Like _stream_rows, but stops after max_rows and raises TimeoutError after timeout seconds.
+        Blocking operators (sorts, aggregations) return no page to check the clock on in between,
+        so a watchdog also terminates the transaction on the server when the time is up.
+        """
+        connection = mgclient.connect(host=constants.MEMGRAPH_HOST,
+                                      port=constants.MEMGRAPH_PORT,
+                                      lazy=True)
+        connection.autocommit = True
+        deadline = time.monotonic() + timeout
+        watchdog = threading.Timer(timeout, MemgraphManager._terminate_transactions, args=(query,))
+        watchdog.daemon = True
+        start = time.perf_counter()
+        count = 0
+        try:
+            watchdog.start()
+            cursor = connection.cursor()
+            cursor.execute(query)
+            columns = [column.name for column in cursor.description]
+            while count < max_rows:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"The query timed out after {timeout:g}s.")
+                rows = cursor.fetchmany(min(constants.EXPORT_PAGE_SIZE, max_rows - count))
+                if not rows:
+                    break
+                count += len(rows)
+                for row in rows:
+                    yield dict(zip(columns, row))
+        except mgclient.DatabaseError as e:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"The query timed out after {timeout:g}s.") from e
+            raise
+        finally:
+            watchdog.cancel()
+            connection.close()
+            MeteredMemgraph._observe('select_query_tool', query, time.perf_counter() - start, count)
+        return
+
+    @staticmethod
+    def _terminate_transactions(query: str) -> None:
+        """Terminates the running transactions that are executing query."""
+        connection = mgclient.connect(host=constants.MEMGRAPH_HOST, port=constants.MEMGRAPH_PORT)
+        connection.autocommit = True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SHOW TRANSACTIONS")
+            columns = [column.name for column in cursor.description]
+            ids = [row['transaction_id'] for row in (dict(zip(columns, r)) for r in cursor.fetchall())
+                   if query in (row.get('query') or [])]
+            if ids:
+                cursor.execute("TERMINATE TRANSACTIONS " + ', '.join(f'"{i}"' for i in ids))
+                cursor.fetchall()
+        except mgclient.DatabaseError:
+            logger.warning("Terminating a timed out agent query failed", exc_info=True)
+        finally:
+            connection.close()
+        return
 
     def check_if_db_empty(self: MemgraphManager) -> bool:
         query = CQ.get_check_if_db_empty_query()
@@ -47,26 +200,382 @@ class MemgraphManager:
         res = self.db.execute_and_fetch(query)
         return Utils.results_to_dictlist(res, 'file_specific_subgraph')
 
+    @staticmethod
+    def _stream_rows(query: str, page_size: int) -> Iterator[Dict[str, Any]]:
+        # A lazy connection pulls results from the server page by page instead of all at once
+        connection = mgclient.connect(host=constants.MEMGRAPH_HOST,
+                                      port=constants.MEMGRAPH_PORT,
+                                      lazy=True)
+        connection.autocommit = True
+        start = time.perf_counter()
+        count = 0
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            columns = [column.name for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    break
+                count += len(rows)
+                for row in rows:
+                    yield dict(zip(columns, row))
+        finally:
+            connection.close()
+            MeteredMemgraph._observe('stream_rows', query, time.perf_counter() - start, count)
+        return
+
+    def _stream_export(self: MemgraphManager, property_name: str, value: str) -> Iterator[Dict[str, Any]]:
+        value = Utils.escape_cypher_value(value)
+        page_size = constants.EXPORT_PAGE_SIZE
+        for row in MemgraphManager._stream_rows(CQ.get_stream_nodes_query(property_name, value), page_size):
+            yield Utils.node_row_to_dict(row)
+        for row in MemgraphManager._stream_rows(CQ.get_stream_edges_query(property_name, value), page_size):
+            yield Utils.edge_row_to_dict(row)
+        return
+
+    def stream_export_for_repo_path(self: MemgraphManager, repo_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the same node and edge dicts as export_data_for_repo_path, all nodes first,
+        without materializing the subgraph. Unlike the path-based export, nodes without
+        edges inside the repo are included.
+        """
+        return self._stream_export('repo_path', repo_path)
+
+    def stream_export_for_file_path(self: MemgraphManager, file_path: str) -> Iterator[Dict[str, Any]]:
+        return self._stream_export('file_path', file_path)
+
+    def stream_snapshot(self: MemgraphManager) -> Iterator[Dict[str, Any]]:
+        """Every node, with its embeddings, and every edge of the knowledge base, nodes first."""
+        page_size = constants.EXPORT_PAGE_SIZE
+        for row in MemgraphManager._stream_rows(CQ.get_snapshot_nodes_query(), page_size):
+            yield Utils.node_row_to_dict(row)
+        for row in MemgraphManager._stream_rows(CQ.get_snapshot_edges_query(), page_size):
+            yield Utils.edge_row_to_dict(row)
+        return
+
+    def sync_versions(self: MemgraphManager) -> Dict[str, int]:
+        return {res['repo']: res['version'] for res in self.db.execute_and_fetch(CQ.get_snapshot_sync_versions_query())}
+
+    def restore_snapshot(self: MemgraphManager, records: List[Dict[str, Any]], sync_versions: Dict[str, int]) -> None:
+        """
+        Bulk loads node and edge dicts, as decoded by CompactExporter.decode with embeddings, into an
+        empty database: one UNWIND per batch of nodes with the same labels or edges of the same type.
+        Nodes get new ids; embeddings are stored as configured by NODE_EMBEDDINGS_STORAGE.
+        """
+        codec = EmbeddingCodec()
+        nodes_by_labels: Dict[Tuple[str, ...], List[Dict[str, Any]]] = dict()
+        edges_by_label: Dict[str, List[Dict[str, Any]]] = dict()
+        for record in records:
+            if record['type'] != 'node':
+                edges_by_label.setdefault(record['label'], []).append(
+                    {"start": record['start'], "end": record['end'], "properties": record['properties']})
+                continue
+            properties = dict(record['properties'])
+            embeddings = record.get('embeddings')
+            if embeddings is not None and codec.compact:
+                properties[EmbeddingCodec.PACKED_PROPERTY] = codec.encode(embeddings)
+                properties[EmbeddingCodec.DTYPE_PROPERTY] = codec.storage.value
+            elif embeddings is not None:
+                properties[EmbeddingCodec.PROPERTY] = embeddings.tolist()
+            nodes_by_labels.setdefault(tuple(sorted(record['labels'])), []).append(
+                {"id": record['id'], "properties": properties})
+
+        batch_size = constants.SNAPSHOT_BATCH_SIZE
+        create_index, drop_index = CQ.get_restore_index_queries()
+        self.db.execute(create_index)
+        try:
+            for labels, rows in nodes_by_labels.items():
+                query = CQ.get_restore_nodes_query(list(labels))
+                for start in range(0, len(rows), batch_size):
+                    self.db.execute(query, {"rows": rows[start:start + batch_size]})
+            for label, rows in edges_by_label.items():
+                query = CQ.get_restore_edges_query(label)
+                for start in range(0, len(rows), batch_size):
+                    self.db.execute(query, {"rows": rows[start:start + batch_size]})
+            self.db.execute(CQ.get_finish_restore_query())
+        except Exception:
+            # Without its edges or the rest of the nodes, a partial load is worse than none
+            self.discard_restore()
+            raise
+        self.db.execute(drop_index)
+
+        self.db.execute(CQ.get_restore_sync_versions_query(),
+                        {"rows": [{"repo": repo, "version": version} for repo, version in sync_versions.items()]})
+        if any('Symbol' in labels for labels in nodes_by_labels):
+            self.create_symbol_index()
+        return
+
+    def discard_restore(self: MemgraphManager) -> None:
+        """Removes what an interrupted restore_snapshot left behind: the nodes it loaded and its index."""
+        self.db.execute(CQ.get_discard_restore_query())
+        _, drop_index = CQ.get_restore_index_queries()
+        try:
+            self.db.execute(drop_index)
+        except mgclient.DatabaseError:
+            # The index is already gone if the restore failed before creating it or after dropping it
+            pass
+        return
+
+    def neighbourhood(self: MemgraphManager, node_ids: List[int], depth: int, max_nodes: int,
+                      relationship_types: Optional[List[str]] = None,
+                      repo_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Nodes within `depth` hops of the given nodes, closest first and at most max_nodes
+        of them including the start nodes, plus the edges between them. Relationship
+        types and the repo restrict which edges and nodes the search may cross.
+        `truncated` is set when the cap cut nodes or edges off.
+        """
+        start_ids = list(dict.fromkeys(int(i) for i in node_ids))[:max_nodes]
+        escaped_types = None
+        if relationship_types is not None:
+            escaped_types = [Utils.escape_cypher_value(t) for t in relationship_types]
+        escaped_repo_path = None if repo_path is None else Utils.escape_cypher_value(repo_path)
+
+        ids = list(start_ids)
+        truncated = len(start_ids) < len(set(node_ids))
+        # Expanded one hop per query, each limited to the room left under the cap, so a
+        # hub node never makes the database walk more of the graph than can be returned
+        frontier = list(start_ids)
+        for _ in range(depth):
+            if not frontier or truncated:
+                break
+            remaining = max_nodes - len(ids)
+            # One extra row tells whether the cap cut anything off
+            query = CQ.get_neighbour_node_ids_query(
+                frontier, ids, remaining + 1, escaped_types, escaped_repo_path)
+            found = sorted(res['id'] for res in self.db.execute_and_fetch(query))
+            if len(found) > remaining:
+                truncated = True
+                found = found[:remaining]
+            ids.extend(found)
+            frontier = found
+
+        subgraph = self.subgraph_for_nodes(ids, relationship_types)
+        subgraph['truncated'] = subgraph['truncated'] or truncated
+        return subgraph
+
+    def subgraph_for_nodes(self: MemgraphManager, node_ids: List[int],
+                           relationship_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """The given nodes, without embeddings, and up to NEIGHBOURHOOD_MAX_EDGES edges between them."""
+        ids = [int(i) for i in node_ids]
+        escaped_types = None
+        if relationship_types is not None:
+            escaped_types = [Utils.escape_cypher_value(t) for t in relationship_types]
+        nodes = []
+        if ids:
+            for res in self.db.execute_and_fetch(CQ.get_nodes_by_ids_query(ids)):
+                node = Utils.node_row_to_dict(res)
+                EmbeddingCodec.pop_from_properties(node['properties'])
+                nodes.append(node)
+        edges, truncated = [], False
+        if len(ids) > 1:
+            max_edges = constants.NEIGHBOURHOOD_MAX_EDGES
+            query = CQ.get_edges_between_query(ids, max_edges + 1, escaped_types)
+            edges = [Utils.edge_row_to_dict(res) for res in self.db.execute_and_fetch(query)]
+            if len(edges) > max_edges:
+                truncated = True
+                edges = edges[:max_edges]
+        return {"nodes": nodes, "edges": edges, "truncated": truncated}
+
+    def repo_structure(self: MemgraphManager, repo_path: str) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, Tuple[int, int]]]:
+        """Label and name of every node of the repo, and the (start, end) of every edge inside it by edge id."""
+        escaped_repo_path = Utils.escape_cypher_value(repo_path)
+        page_size = constants.EXPORT_PAGE_SIZE
+        nodes = {row['id']: {"label": row['label'], "name": row['name']}
+                 for row in MemgraphManager._stream_rows(CQ.get_structure_nodes_query(escaped_repo_path), page_size)}
+        edges = {row['id']: (row['start'], row['end'])
+                 for row in MemgraphManager._stream_rows(CQ.get_structure_edges_query(escaped_repo_path), page_size)}
+        return nodes, edges
+
     def delete_all(self: MemgraphManager) -> None:
         query = CQ.get_delete_all_query()
         self.db.execute(query)
+        self.db.execute(CQ.get_reset_all_sync_versions_query())
         return
 
     def delete_all_for_repo(self: MemgraphManager, repo_path: str) -> None:
         query = CQ.get_delete_all_for_repo_query(repo_path)
         self.db.execute(query)
+        self._bump_sync_version(repo_path, reset=True)
         return
 
     def delete_graph_for_file(self: MemgraphManager, file_path: str) -> None:
+        query = CQ.get_graph_ids_for_file_query(file_path)
+        for res in list(self.db.execute_and_fetch(query)):
+            if res['repo_path'] is not None:
+                self._bump_sync_version(
+                    res['repo_path'], deleted_node_ids=res['node_ids'], deleted_edge_ids=res['edge_ids'])
         query = CQ.get_delete_graph_for_file_query(file_path)
         self.db.execute(query)
         return
 
     def rename_file(self: MemgraphManager, old_file_path: str, new_file_path: str) -> None:
-        query = CQ.get_rename_file_query(old_file_path, new_file_path)
+        query = CQ.get_repo_paths_for_file_query(old_file_path)
+        repo_paths = next(self.db.execute_and_fetch(query))['repo_paths']
+        sync_version = 0
+        for repo_path in repo_paths:
+            sync_version = max(sync_version, self._bump_sync_version(repo_path))
+        query = CQ.get_rename_file_query(old_file_path, new_file_path, sync_version)
+        self.db.execute(query)
+        return
+
+    def delete_graph_for_files(self: MemgraphManager, file_paths: List[str]) -> None:
+        """Set-based variant of delete_graph_for_file."""
+        if not file_paths:
+            return
+        escaped_paths = [Utils.escape_cypher_value(p) for p in file_paths]
+        query = CQ.get_graph_ids_for_files_query(escaped_paths)
+        for res in list(self.db.execute_and_fetch(query)):
+            if res['repo_path'] is not None:
+                self._bump_sync_version(
+                    res['repo_path'], deleted_node_ids=res['node_ids'], deleted_edge_ids=res['edge_ids'])
+        query = CQ.get_delete_graph_for_files_query(escaped_paths)
         self.db.execute(query)
         return
 
+    def rename_files(self: MemgraphManager, renames: List[Tuple[str, str]]) -> None:
+        """Set-based variant of rename_file; all renames are applied at once."""
+        if not renames:
+            return
+        escaped_renames = [(Utils.escape_cypher_value(old), Utils.escape_cypher_value(new))
+                           for old, new in renames]
+        query = CQ.get_repo_paths_for_files_query([old for old, _ in escaped_renames])
+        repo_paths = next(self.db.execute_and_fetch(query))['repo_paths']
+        sync_version = 0
+        for repo_path in repo_paths:
+            sync_version = max(sync_version, self._bump_sync_version(repo_path))
+        for query in CQ.get_rename_files_queries(escaped_renames, sync_version):
+            self.db.execute(query)
+        return
+
+    def neighbour_file_paths(self: MemgraphManager, file_paths: List[str]) -> List[str]:
+        """Files with nodes connected to nodes of the given files."""
+        if not file_paths:
+            return []
+        query = CQ.get_neighbour_file_paths_query([Utils.escape_cypher_value(p) for p in file_paths])
+        return next(self.db.execute_and_fetch(query))['file_paths']
+
+    def _bump_sync_version(self: MemgraphManager, repo_path: str, deleted_node_ids: Optional[List[int]] = None,
+                           deleted_edge_ids: Optional[List[int]] = None, reset: bool = False) -> int:
+        escaped_repo_path = Utils.escape_cypher_value(repo_path)
+        query = CQ.get_bump_sync_version_query(escaped_repo_path, constants.SYNC_TOMBSTONE_RETENTION, reset)
+        res = next(self.db.execute_and_fetch(query))
+        tombstones = ([{"kind": "node", "id": i} for i in deleted_node_ids or []] +
+                      [{"kind": "relationship", "id": i} for i in deleted_edge_ids or []])
+        if tombstones:
+            self.db.execute(CQ.get_add_tombstones_query(escaped_repo_path, res['version']), {"rows": tombstones})
+        if res['floor_version'] > res['previous_floor_version']:
+            self.db.execute(CQ.get_prune_tombstones_query(escaped_repo_path, res['floor_version']))
+        return res['version']
+
+    def record_sync_version(self: MemgraphManager, repo_path: str,
+                            changed: Optional[List[Tuple[str, int]]] = None) -> int:
+        """
+        Starts a new change version for the repo and stamps it on all not yet versioned nodes
+        and edges, and on the already versioned ones in `changed` ((type, id) pairs).
+        """
+        sync_version = self._bump_sync_version(repo_path)
+        for query in CQ.get_stamp_sync_version_queries(Utils.escape_cypher_value(repo_path), sync_version):
+            self.db.execute(query)
+        if changed:
+            node_ids = [id for kind, id in changed if kind == 'node']
+            edge_ids = [id for kind, id in changed if kind == 'relationship']
+            for query in CQ.get_restamp_sync_version_queries(node_ids, edge_ids, sync_version):
+                self.db.execute(query)
+        return sync_version
+
+    @staticmethod
+    def _fingerprint(label: Any, properties: List[List[Any]]) -> str:
+        # Stored on the element and compared in later processes, so not hash(), which is salted per process
+        return hashlib.sha1(repr((label, sorted(map(tuple, properties)))).encode()).hexdigest()[:16]
+
+    def _changed_in_scope(self: MemgraphManager, repo_path: str,
+                          file_paths: List[str]) -> Tuple[List[Tuple[str, int]], Dict[str, List[Dict[str, Any]]]]:
+        """
+        Versioned nodes and edges near the files whose content differs from the fingerprint stored
+        when they were last stamped, and the new fingerprints of everything in that scope.
+        """
+        escaped_repo_path = Utils.escape_cypher_value(repo_path)
+        escaped_paths = [Utils.escape_cypher_value(p) for p in file_paths]
+        queries = {
+            'node': CQ.get_scope_nodes_query(escaped_repo_path, escaped_paths, MemgraphManager.UNVERSIONED_PROPERTIES),
+            'relationship': CQ.get_scope_edges_query(escaped_repo_path, escaped_paths,
+                                                     MemgraphManager.UNVERSIONED_PROPERTIES),
+        }
+        changed = []
+        fingerprints: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in queries}
+        for kind, query in queries.items():
+            for res in self.db.execute_and_fetch(query):
+                fingerprint = MemgraphManager._fingerprint(res['label'], res['properties'])
+                if res['sync_hash'] == fingerprint:
+                    continue
+                # Unversioned elements are new; record_sync_version stamps them as added
+                if res['sync_version'] is not None:
+                    changed.append((kind, res['id']))
+                fingerprints[kind].append({"id": res['id'], "hash": fingerprint})
+        return changed, fingerprints
+
+    @contextmanager
+    def versioned_update(self: MemgraphManager, repo_path: str,
+                         file_paths: Optional[List[str]] = None) -> Iterator[None]:
+        """
+        Records a new change version for everything the block writes to the repo. Update queries
+        from the LLM can SET properties and labels on nodes that already have a version. These are
+        found among the nodes of the written files, their neighbours and the edges between them, by
+        comparing each with the fingerprint stored on it, and stamped as changed.
+        """
+        yield
+        changed, fingerprints = [], dict()
+        if file_paths:
+            changed, fingerprints = self._changed_in_scope(repo_path, file_paths)
+        self.record_sync_version(repo_path, changed)
+        node_query, edge_query = CQ.get_set_sync_hash_queries()
+        for query, kind in ((node_query, 'node'), (edge_query, 'relationship')):
+            if fingerprints.get(kind):
+                self.db.execute(query, {"rows": fingerprints[kind]})
+        return
+
+    def get_sync_state(self: MemgraphManager, repo_path: str) -> Dict[str, int]:
+        query = CQ.get_sync_state_query(Utils.escape_cypher_value(repo_path))
+        res = next(self.db.execute_and_fetch(query), None)
+        if res is None:
+            return {"version": 0, "floor_version": 0, "embeddings_version": 0}
+        return {"version": res['version'], "floor_version": res['floor_version'],
+                "embeddings_version": res['embeddings_version'] or 0}
+
+    def export_changes_for_repo_path(self: MemgraphManager, repo_path: str, since: int) -> Dict[str, Any]:
+        """
+        Nodes and edges of the repo added, changed or deleted after version `since`.
+        If the changes since that version are no longer known, `reset` is set and the
+        client has to reload the full export.
+        """
+        state = self.get_sync_state(repo_path)
+        changes = {
+            "version": state['version'],
+            "since": since,
+            "reset": since < state['floor_version'] or since > state['version'],
+            "added": [],
+            "changed": [],
+            "deleted": [],
+        }
+        if changes['reset'] or since == state['version']:
+            return changes
+
+        escaped_repo_path = Utils.escape_cypher_value(repo_path)
+        for res in self.db.execute_and_fetch(CQ.get_changed_nodes_query(escaped_repo_path, since)):
+            node = Utils.node_row_to_dict(res)
+            EmbeddingCodec.pop_from_properties(node['properties'])
+            created = node['properties'].get('sync_created_version', 0) > since
+            changes['added' if created else 'changed'].append(node)
+        for res in self.db.execute_and_fetch(CQ.get_changed_edges_query(escaped_repo_path, since)):
+            edge = Utils.edge_row_to_dict(res)
+            created = edge['properties'].get('sync_created_version', 0) > since
+            changes['added' if created else 'changed'].append(edge)
+        for res in self.db.execute_and_fetch(CQ.get_tombstones_query(escaped_repo_path, since)):
+            changes['deleted'].append({"id": res['id'], "type": res['kind']})
+        return changes
+
     @staticmethod
     def print_type_and_obj(type: str, obj: Optional[str]) -> str:
         if obj is None:
@@ -74,34 +583,46 @@ class MemgraphManager:
         return f"{type}: {obj}"
 
     def describe_node(self: MemgraphManager, id: int) -> str:
-        query = CQ.get_node_description_query(id)
-        results = self.db.execute_and_fetch(query)
-        res = next(results)
-        out = ""
-        _, node_type, node_name = res['Node_ID'], res['Node_Type'], res['Node_Name']
-        out += f"{MemgraphManager.print_type_and_obj(node_type, node_name)}\n"
-        for conn in res['In_Connections']:
-            rel_type = conn['Relationship_Type']
-            if rel_type is None:
-                continue
-            neighbour_type, neighbour_name = conn['Neighbour_Type'], conn['Neighbour_Name']
-            out += f"{MemgraphManager.print_type_and_obj(node_type, node_name)} "
-            out += f"{rel_type} "
-            out += f"{MemgraphManager.print_type_and_obj(neighbour_type, neighbour_name)}\n"
-        for conn in res['Out_Connections']:
-            rel_type = conn['Relationship_Type']
-            if rel_type is None:
-                continue
-            neighbour_type, neighbour_name = conn['Neighbour_Type'], conn['Neighbour_Name']
-            out += f"{MemgraphManager.print_type_and_obj(neighbour_type, neighbour_name)} "
-            out += f"{rel_type} "
-            out += f"{MemgraphManager.print_type_and_obj(node_type, node_name)}\n"
-        return out
+        return self.describe_nodes([id]).get(id, "")
+
+    def describe_nodes(self: MemgraphManager, ids: List[int], max_neighbours: Optional[int] = None) -> Dict[int, str]:
+        """
+        Descriptions of several nodes from one query. At most max_neighbours outgoing and
+        max_neighbours incoming relationships are listed per node; the rest are counted.
+        """
+        if not ids:
+            return dict()
+        max_neighbours = max_neighbours or constants.DESCRIBE_MAX_NEIGHBOURS
+        query = CQ.get_nodes_description_query([int(i) for i in ids], max_neighbours)
+        descriptions = dict()
+        for res in self.db.execute_and_fetch(query):
+            node = MemgraphManager.print_type_and_obj(res['Node_Type'], res['Node_Name'])
+            lines = [node]
+            for conn in res['Out_Connections']:
+                if conn['Relationship_Type'] is None:
+                    continue
+                neighbour = MemgraphManager.print_type_and_obj(conn['Neighbour_Type'], conn['Neighbour_Name'])
+                lines.append(f"{node} {conn['Relationship_Type']} {neighbour}")
+            if res['Out_Degree'] > max_neighbours:
+                lines.append(f"... and {res['Out_Degree'] - max_neighbours} more outgoing relationships")
+            for conn in res['In_Connections']:
+                if conn['Relationship_Type'] is None:
+                    continue
+                neighbour = MemgraphManager.print_type_and_obj(conn['Neighbour_Type'], conn['Neighbour_Name'])
+                lines.append(f"{neighbour} {conn['Relationship_Type']} {node}")
+            if res['In_Degree'] > max_neighbours:
+                lines.append(f"... and {res['In_Degree'] - max_neighbours} more incoming relationships")
+            descriptions[res['Node_ID']] = '\n'.join(lines) + '\n'
+        return descriptions
 
     def strings_to_embed_by_id(self: MemgraphManager, file_path: str) -> Dict[str, str]:
-        strings_by_id = dict()
         query = CQ.get_strings_to_embed_query(file_path)
         results = self.db.execute_and_fetch(query)
+        return MemgraphManager._strings_by_id(results)
+
+    @staticmethod
+    def _strings_by_id(results: Iterator[Dict[str, Any]]) -> Dict[str, str]:
+        strings_by_id = dict()
         for res in results:
             out = ""
             node_id, node_type, node_name = res['Node_ID'], res['Node_Type'], res['Node_Name']
@@ -123,20 +644,42 @@ class MemgraphManager:
 
     def update_embeddings(self: MemgraphManager, file_path: str) -> None:
         emb_by_id = self.embeddings_by_id(file_path)
-        for id in emb_by_id.keys():
-            emb = emb_by_id[id]
-            query = CQ.get_set_embeddings_query(id, emb)
-            self.db.execute(query)
+        self._write_embeddings(list(emb_by_id.keys()), list(emb_by_id.values()))
         return
 
-    def create_temp_nodes(self: MemgraphManager, emb_vector: List[float]) -> None:
-        query = CQ.get_tmp_create_query(emb_vector)
-        self.db.execute(query)
+    def _write_embeddings(self: MemgraphManager, ids: List[int], embeddings: List[List[float]]) -> None:
+        codec = EmbeddingCodec()
+        batch_size = constants.EMBEDDINGS_WRITE_BATCH_SIZE
+        repo_paths = set()
+        for start in range(0, len(ids), batch_size):
+            batch_ids, batch_embeddings = ids[start:start + batch_size], embeddings[start:start + batch_size]
+            if codec.compact:
+                packed = {id: codec.encode(emb) for id, emb in zip(batch_ids, batch_embeddings)}
+                query = CQ.get_set_packed_embeddings_batch_query(packed, codec.storage.value)
+            else:
+                query = CQ.get_set_embeddings_batch_query(dict(zip(batch_ids, batch_embeddings)))
+            repo_paths.update(res['repo_path'] for res in self.db.execute_and_fetch(query))
+        repo_paths.discard(None)
+        if repo_paths:
+            # Lets cached vector indexes of these repos notice the new embeddings
+            query = CQ.get_bump_embeddings_version_query(
+                [Utils.escape_cypher_value(p) for p in sorted(repo_paths)])
+            self.db.execute(query)
         return
 
-    def delete_temp_nodes(self: MemgraphManager) -> None:
-        query = CQ.get_tmp_delete_query()
-        self.db.execute(query)
+    def update_embeddings_for_files(self: MemgraphManager, file_paths: List[str]) -> None:
+        """
+        Batch variant of update_embeddings: one query for the strings to embed,
+        one embedding call and batched writes.
+        """
+        if not file_paths:
+            return
+        query = CQ.get_strings_to_embed_for_files_query(
+            [Utils.escape_cypher_value(p) for p in sorted(set(file_paths))])
+        strings_by_id = self._strings_by_id(self.db.execute_and_fetch(query))
+        ids = list(strings_by_id.keys())
+        embeddings = Embeddings.get_embeddings([strings_by_id[id] for id in ids])
+        self._write_embeddings(ids, embeddings)
         return
 
     def get_schema_for_repo(self: MemgraphManager, repo_path: str) -> str:
@@ -145,15 +688,57 @@ class MemgraphManager:
         res = self.db.execute_and_fetch(query)
         return next(res)['schema']
 
-    def vector_search_query(self: MemgraphManager) -> List[Any]:
-        query = CQ.get_vector_search_query()
-        res = self.db.execute_and_fetch(query)
-        return list(res)
+    def embeddings_for_nodes(self: MemgraphManager, node_ids: List[int]) -> Dict[int, List[float]]:
+        query = CQ.get_embeddings_for_nodes_query([int(i) for i in node_ids])
+        out = dict()
+        for res in self.db.execute_and_fetch(query):
+            emb = EmbeddingCodec.decode_row(res)
+            if emb is not None:
+                out[res['id']] = emb.tolist()
+        return out
+
+    def _embedding_matrix(self: MemgraphManager, query: str) -> Tuple[List[int], np.ndarray]:
+        ids, embeddings = [], []
+        for res in self.db.execute_and_fetch(query):
+            ids.append(res['id'])
+            embeddings.append(EmbeddingCodec.decode_row(res))
+        if not embeddings:
+            return ids, np.zeros((0, 0), dtype=np.float32)
+        return ids, np.stack(embeddings)
+
+    def node_embeddings_for_repo(self: MemgraphManager, repo_path: str) -> Tuple[List[int], np.ndarray]:
+        """Ids and float32 embedding matrix (one row per node) of the repo's embedded nodes."""
+        return self._embedding_matrix(CQ.get_node_embeddings_for_repo_query(Utils.escape_cypher_value(repo_path)))
+
+    def create_symbol_index(self: MemgraphManager) -> None:
+        for query in CQ.get_create_symbol_index_queries():
+            self.db.execute(query)
+        return
+
+    def find_symbol_definitions(self: MemgraphManager, repo_path: str, name: str) -> str:
+        name = name.strip().strip('`"\'')
+        # Dotted names are looked up by their last component and filtered by qualname
+        short_name = name.split('.')[-1]
+        query = CQ.get_symbol_definition_query(
+            Utils.escape_cypher_value(repo_path), Utils.escape_cypher_value(short_name))
+        out = ""
+        for res in self.db.execute_and_fetch(query):
+            if '.' in name and not res['Qualname'].endswith(name):
+                continue
+            kind = [label for label in res['Labels'] if label != 'Symbol'][0]
+            if res['Lineno'] is None:
+                out += f"{kind} {res['Qualname']} defined in {res['Path']}\n"
+            else:
+                out += f"{kind} {res['Qualname']} defined in {res['Path']}, lines {res['Lineno']}-{res['End_Lineno']}\n"
+        if not out:
+            return f"No definition of {name} found."
+        return out
 
-    def embeddings_for_node(self: MemgraphManager, node_id: int) -> List[float]:
+    def embeddings_for_node(self: MemgraphManager, node_id: int) -> Optional[List[float]]:
         query = CQ.get_embeddings_for_node_query(node_id)
         res = self.db.execute_and_fetch(query)
-        return next(res)['embeddings']
+        emb = EmbeddingCodec.decode_row(next(res))
+        return None if emb is None else emb.tolist()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, Optional
+
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+
+class Metrics:
+    """
+    Prometheus metrics of the backend, served by the /metrics route.
+
+    Every external call (LLM, Memgraph, Chroma, embedding model) and every route
+    is timed into a histogram, so a slow request can be attributed to a stage.
+    Recording a sample costs a few microseconds, far below the calls it measures.
+    """
+
+    LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                       1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+    COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000, 100000)
+
+    llm_seconds = Histogram(
+        'odin_llm_request_seconds', 'Latency of LLM calls',
+        ['operation'], buckets=LATENCY_BUCKETS)
+    llm_tokens = Counter(
+        'odin_llm_tokens', 'Tokens sent to (prompt) and generated by (completion) the LLM',
+        ['operation', 'kind'])
+
+    memgraph_seconds = Histogram(
+        'odin_memgraph_query_seconds', 'Latency of Memgraph queries, until the last row is read',
+        ['kind'], buckets=LATENCY_BUCKETS)
+    memgraph_rows = Histogram(
+        'odin_memgraph_query_rows', 'Rows returned by Memgraph queries',
+        ['kind'], buckets=COUNT_BUCKETS)
+
+    chroma_seconds = Histogram(
+        'odin_chroma_seconds', 'Latency of Chroma collection operations, including embedding',
+        ['operation'], buckets=LATENCY_BUCKETS)
+
+    embedding_seconds = Histogram(
+        'odin_embedding_seconds', 'Latency of embedding model calls',
+        ['source'], buckets=LATENCY_BUCKETS)
+    embedding_batch_size = Histogram(
+        'odin_embedding_batch_size', 'Texts per embedding model call',
+        ['source'], buckets=COUNT_BUCKETS)
+
+    http_seconds = Histogram(
+        'odin_http_request_seconds', 'Latency of API routes, until the response starts',
+        ['method', 'route', 'status'], buckets=LATENCY_BUCKETS)
+
+    query_cache_size = Gauge('odin_query_embedding_cache_size', 'Entries in the query embedding cache')
+    query_cache_hit_rate = Gauge('odin_query_embedding_cache_hit_rate', 'Hit rate of the query embedding cache')
+
+    CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+    @staticmethod
+    def render() -> bytes:
+        return generate_latest()
+
+    @staticmethod
+    @contextmanager
+    def time_embedding(source: str, batch_size: int) -> Iterator[None]:
+        Metrics.embedding_batch_size.labels(source=source).observe(batch_size)
+        with Metrics.embedding_seconds.labels(source=source).time():
+            yield
+        return
+
+    @staticmethod
+    def observe_query(kind: str, seconds: float, rows: Optional[int] = None) -> None:
+        Metrics.memgraph_seconds.labels(kind=kind).observe(seconds)
+        if rows is not None:
+            Metrics.memgraph_rows.labels(kind=kind).observe(rows)
+        return
+
+    @staticmethod
+    def token_usage(message: Any) -> Dict[str, int]:
+        """Prompt and completion token counts of a chat model reply, as far as the provider reports them."""
+        usage = getattr(message, 'usage_metadata', None)
+        if usage:
+            return {"prompt": usage.get('input_tokens', 0), "completion": usage.get('output_tokens', 0)}
+        return Metrics.provider_token_usage(getattr(message, 'response_metadata', None) or {})
+
+    @staticmethod
+    def provider_token_usage(metadata: Dict[str, Any]) -> Dict[str, int]:
+        if metadata.get('token_usage'):  # OpenAI
+            usage = metadata['token_usage']
+            return {"prompt": usage.get('prompt_tokens', 0), "completion": usage.get('completion_tokens', 0)}
+        if 'eval_count' in metadata:  # Ollama
+            return {"prompt": metadata.get('prompt_eval_count', 0), "completion": metadata.get('eval_count', 0)}
+        return dict()
+
+    @staticmethod
+    def observe_llm(operation: str, seconds: float, usage: Dict[str, int]) -> None:
+        Metrics.llm_seconds.labels(operation=operation).observe(seconds)
+        for kind, count in usage.items():
+            Metrics.llm_tokens.labels(operation=operation, kind=kind).inc(count or 0)
+        return
+
+    @staticmethod
+    def watch_query_cache(cache: Any) -> None:
+        """Reads the gauges of a QueryEmbeddingCache from its stats() at scrape time."""
+        Metrics.query_cache_size.set_function(lambda: cache.stats()['size'])
+        Metrics.query_cache_hit_rate.set_function(lambda: cache.stats()['hit_rate'])
+        return
+
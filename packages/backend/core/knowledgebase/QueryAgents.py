@@ -12,8 +12,10 @@ from langchain.memory import ConversationBufferMemory
 from langchain.schema import SystemMessage
 
 from core.knowledgebase import constants
+from core.knowledgebase.LLMMetricsHandler import LLMMetricsHandler
 from core.knowledgebase.MemgraphManager import MemgraphManager
 from core.knowledgebase.notes.Searcher import Searcher
+from core.knowledgebase.code.RepoFileIndex import RepoFileIndex
 
 
 class GeneralQueryAgent:
@@ -30,7 +32,9 @@ class GeneralQueryAgent:
             self.llm = ChatOllama(
                 model=constants.LLM_MODEL_NAME,
                 temperature=constants.LLM_MODEL_TEMPERATURE,
-                base_url=constants.OLLAMA_BASE_URL
+                base_url=constants.OLLAMA_BASE_URL,
+                keep_alive=constants.OLLAMA_KEEP_ALIVE,
+                callbacks=[LLMMetricsHandler('agent')]
             )
             # Use simpler ZERO_SHOT_REACT agent which works better with Ollama
             self.agent_type = AgentType.ZERO_SHOT_REACT_DESCRIPTION
@@ -39,7 +43,8 @@ class GeneralQueryAgent:
             self.llm = ChatOpenAI(
                 temperature=constants.LLM_MODEL_TEMPERATURE,
                 openai_api_key=constants.OPENAI_API_KEY,
-                model_name=constants.LLM_MODEL_NAME
+                model_name=constants.LLM_MODEL_NAME,
+                callbacks=[LLMMetricsHandler('agent')]
             )
             self.agent_type = AgentType.OPENAI_FUNCTIONS
 
@@ -57,7 +62,8 @@ class GeneralQueryAgent:
             description=f"""Useful when you want to run Cypher queries on the knowledge graph. 
                 Note that the input has to be valid Cypher. Consult the graph schema in order to know how to write correct queries. 
                 Pay attention to the repo_path attribute.
-                Returns results of executing the query."""
+                Only read-only queries are allowed and results are capped, so filter or aggregate instead of returning whole subgraphs.
+                Returns results of executing the query, one row per line."""
         )
 
         self.tools = tools + [self.run_cypher_query]
@@ -126,38 +132,45 @@ class CodeQueryAgent(GeneralQueryAgent):
 
     def __init__(self: CodeQueryAgent, repo_path: str) -> None:
 
+        file_index = RepoFileIndex.for_repo(repo_path)
+
         read_file = Tool.from_function(
-            func=lambda p: Path(p).read_text(),
+            func=file_index.read_file,
             name="read_file",
-            description="""Useful for when you want to read the entire contents of a text file. 
-            Provide the tool with the absolute path of the file you want to read.""",
+            description="""Useful for when you want to read a text file, one page of lines at a time.
+            Input: <path> [--lines START-END], where the path is absolute or relative to the repository root.
+            Returns numbered lines; long output is cut and tells you which --lines to request next.""",
+        )
+
+        grep = Tool.from_function(
+            func=file_index.grep,
+            name="grep",
+            description="""Useful for when you want to find which files and lines contain some text.
+            Input: <regex> [--include GLOB], e.g. `def main --include *.py`.
+            Returns matching lines as path:line: text."""
         )
 
         listdir = Tool.from_function(
-            func=CodeQueryAgent.list_files,
+            func=file_index.listdir,
             name="listdir",
-            description="""Useful for when you want to find out the directory structure of the repository, and to know where a file is located."""
+            description="""Useful for when you want to find out the directory structure of the repository, and to know where a file is located.
+            Input: [<directory>] [--depth N], where depth defaults to 2. Files ignored by .gitignore are not listed."""
         )
 
-        code_tools = [read_file, listdir]
+        mm = MemgraphManager()
+        find_definition = Tool.from_function(
+            func=lambda name: mm.find_symbol_definitions(repo_path, name),
+            name="find_definition",
+            description="""Useful for when you want to know where a class, function or module is defined.
+            Provide the tool with the symbol name, optionally qualified with its module (e.g. package.module.Class.method).
+            Returns the kind, qualified name, file path and line range of every matching definition."""
+        )
+
+        code_tools = [read_file, grep, listdir, find_definition]
         super().__init__(repo_path, code_tools)
 
         return
 
-    @staticmethod
-    def list_files(startpath: str) -> str:
-        out = ""
-        for root, dirs, files in os.walk(startpath):
-            if '.git' in dirs:
-                dirs.remove('.git')
-            level = root.replace(startpath, '').count(os.sep)
-            indent = ' ' * 4 * (level)
-            out += '{}{}/\n'.format(indent, os.path.basename(root))
-            subindent = ' ' * 4 * (level + 1)
-            for f in files:
-                out += '{}{}\n'.format(subindent, f)
-        return out
-
 
 if __name__ == '__main__':
 
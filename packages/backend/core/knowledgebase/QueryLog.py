@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import Dict, List, Any, Optional, Iterator
+
+import re
+import os
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor
+
+from core.knowledgebase import constants
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog:
+    """
+    Slow query log. Queries that take longer than SLOW_QUERY_SECONDS are written as
+    JSON lines to a rotating file, together with their normalized shape, the context
+    they ran in (route, file and repo) and their EXPLAIN or PROFILE plan.
+
+    Plans are captured on a background thread, so logging never adds to the latency of
+    the request that ran the slow query. PROFILE executes the query again, so it is only
+    used for read-only queries; writes always get EXPLAIN.
+    """
+
+    _context: ContextVar[Dict[str, str]] = ContextVar('query_context', default={})
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-log')
+    _file_logger: Optional[logging.Logger] = None
+    _lock = threading.Lock()
+
+    WRITE_CLAUSES = re.compile(r'\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|DETACH|FOREACH|LOAD\s+CSV|CALL)\b',
+                               re.IGNORECASE)
+    # String literals, quoted names and comments, matched in one pass, so quotes inside
+    # comments and comment markers inside strings are both taken literally
+    LEXEMES = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*(?:.*?\*/|.*)",
+                         re.DOTALL)
+
+    @staticmethod
+    @contextmanager
+    def context(**fields: Optional[str]) -> Iterator[None]:
+        """Attaches fields such as route, file_path and repo_path to the queries run inside the block."""
+        merged = dict(QueryLog._context.get())
+        merged.update({k: v for k, v in fields.items() if v is not None})
+        token = QueryLog._context.set(merged)
+        try:
+            yield
+        finally:
+            QueryLog._context.reset(token)
+        return
+
+    @staticmethod
+    def strip_comments(query: str) -> str:
+        """The query with // and /* */ comments replaced by a space; literals are left as they are."""
+        return QueryLog.LEXEMES.sub(lambda m: ' ' if m.group().startswith('/') else m.group(), query)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Query shape: comments removed, literals replaced by ?, lists of literals collapsed and whitespace squeezed."""
+        shape = QueryLog.LEXEMES.sub(lambda m: {'/': ' ', '`': m.group()}.get(m.group()[0], '?'), query)
+        shape = re.sub(r'(?<![\w$])-?\d+(?:\.\d+)?(?:e-?\d+)?\b', '?', shape)
+        shape = re.sub(r'\[\s*\?(?:\s*,\s*\?)*\s*\]', '[?]', shape)
+        return ' '.join(shape.split())
+
+    @staticmethod
+    def writes(query: str) -> bool:
+        """
+        True if the query may modify the graph. Literals are ignored, and so are property names,
+        quoted names and map keys spelled like clauses (n.set, `delete`, {create: 1});
+        unknown procedures count as writes.
+        """
+        shape = re.sub(r'`[^`]*`', '?', QueryLog.normalize(query))
+        shape = re.sub(r'\.\s*\w+', '.?', shape)
+        shape = re.sub(r'([{,]\s*)\w+(\s*:)', r'\1?\2', shape)
+        return QueryLog.WRITE_CLAUSES.search(shape) is not None
+
+    @staticmethod
+    def record(kind: str, query: str, seconds: float, rows: Optional[int] = None) -> None:
+        if constants.SLOW_QUERY_SECONDS <= 0 or seconds < constants.SLOW_QUERY_SECONDS:
+            return
+        shape = QueryLog.normalize(query)
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "seconds": round(seconds, 3),
+            "kind": kind,
+            "rows": rows,
+            "fingerprint": hashlib.sha1(shape.encode()).hexdigest()[:12],
+            "normalized": shape[:constants.SLOW_QUERY_MAX_CHARS],
+            "query": query[:constants.SLOW_QUERY_MAX_CHARS],
+            "truncated": len(query) > constants.SLOW_QUERY_MAX_CHARS,
+        }
+        entry.update(QueryLog._context.get())
+        # LLM-generated queries name the file they were generated for
+        for field in ('file_path', 'repo_path'):
+            if field not in entry:
+                match = re.search(rf"{field}\s*:\s*'((?:[^'\\]|\\.)*)'", query)
+                entry[field] = match.group(1) if match else None
+        QueryLog._executor.submit(QueryLog._capture_and_write, entry, query)
+        return
+
+    @staticmethod
+    def capture_plan(query: str, mode: str) -> List[Dict[str, Any]]:
+        from gqlalchemy import Memgraph
+        db = Memgraph(host=constants.MEMGRAPH_HOST, port=constants.MEMGRAPH_PORT)
+        return [{k: str(v) for k, v in row.items()}
+                for row in db.execute_and_fetch(f"{mode.upper()} {query}")]
+
+    @staticmethod
+    def _capture_and_write(entry: Dict[str, Any], query: str) -> None:
+        mode = constants.SLOW_QUERY_PLAN
+        if mode in ('explain', 'profile'):
+            if mode == 'profile' and QueryLog.writes(query):
+                mode = 'explain'
+            entry["plan_mode"] = mode
+            try:
+                entry["plan"] = QueryLog.capture_plan(query, mode)
+            except Exception as e:
+                entry["plan_error"] = str(e)
+        try:
+            QueryLog._logger().info(json.dumps(entry, default=str))
+        except OSError:
+            logger.exception("Writing the slow query log failed")
+        return
+
+    @staticmethod
+    def _logger() -> logging.Logger:
+        with QueryLog._lock:
+            if QueryLog._file_logger is None:
+                os.makedirs(os.path.dirname(constants.SLOW_QUERY_LOG_PATH), exist_ok=True)
+                handler = RotatingFileHandler(constants.SLOW_QUERY_LOG_PATH,
+                                              maxBytes=constants.SLOW_QUERY_LOG_MAX_BYTES,
+                                              backupCount=constants.SLOW_QUERY_LOG_BACKUPS)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                file_logger = logging.getLogger('odin.slow_queries')
+                file_logger.setLevel(logging.INFO)
+                file_logger.propagate = False
+                file_logger.addHandler(handler)
+                QueryLog._file_logger = file_logger
+            return QueryLog._file_logger
+
+
+if __name__ == '__main__':
+    print(QueryLog.normalize("MATCH (n {file_path: 'a.md', id: 12}) WHERE ID(n) IN [1, 2, 3] RETURN n"))
+    print(QueryLog.writes("MATCH (n {name: 'CREATE'}) RETURN n"))
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+import os
+import gzip
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import msgpack
+import numpy as np
+
+from core.knowledgebase import constants
+from core.knowledgebase.CompactExporter import CompactExporter, EmbeddingsMode
+from core.knowledgebase.MemgraphManager import MemgraphManager
+from core.knowledgebase.notes.CollectionManager import CollectionManager
+
+
+class Snapshot:
+    """
+    Self-contained copy of the whole knowledge base. Restoring it replaces the contents of
+    Memgraph and Chroma with bulk loads, without running the pipeline again: no LLM
+    extraction and no embedding. Used for the mock data and to clone an instance.
+
+    A snapshot is a gzipped msgpack map:
+        format_version  - FORMAT_VERSION
+        manifest        - creation time, embedding provider and model, node, edge and
+                          sentence counts, and an optional fingerprint of the source data
+        graph           - CompactExporter export of all nodes and edges, with float32 node embeddings
+        sync_versions   - {repo_path: change version}
+        collections     - [{name, metadata, ids, documents, metadatas, dim, embeddings: float32 bytes}]
+
+    Node ids change on restore, so the sync versions are moved past anything a client has seen
+    and clients reload their repos.
+    """
+
+    FORMAT_VERSION = 1
+    MEDIA_TYPE = "application/gzip"
+    FILE_NAME = "odin_snapshot.msgpack.gz"
+
+    @staticmethod
+    def _counted(records: Iterable[Dict[str, Any]], counts: Counter) -> Iterator[Dict[str, Any]]:
+        for record in records:
+            counts[record['type']] += 1
+            yield record
+        return
+
+    @staticmethod
+    def export(source: Optional[str] = None) -> bytes:
+        mm = MemgraphManager()
+        cm = CollectionManager()
+
+        counts = Counter()
+        graph = CompactExporter(EmbeddingsMode.FLOAT32).encode(Snapshot._counted(mm.stream_snapshot(), counts))
+        sync_versions = mm.sync_versions()
+
+        collections = []
+        for name in cm.collection_names():
+            collection = cm.export_collection(name)
+            embeddings = collection.pop('embeddings')
+            collection['dim'] = embeddings.shape[1] if embeddings.size else 0
+            collection['embeddings'] = embeddings.tobytes()
+            collections.append(collection)
+
+        snapshot = {
+            "format_version": Snapshot.FORMAT_VERSION,
+            "manifest": {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "embedding_provider": constants.EMBEDDING_PROVIDER,
+                "embedding_model": constants.EMBEDDING_MODEL_NAME,
+                "nodes": counts['node'],
+                "edges": counts['relationship'],
+                "repos": sorted(sync_versions),
+                "sentences": {c['name']: len(c['ids']) for c in collections},
+                "source": source,
+            },
+            "graph": graph,
+            "sync_versions": sync_versions,
+            "collections": collections,
+        }
+        return CompactExporter.compress(msgpack.packb(snapshot, use_bin_type=True))
+
+    @staticmethod
+    def load(payload: bytes) -> Dict[str, Any]:
+        try:
+            snapshot = msgpack.unpackb(gzip.decompress(payload), raw=False)
+        except (OSError, EOFError, ValueError) as e:
+            raise ValueError(f"Not a knowledge base snapshot: {e}")
+        if not isinstance(snapshot, dict) or snapshot.get('format_version') != Snapshot.FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format, expected version {Snapshot.FORMAT_VERSION}")
+        return snapshot
+
+    @staticmethod
+    def check(manifest: Dict[str, Any], source: Optional[str] = None) -> None:
+        """Raises ValueError if the snapshot can't be restored into this instance."""
+        # Stored vectors are only comparable with query embeddings from the same model
+        made_with = (manifest['embedding_provider'], manifest['embedding_model'])
+        if made_with != (constants.EMBEDDING_PROVIDER, constants.EMBEDDING_MODEL_NAME):
+            raise ValueError(f"The snapshot has {made_with[1]} ({made_with[0]}) embeddings, this instance "
+                             f"uses {constants.EMBEDDING_MODEL_NAME} ({constants.EMBEDDING_PROVIDER})")
+        if source is not None and manifest.get('source') != source:
+            raise ValueError("The snapshot was made from other source data")
+        return
+
+    @staticmethod
+    def restore(payload: bytes, source: Optional[str] = None) -> Dict[str, Any]:
+        """Replaces the knowledge base with the snapshot. Returns its manifest and the restore time."""
+        start = time.perf_counter()
+        snapshot = Snapshot.load(payload)
+        manifest = snapshot['manifest']
+        Snapshot.check(manifest, source)
+        records = CompactExporter.decode(snapshot['graph'], with_embeddings=True)
+
+        mm = MemgraphManager()
+        cm = CollectionManager()
+        mm.delete_all()
+        cm.delete_all()
+
+        try:
+            mm.restore_snapshot(records, snapshot['sync_versions'])
+            for collection in snapshot['collections']:
+                embeddings = np.frombuffer(collection['embeddings'], dtype=np.float32)
+                cm.import_collection(collection['name'], collection['metadata'], collection['ids'],
+                                     collection['documents'], collection['metadatas'],
+                                     embeddings.reshape(-1, collection['dim']) if collection['dim'] else embeddings)
+        except Exception:
+            # An empty knowledge base is reloaded by clients; a partly restored one would look complete
+            mm.delete_all()
+            cm.delete_all()
+            raise
+        return dict(manifest, seconds=round(time.perf_counter() - start, 3))
+
+    @staticmethod
+    def write(path: str, source: Optional[str] = None) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Written aside and moved into place, so an interrupted export never leaves a partial snapshot
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(Snapshot.export(source))
+        os.replace(temp_path, path)
+        return
+
+    @staticmethod
+    def restore_file(path: str, source: Optional[str] = None) -> Dict[str, Any]:
+        with open(path, 'rb') as f:
+            return Snapshot.restore(f.read(), source)
+
+
+if __name__ == '__main__':
+    example_path = os.path.join(os.path.expanduser("~"), Snapshot.FILE_NAME)
+    Snapshot.write(example_path)
+    print(Snapshot.restore_file(example_path))
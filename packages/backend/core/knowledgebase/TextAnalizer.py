@@ -1,53 +1,71 @@
 from __future__ import annotations
 
+from typing import Dict, List, Any
+
 from pathlib import Path
 import os
 import re
-
-from langchain import PromptTemplate
-from langchain.schema import (
-    HumanMessage,
-    SystemMessage
-)
+import time
 
 from core.knowledgebase import constants
+from core.knowledgebase.Metrics import Metrics
 
 
 class TextAnalizer:
+    _prompt_templates = None  # Cache, so the prompt files are read once per process
+
     def __init__(self: TextAnalizer) -> None:
 
-        # Initialize LLM based on provider
-        if constants.LLM_PROVIDER == "ollama":
-            from langchain_community.chat_models import ChatOllama
-            self.model = ChatOllama(
-                model=constants.LLM_MODEL_NAME,
-                temperature=constants.LLM_MODEL_TEMPERATURE,
-                base_url=constants.OLLAMA_BASE_URL
-            )
-        else:  # openai
-            from langchain_openai import ChatOpenAI
-            self.model = ChatOpenAI(
-                openai_api_key=constants.OPENAI_API_KEY,
-                temperature=constants.LLM_MODEL_TEMPERATURE,
-                model_name=constants.LLM_MODEL_NAME
-            )
+        # The LLM client and the prompt templates (and with them langchain) are loaded
+        # on first use, so creating a TextAnalizer at import time costs nothing
+        self._model = None
 
         # Try to use improved prompts if they exist, fall back to original
         self.prompt_names = [
             'prompt_generate_improved', 'system_message_generate_improved',
             'prompt_update', 'system_message_update',
             'prompt_question', 'system_message_question',
+            'prompt_answer', 'system_message_answer',
             'prompt_explain', 'system_message_explain',
             'prompt_optimize', 'system_message_optimize',
             'prompt_debug', 'system_message_debug',
         ]
-        self.prompts = {}
-        self.init_prompts()
 
         self.messages = []
 
         return
 
+    @property
+    def model(self: TextAnalizer) -> Any:
+        if self._model is None:
+            self._model = TextAnalizer.make_model()
+        return self._model
+
+    @property
+    def prompts(self: TextAnalizer) -> Dict[str, Any]:
+        if TextAnalizer._prompt_templates is None:
+            self.init_prompts()
+        return TextAnalizer._prompt_templates
+
+    @staticmethod
+    def make_model():
+        # Initialize LLM based on provider
+        if constants.LLM_PROVIDER == "ollama":
+            from langchain_community.chat_models import ChatOllama
+            return ChatOllama(
+                model=constants.LLM_MODEL_NAME,
+                temperature=constants.LLM_MODEL_TEMPERATURE,
+                base_url=constants.OLLAMA_BASE_URL,
+                keep_alive=constants.OLLAMA_KEEP_ALIVE
+            )
+        else:  # openai
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(
+                openai_api_key=constants.OPENAI_API_KEY,
+                temperature=constants.LLM_MODEL_TEMPERATURE,
+                model_name=constants.LLM_MODEL_NAME
+            )
+
     @staticmethod
     def extract_cypher_from_response(response: str) -> str:
         """
@@ -162,7 +180,9 @@ class TextAnalizer:
         return '\n'.join(fixed_lines)
 
     def init_prompts(self: TextAnalizer) -> None:
+        from langchain import PromptTemplate
 
+        prompts = {}
         for prompt_name in self.prompt_names:
             prompt_path = Path(os.path.join(
                 os.path.dirname(__file__), 'prompts', prompt_name))
@@ -174,7 +194,7 @@ class TextAnalizer:
             if prompt_path.exists():
                 prompt_text = prompt_path.read_text()
                 prompt_template = PromptTemplate.from_template(prompt_text)
-                self.prompts[prompt_name] = prompt_template
+                prompts[prompt_name] = prompt_template
             else:
                 # Fall back to original if neither exists
                 original_name = prompt_name.replace('_improved', '')
@@ -183,56 +203,64 @@ class TextAnalizer:
                 if fallback_path.exists():
                     prompt_text = fallback_path.read_text()
                     prompt_template = PromptTemplate.from_template(prompt_text)
-                    self.prompts[prompt_name] = prompt_template
+                    prompts[prompt_name] = prompt_template
+        TextAnalizer._prompt_templates = prompts
         return
 
+    @staticmethod
+    def make_messages(system_message: str, prompt: str) -> List[Any]:
+        from langchain.schema import HumanMessage, SystemMessage
+        return [SystemMessage(content=system_message), HumanMessage(content=prompt)]
+
+    def _predict(self: TextAnalizer, operation: str) -> str:
+        start = time.perf_counter()
+        response = self.model.predict_messages(self.messages)
+        Metrics.observe_llm(operation, time.perf_counter() - start, Metrics.token_usage(response))
+        return response.content
+
     def text_to_cypher_create(self: TextAnalizer, text: str, repo_path: str, file_path: str) -> str:
         # Use improved prompts if available, fall back to original
         system_prompt_key = 'system_message_generate_improved' if 'system_message_generate_improved' in self.prompts else 'system_message_generate'
         user_prompt_key = 'prompt_generate_improved' if 'prompt_generate_improved' in self.prompts else 'prompt_generate'
         
-        self.messages = [
-            SystemMessage(
-                content=self.prompts[system_prompt_key].format()),
-            HumanMessage(content=self.prompts[user_prompt_key].format(
+        self.messages = TextAnalizer.make_messages(
+            self.prompts[system_prompt_key].format(),
+            self.prompts[user_prompt_key].format(
                 prompt=text, repo_path=repo_path, file_path=file_path))
-        ]
-        response = self.model.predict_messages(self.messages).content
+        response = self._predict('generate')
         cypher = TextAnalizer.extract_cypher_from_response(response)
         # Fix common syntax errors
         cypher = TextAnalizer.fix_common_cypher_errors(cypher)
         return cypher
 
     def data_and_text_to_cypher_update(self: TextAnalizer, data: str, text: str, repo_path: str, file_path: str) -> str:
-        self.messages = [
-            SystemMessage(
-                content=self.prompts['system_message_update'].format()),
-            HumanMessage(content=self.prompts['prompt_update'].format(
+        self.messages = TextAnalizer.make_messages(
+            self.prompts['system_message_update'].format(),
+            self.prompts['prompt_update'].format(
                 data=data, prompt=text, repo_path=repo_path, file_path=file_path))
-        ]
-        response = self.model.predict_messages(self.messages).content
+        response = self._predict('update')
         cypher = TextAnalizer.extract_cypher_from_response(response)
         # Fix common syntax errors
         cypher = TextAnalizer.fix_common_cypher_errors(cypher)
         return cypher
 
     def generate_questions(self: TextAnalizer, text: str) -> str:
-        self.messages = [
-            SystemMessage(
-                content=self.prompts['system_message_question'].format()),
-            HumanMessage(
-                content=self.prompts['prompt_question'].format(prompt=text))
-        ]
-        return self.model.predict_messages(self.messages).content
+        self.messages = TextAnalizer.make_messages(
+            self.prompts['system_message_question'].format(),
+            self.prompts['prompt_question'].format(prompt=text))
+        return self._predict('questions')
+
+    def answer_from_context(self: TextAnalizer, question: str, context: str) -> str:
+        self.messages = TextAnalizer.make_messages(
+            self.prompts['system_message_answer'].format(),
+            self.prompts['prompt_answer'].format(question=question, context=context))
+        return self._predict('answer')
 
     def _general_code_question(self: TextAnalizer, prompt_name: str, text: str) -> str:
-        self.messages = [
-            SystemMessage(
-                content=self.prompts[f'system_message_{prompt_name}'].format()),
-            HumanMessage(
-                content=self.prompts[f'prompt_{prompt_name}'].format(code=text))
-        ]
-        return self.model.predict_messages(self.messages).content
+        self.messages = TextAnalizer.make_messages(
+            self.prompts[f'system_message_{prompt_name}'].format(),
+            self.prompts[f'prompt_{prompt_name}'].format(code=text))
+        return self._predict(prompt_name)
 
     def optimize_code_style(self: TextAnalizer, text: str) -> str:
         return self._general_code_question('optimize', text)
@@ -22,6 +22,15 @@ class Utils:
         search_path = os.path.join(path_to_root, '**', '*')
         return [os.path.abspath(f) for f in glob.glob(search_path, recursive=True) if os.path.isfile(f)]
 
+    @staticmethod
+    def escape_cypher_value(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("'", "\\'")
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # Rough rule of thumb for English text and code: ~4 characters per token
+        return len(text) // 4 + 1
+
     @staticmethod
     def edge_to_dict(edge):
         return {
@@ -42,6 +51,27 @@ class Utils:
             "type": type(node).__name__.lower(),
         }
 
+    @staticmethod
+    def node_row_to_dict(row):
+        # Same shape as node_to_dict, built from a row of scalar columns
+        return {
+            "id": row['id'],
+            "labels": row['labels'],
+            "properties": row['properties'],
+            "type": "node",
+        }
+
+    @staticmethod
+    def edge_row_to_dict(row):
+        return {
+            "id": row['id'],
+            "start": row['start'],
+            "end": row['end'],
+            "label": row['label'],
+            "properties": row['properties'],
+            "type": "relationship",
+        }
+
     @staticmethod
     def results_to_dictlist(results, return_name):
         l = list(results)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import Dict, List, Any, Callable, Optional
+
+import time
+import logging
+import threading
+import importlib
+
+import requests
+
+from core.knowledgebase import constants
+from core.knowledgebase.TextAnalizer import TextAnalizer
+from core.knowledgebase.notes.Embeddings import Embeddings
+from core.knowledgebase.notes.CollectionManager import CollectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    Loads in the background what the first requests after a start would otherwise wait for:
+
+    - embeddings: the embedding model, for query embeddings and for Chroma
+    - tokenizer: nltk and its punkt sentence tokenizer data
+    - prompts: langchain, the prompt templates and the agent modules
+    - llm: the LLM client, and the model itself, which Ollama loads into memory when pinged
+
+    status() tells which components are warm, for the /health/ready route. Components that
+    fail are retried every WARMUP_RETRY_SECONDS; with WARMUP_LLM_PING_SECONDS set, Ollama is
+    pinged at that interval afterwards so it doesn't unload the model.
+    """
+
+    SAMPLE_TEXT = "Odin warms up. It loads the models before the first request."
+
+    _status: Dict[str, Dict[str, Any]] = dict()
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def warm_embeddings() -> None:
+        # The OpenAI API has nothing to load; embedding a sample would only cost a request
+        if constants.EMBEDDING_PROVIDER != "openai":
+            Embeddings.get_embedding(WarmUp.SAMPLE_TEXT)
+            # Chroma's sentence-transformers function loads its own copy of the model
+            CollectionManager.get_embedding_function()([WarmUp.SAMPLE_TEXT])
+        else:
+            CollectionManager.get_embedding_function()
+        return
+
+    @staticmethod
+    def warm_tokenizer() -> None:
+        CollectionManager.split_sentences(WarmUp.SAMPLE_TEXT)
+        return
+
+    @staticmethod
+    def warm_prompts() -> None:
+        ta = TextAnalizer()
+        TextAnalizer.make_messages(ta.prompts['system_message_question'].format(), WarmUp.SAMPLE_TEXT)
+        importlib.import_module('core.knowledgebase.QueryAgents')
+        return
+
+    @staticmethod
+    def warm_llm() -> None:
+        TextAnalizer.make_model()
+        if constants.LLM_PROVIDER == "ollama":
+            # A generate request without a prompt only loads the model into memory
+            payload: Dict[str, Any] = {"model": constants.LLM_MODEL_NAME}
+            if constants.OLLAMA_KEEP_ALIVE is not None:
+                payload["keep_alive"] = constants.OLLAMA_KEEP_ALIVE
+            response = requests.post(f"{constants.OLLAMA_BASE_URL.rstrip('/')}/api/generate",
+                                     json=payload, timeout=constants.WARMUP_LLM_TIMEOUT_SECONDS)
+            response.raise_for_status()
+        return
+
+    @staticmethod
+    def steps() -> Dict[str, Callable[[], None]]:
+        return {
+            'embeddings': WarmUp.warm_embeddings,
+            'tokenizer': WarmUp.warm_tokenizer,
+            'prompts': WarmUp.warm_prompts,
+            'llm': WarmUp.warm_llm,
+        }
+
+    @staticmethod
+    def start(components: Optional[List[str]] = None) -> None:
+        """Warms the components (WARMUP_COMPONENTS by default) on a daemon thread; only the first call does anything."""
+        steps = WarmUp.steps()
+        components = constants.WARMUP_COMPONENTS if components is None else components
+        for component in components:
+            if component not in steps:
+                logger.warning(f"Unknown warm-up component {component!r}, expected one of {', '.join(steps)}")
+        components = [c for c in components if c in steps]
+
+        with WarmUp._lock:
+            if WarmUp._thread is not None:
+                return
+            WarmUp._status = {c: {"state": "pending", "attempts": 0} for c in components}
+            WarmUp._thread = threading.Thread(target=WarmUp._run, args=(components,),
+                                              name='warm-up', daemon=True)
+        WarmUp._thread.start()
+        return
+
+    @staticmethod
+    def status() -> Dict[str, Any]:
+        with WarmUp._lock:
+            components = {c: dict(s) for c, s in WarmUp._status.items()}
+        return {"ready": all(s["state"] == "ready" for s in components.values()), "components": components}
+
+    @staticmethod
+    def _run(components: List[str]) -> None:
+        pending = list(components)
+        while pending:
+            for component in pending:
+                WarmUp._warm(component)
+            pending = [c for c in pending if WarmUp._status[c]["state"] != "ready"]
+            if not pending or constants.WARMUP_RETRY_SECONDS <= 0:
+                break
+            time.sleep(constants.WARMUP_RETRY_SECONDS)
+
+        if 'llm' in components and constants.LLM_PROVIDER == "ollama":
+            while constants.WARMUP_LLM_PING_SECONDS > 0:
+                time.sleep(constants.WARMUP_LLM_PING_SECONDS)
+                WarmUp._warm('llm')
+        return
+
+    @staticmethod
+    def _warm(component: str) -> None:
+        with WarmUp._lock:
+            status = WarmUp._status[component]
+            # Keep-alive pings of a warm component don't take it out of rotation
+            if status["state"] != "ready":
+                status["state"] = "warming"
+            status["attempts"] += 1
+
+        start = time.perf_counter()
+        try:
+            WarmUp.steps()[component]()
+        except Exception as e:
+            logger.warning(f"Warming up {component} failed: {e}")
+            update = {"state": "failed", "error": str(e)}
+        else:
+            update = {"state": "ready", "error": None}
+        update["seconds"] = round(time.perf_counter() - start, 3)
+
+        with WarmUp._lock:
+            WarmUp._status[component].update(update)
+        return
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    WarmUp.start()
+    while not WarmUp.status()["ready"]:
+        time.sleep(1)
+    print(WarmUp.status())
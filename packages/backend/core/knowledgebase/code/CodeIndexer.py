@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from typing import Optional, Dict, List, Any
+
+import os
+import ast
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from core.knowledgebase import constants
+
+
+class CodeIndexer:
+    """
+    Extracts code symbols (classes, functions, imports) from source files.
+
+    Parse results are cached on disk by git blob hash of the file content,
+    so re-indexing a repository only parses files whose content changed.
+    Cache misses are parsed in a process pool.
+    """
+
+    # Below this many cache misses, spawning a process pool costs more than it saves
+    MIN_FILES_FOR_POOL = 16
+
+    def __init__(self: CodeIndexer, cache_dir: Optional[str] = None, max_workers: Optional[int] = None) -> None:
+        self.cache_dir = cache_dir or constants.CODE_INDEX_CACHE_DIR
+        self.max_workers = max_workers or constants.CODE_INDEX_WORKERS or None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        return
+
+    @staticmethod
+    def is_indexable(file_path: str) -> bool:
+        return os.path.splitext(file_path)[1] in ('.py', '.pyi')
+
+    @staticmethod
+    def blob_hash(content: bytes) -> str:
+        # Same as `git hash-object`, so the cache key matches the blob id git already tracks
+        header = f"blob {len(content)}\0".encode()
+        return hashlib.sha1(header + content).hexdigest()
+
+    @staticmethod
+    def extract_python_symbols(source: bytes) -> List[Dict[str, Any]]:
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError):
+            return []
+
+        symbols = []
+
+        def visit(node: ast.AST, parent: Optional[str]) -> None:
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                    qualname = child.name if parent is None else f"{parent}.{child.name}"
+                    kind = 'Class' if isinstance(child, ast.ClassDef) else 'Function'
+                    symbols.append({
+                        "kind": kind,
+                        "name": child.name,
+                        "qualname": qualname,
+                        "parent": parent,
+                        "lineno": child.lineno,
+                        "end_lineno": getattr(child, 'end_lineno', child.lineno),
+                    })
+                    visit(child, qualname)
+                elif isinstance(child, ast.Import):
+                    for alias in child.names:
+                        symbols.append({
+                            "kind": "Import",
+                            "name": alias.name,
+                            "level": 0,
+                            "lineno": child.lineno,
+                        })
+                elif isinstance(child, ast.ImportFrom):
+                    # `from . import x` imports the sibling module x itself
+                    names = [child.module] if child.module else [a.name for a in child.names]
+                    for name in names:
+                        symbols.append({
+                            "kind": "Import",
+                            "name": name,
+                            "level": child.level or 0,
+                            "lineno": child.lineno,
+                        })
+                else:
+                    visit(child, parent)
+            return
+
+        visit(tree, None)
+        return symbols
+
+    @staticmethod
+    def module_name(root_path: str, file_path: str) -> str:
+        rel_path = os.path.relpath(file_path, root_path)
+        parts = os.path.splitext(rel_path)[0].split(os.sep)
+        if len(parts) > 1 and parts[-1] == '__init__':
+            parts = parts[:-1]
+        return '.'.join(parts)
+
+    @staticmethod
+    def resolve_import(module_name: str, is_package: bool, name: str, level: int) -> str:
+        if level == 0:
+            return name
+        package_parts = module_name.split('.')
+        if not is_package:
+            package_parts = package_parts[:-1]
+        if level > 1:
+            package_parts = package_parts[:-(level - 1)]
+        return '.'.join([p for p in package_parts + [name] if p])
+
+    def _cache_path(self: CodeIndexer, blob: str) -> str:
+        return os.path.join(self.cache_dir, blob[:2], f"{blob}.json")
+
+    def _load_cached(self: CodeIndexer, blob: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._cache_path(blob), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _store_cached(self: CodeIndexer, blob: str, symbols: List[Dict[str, Any]]) -> None:
+        path = self._cache_path(blob)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(symbols, file)
+        os.replace(tmp_path, path)
+        return
+
+    def index_files(self: CodeIndexer, file_paths: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        symbols_by_path = dict()
+        pending_paths, pending_blobs, pending_sources = [], [], []
+
+        for file_path in file_paths:
+            try:
+                with open(file_path, 'rb') as file:
+                    content = file.read()
+            except OSError:
+                continue
+            blob = CodeIndexer.blob_hash(content)
+            cached = self._load_cached(blob)
+            if cached is not None:
+                self.cache_hits += 1
+                symbols_by_path[file_path] = cached
+                continue
+            self.cache_misses += 1
+            pending_paths.append(file_path)
+            pending_blobs.append(blob)
+            pending_sources.append(content)
+
+        if len(pending_sources) >= CodeIndexer.MIN_FILES_FOR_POOL:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(
+                    CodeIndexer.extract_python_symbols, pending_sources, chunksize=8))
+        else:
+            results = [CodeIndexer.extract_python_symbols(s) for s in pending_sources]
+
+        for file_path, blob, symbols in zip(pending_paths, pending_blobs, results):
+            self._store_cached(blob, symbols)
+            symbols_by_path[file_path] = symbols
+
+        return symbols_by_path
+
+
+if __name__ == '__main__':
+    indexer = CodeIndexer()
+    this_dir = os.path.dirname(os.path.dirname(__file__))
+    paths = [os.path.join(this_dir, f) for f in os.listdir(this_dir) if f.endswith('.py')]
+    for path, symbols in indexer.index_files(paths).items():
+        print(path, len(symbols))
+    print(f"hits: {indexer.cache_hits}, misses: {indexer.cache_misses}")
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, List
 
 import os
 import ctypes
 import yaml
 from gitignore_parser import parse_gitignore
 
+from core.knowledgebase.Utils import Utils
+from core.knowledgebase.code.CodeIndexer import CodeIndexer
+
 
 class LocalRepoManager:
 
-    def __init__(self: LocalRepoManager, root_path: str) -> None:
+    def __init__(self: LocalRepoManager, root_path: str, index_symbols: bool = True) -> None:
         self.root_path = LocalRepoManager.remove_trailing_slash(root_path)
+        self.index_symbols = index_symbols
         return
 
     @staticmethod
@@ -41,10 +45,6 @@ class LocalRepoManager:
 
         return loc, marked_todo
 
-    @staticmethod
-    def escape_cypher_value(file_path: str) -> str:
-        return file_path.replace("\\", "\\\\").replace("'", "\\'")
-
     @staticmethod
     def node_with_hash(file_path: str) -> str:
         return f'node{str(ctypes.c_size_t(hash(file_path)).value)}'
@@ -57,12 +57,13 @@ class LocalRepoManager:
 
     def generate_cypher(self: LocalRepoManager) -> str:
         queries = []
-        repo_path = LocalRepoManager.escape_cypher_value(self.root_path)
+        repo_path = Utils.escape_cypher_value(self.root_path)
 
         gitignore_path = os.path.join(self.root_path, '.gitignore')
         matches = parse_gitignore(gitignore_path)
 
         visited_dirs = []
+        indexable_files = dict()
 
         for root, dirs, files in os.walk(self.root_path):
             if '.git' in dirs:
@@ -73,7 +74,7 @@ class LocalRepoManager:
                 d) for d in dirs if not matches(os.path.join(root, d))]
             files = [f for f in files if not matches(os.path.join(root, f))]
 
-            root_escaped = LocalRepoManager.escape_cypher_value(root)
+            root_escaped = Utils.escape_cypher_value(root)
             nn_root = LocalRepoManager.node_with_hash(f'dir_{root_escaped}')
 
             if nn_root not in visited_dirs:
@@ -83,7 +84,7 @@ class LocalRepoManager:
 
             for directory in dirs:
                 directory_path = os.path.join(root, directory)
-                directory_escaped = LocalRepoManager.escape_cypher_value(
+                directory_escaped = Utils.escape_cypher_value(
                     directory_path)
 
                 nn_dir = LocalRepoManager.node_with_hash(
@@ -97,7 +98,7 @@ class LocalRepoManager:
 
             for file in files:
                 file_path = os.path.join(root, file)
-                file_escaped = LocalRepoManager.escape_cypher_value(file_path)
+                file_escaped = Utils.escape_cypher_value(file_path)
 
                 language = LocalRepoManager.detect_language(file_path)
                 loc, marked_todo = LocalRepoManager.analyze_file(file_path)
@@ -111,8 +112,76 @@ class LocalRepoManager:
                 queries.append(f"MERGE ({nn_file}:File {{{attributes}}})")
                 queries.append(f"CREATE ({nn_file})-[:IN]->({nn_root})")
 
+                if self.index_symbols and CodeIndexer.is_indexable(file_path):
+                    indexable_files[file_path] = nn_file
+
+        if indexable_files:
+            queries.extend(self.generate_symbol_cypher(indexable_files))
+
         return '\n'.join(queries)
 
+    def generate_symbol_cypher(self: LocalRepoManager, file_nodes: Dict[str, str]) -> List[str]:
+        """
+        Cypher for Module, Class and Function nodes of the given files, linked with
+        IN relationships to their parents, plus IMPORTS relationships between modules.
+        All symbol nodes also carry the Symbol label, so definitions can be looked up
+        through a single Symbol(name) index.
+        """
+        repo_path = Utils.escape_cypher_value(self.root_path)
+        symbols_by_path = CodeIndexer().index_files(list(file_nodes.keys()))
+
+        module_queries, symbol_queries, import_queries = [], [], []
+        visited_imports = []
+
+        for file_path, symbols in symbols_by_path.items():
+            file_escaped = Utils.escape_cypher_value(file_path)
+            module_name = CodeIndexer.module_name(self.root_path, file_path)
+            is_package = os.path.basename(file_path).startswith('__init__.')
+
+            nn_module = LocalRepoManager.node_with_hash(f'module_{file_escaped}')
+            module_queries.append(
+                f"MERGE ({nn_module}:Symbol:Module {{name: '{Utils.escape_cypher_value(module_name)}', "
+                f"qualname: '{Utils.escape_cypher_value(module_name)}', "
+                f"path: '{file_escaped}', repo_path: '{repo_path}'}})")
+            module_queries.append(
+                f"CREATE ({nn_module})-[:IN]->({file_nodes[file_path]})")
+
+            nn_by_qualname = dict()
+            for symbol in symbols:
+                if symbol['kind'] == 'Import':
+                    imported = CodeIndexer.resolve_import(
+                        module_name, is_package, symbol['name'], symbol['level'])
+                    if not imported:
+                        continue
+                    imported_escaped = Utils.escape_cypher_value(imported)
+                    nn_import = LocalRepoManager.node_with_hash(f'import_{imported_escaped}')
+                    if nn_import not in visited_imports:
+                        import_queries.append(
+                            f"MERGE ({nn_import}:Module {{name: '{imported_escaped}', repo_path: '{repo_path}'}})")
+                        visited_imports.append(nn_import)
+                    import_queries.append(
+                        f"MERGE ({nn_module})-[:IMPORTS]->({nn_import})")
+                    continue
+
+                qualname = f"{module_name}.{symbol['qualname']}"
+                qualname_escaped = Utils.escape_cypher_value(qualname)
+                nn_symbol = LocalRepoManager.node_with_hash(
+                    f"symbol_{file_escaped}_{qualname_escaped}_{symbol['lineno']}")
+                nn_parent = nn_by_qualname.get(symbol['parent'], nn_module)
+                nn_by_qualname[symbol['qualname']] = nn_symbol
+
+                attributes = (f"name: '{Utils.escape_cypher_value(symbol['name'])}', "
+                              f"qualname: '{qualname_escaped}', path: '{file_escaped}', "
+                              f"lineno: {symbol['lineno']}, end_lineno: {symbol['end_lineno']}, "
+                              f"repo_path: '{repo_path}'")
+                symbol_queries.append(
+                    f"CREATE ({nn_symbol}:Symbol:{symbol['kind']} {{{attributes}}})")
+                symbol_queries.append(
+                    f"CREATE ({nn_symbol})-[:IN]->({nn_parent})")
+
+        # Imports go last so MERGE matches modules of this repo before creating external ones
+        return module_queries + symbol_queries + import_queries
+
 
 if __name__ == '__main__':
     example_repo_path = '/home/patrik/Drive/Current/Memgraph/Projects/magic-graph/'
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from typing import Optional, Dict, List, Tuple, Callable
+
+import os
+import re
+import time
+import shlex
+import fnmatch
+from functools import lru_cache
+
+from gitignore_parser import parse_gitignore
+
+from core.knowledgebase import constants
+from core.knowledgebase.Utils import Utils
+
+
+class RepoFileIndex:
+    """
+    Cached, gitignore-aware listing of the files in a repository, with
+    paged file reading, grep and depth-limited listing for agent tools.
+
+    Every tool output is cut to a hard token budget, so one tool call can
+    never push more than a bounded amount of text into the LLM context.
+    """
+
+    _indexes: Dict[str, RepoFileIndex] = dict()
+
+    # Files larger than this are listed, but not searched
+    MAX_GREP_FILE_BYTES = 1024 * 1024
+    DEFAULT_PAGE_LINES = 200
+    # grep stops scanning after this many matches
+    MAX_GREP_MATCHES = 1000
+
+    def __init__(self: RepoFileIndex, root_path: str, token_budget: Optional[int] = None) -> None:
+        self.root_path = os.path.abspath(root_path)
+        self.token_budget = token_budget or constants.CODE_TOOL_TOKEN_BUDGET
+        self.files: List[str] = []
+        self.built_at = 0.0
+        self._build()
+        return
+
+    @staticmethod
+    def for_repo(root_path: str) -> RepoFileIndex:
+        root_path = os.path.abspath(root_path)
+        index = RepoFileIndex._indexes.get(root_path)
+        if index is None or time.monotonic() - index.built_at > constants.CODE_FILE_INDEX_TTL:
+            index = RepoFileIndex(root_path)
+            RepoFileIndex._indexes[root_path] = index
+        return index
+
+    def _build(self: RepoFileIndex) -> None:
+        gitignore_path = os.path.join(self.root_path, '.gitignore')
+        matches: Callable[[str], bool] = lambda p: False
+        if os.path.isfile(gitignore_path):
+            matches = parse_gitignore(gitignore_path)
+
+        files = []
+        for root, dirs, filenames in os.walk(self.root_path):
+            dirs[:] = sorted(d for d in dirs
+                             if d != '.git' and not matches(os.path.join(root, d)))
+            for f in sorted(filenames):
+                full_path = os.path.join(root, f)
+                if not matches(full_path):
+                    files.append(os.path.relpath(full_path, self.root_path))
+
+        self.files = files
+        self.built_at = time.monotonic()
+        return
+
+    def _fit_to_budget(self: RepoFileIndex, lines: List[str]) -> List[str]:
+        """
+        Returns the leading lines that fit into the token budget. The first line is always
+        returned, cut to the budget if it's longer, so paging through a file always advances.
+        """
+        used = 0
+        for n, line in enumerate(lines):
+            used += Utils.estimate_tokens(line)
+            if used > self.token_budget:
+                if n == 0:
+                    # estimate_tokens counts ~4 characters per token
+                    return [line[:self.token_budget * 4] + " [line cut to fit the output budget]"]
+                return lines[:n]
+        return list(lines)
+
+    def _resolve(self: RepoFileIndex, path: str) -> Optional[str]:
+        path = path.strip().strip('`"\'')
+        full_path = os.path.abspath(os.path.join(self.root_path, path))
+        if os.path.commonpath([full_path, self.root_path]) != self.root_path:
+            return None
+        return full_path
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _read_lines(full_path: str, mtime: float) -> Tuple[str, ...]:
+        # mtime is part of the cache key, so edited files are re-read
+        with open(full_path, 'r', errors='replace') as file:
+            return tuple(file.read().splitlines())
+
+    def _lines(self: RepoFileIndex, full_path: str) -> Tuple[str, ...]:
+        return RepoFileIndex._read_lines(full_path, os.path.getmtime(full_path))
+
+    @staticmethod
+    def _parse_args(spec: str) -> Tuple[List[str], Dict[str, str]]:
+        # Non-POSIX mode keeps backslashes, so regexes like \w+ survive
+        try:
+            tokens = [t.strip('"\'') for t in shlex.split(spec, posix=False)]
+        except ValueError:
+            tokens = spec.split()
+        positional, options = [], dict()
+        i = 0
+        while i < len(tokens):
+            if tokens[i].startswith('--') and i + 1 < len(tokens):
+                options[tokens[i][2:]] = tokens[i + 1]
+                i += 2
+                continue
+            positional.append(tokens[i])
+            i += 1
+        return positional, options
+
+    def read_file(self: RepoFileIndex, spec: str) -> str:
+        positional, options = RepoFileIndex._parse_args(spec)
+        if not positional:
+            return "Usage: <path> [--lines START-END]"
+        full_path = self._resolve(positional[0])
+        if full_path is None or not os.path.isfile(full_path):
+            return f"File not found: {positional[0]}"
+
+        lines = self._lines(full_path)
+        start, end = 1, RepoFileIndex.DEFAULT_PAGE_LINES
+        if 'lines' in options:
+            bounds = re.match(r'^(\d+)(?:-(\d+))?$', options['lines'])
+            if bounds is None:
+                return "Line range has to look like START-END, e.g. --lines 100-200"
+            start = max(int(bounds.group(1)), 1)
+            end = int(bounds.group(2)) if bounds.group(2) else start + RepoFileIndex.DEFAULT_PAGE_LINES - 1
+        end = min(end, len(lines))
+        if start > end:
+            return f"{positional[0]} has {len(lines)} lines."
+
+        numbered = [f"{n}: {lines[n - 1]}" for n in range(start, end + 1)]
+        numbered = self._fit_to_budget(numbered)
+        end = start + len(numbered) - 1
+        out = [f"{positional[0]} (lines {start}-{end} of {len(lines)})"] + numbered
+        if end < len(lines):
+            out.append(f"[{len(lines) - end} more lines; continue with "
+                       f"--lines {end + 1}-{end + RepoFileIndex.DEFAULT_PAGE_LINES}]")
+        return '\n'.join(out)
+
+    def grep(self: RepoFileIndex, spec: str) -> str:
+        positional, options = RepoFileIndex._parse_args(spec)
+        if not positional:
+            return "Usage: <regex> [--include GLOB]"
+        try:
+            pattern = re.compile(' '.join(positional))
+        except re.error as e:
+            return f"Invalid regex: {e}"
+        include = options.get('include')
+
+        matches = []
+        for rel_path in self.files:
+            if include and not fnmatch.fnmatch(rel_path, include) \
+                    and not fnmatch.fnmatch(os.path.basename(rel_path), include):
+                continue
+            full_path = os.path.join(self.root_path, rel_path)
+            try:
+                if os.path.getsize(full_path) > RepoFileIndex.MAX_GREP_FILE_BYTES:
+                    continue
+                lines = self._lines(full_path)
+            except OSError:
+                continue
+            for n, line in enumerate(lines, start=1):
+                if pattern.search(line):
+                    matches.append(f"{rel_path}:{n}: {line.strip()}")
+            if len(matches) >= RepoFileIndex.MAX_GREP_MATCHES:
+                break
+
+        if not matches:
+            return "No matches."
+        out = self._fit_to_budget(matches)
+        if len(out) < len(matches):
+            out.append(f"[{len(matches) - len(out)} more matches; narrow the pattern or use --include]")
+        return '\n'.join(out)
+
+    def listdir(self: RepoFileIndex, spec: str) -> str:
+        positional, options = RepoFileIndex._parse_args(spec)
+        path = positional[0] if positional else '.'
+        full_path = self._resolve(path)
+        if full_path is None or not os.path.isdir(full_path):
+            return f"Directory not found: {path}"
+        try:
+            max_depth = int(options.get('depth', 2))
+        except ValueError:
+            return "Depth has to be an integer, e.g. --depth 2"
+
+        prefix = os.path.relpath(full_path, self.root_path)
+        prefix = '' if prefix == '.' else prefix + os.sep
+
+        lines, seen_dirs, hidden = [], set(), 0
+        for rel_path in self.files:
+            if not rel_path.startswith(prefix):
+                continue
+            parts = rel_path[len(prefix):].split(os.sep)
+            for depth in range(len(parts) - 1):
+                if depth >= max_depth:
+                    break
+                dir_path = os.sep.join(parts[:depth + 1])
+                if dir_path not in seen_dirs:
+                    seen_dirs.add(dir_path)
+                    lines.append(f"{' ' * 4 * depth}{parts[depth]}/")
+            if len(parts) - 1 < max_depth:
+                lines.append(f"{' ' * 4 * (len(parts) - 1)}{parts[-1]}")
+            else:
+                hidden += 1
+
+        if hidden:
+            lines.append(f"[{hidden} files deeper than --depth {max_depth} not shown]")
+        out = self._fit_to_budget(lines)
+        if len(out) < len(lines):
+            out.append(f"[{len(lines) - len(out)} more entries; list a subdirectory or lower --depth]")
+        return '\n'.join(out)
+
+
+if __name__ == '__main__':
+    index = RepoFileIndex.for_repo(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+    print(index.listdir('. --depth 2'))
+    print(index.grep('class \\w+Manager --include *.py'))
+    print(index.read_file('core/knowledgebase/Utils.py --lines 1-20'))
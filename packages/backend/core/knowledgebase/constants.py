@@ -14,6 +14,11 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
 # Ollama Configuration (if using Ollama)
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+# How long Ollama keeps the model in memory after a request, e.g. "30m" or -1; the server's setting if unset
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE")
+# Ollama reads a bare number as seconds only when it is sent as a number
+if OLLAMA_KEEP_ALIVE is not None and OLLAMA_KEEP_ALIVE.lstrip('-').isdigit():
+    OLLAMA_KEEP_ALIVE = int(OLLAMA_KEEP_ALIVE)
 
 MEMGRAPH_HOST = os.environ.get("MEMGRAPH_HOST", "127.0.0.1")
 MEMGRAPH_PORT = os.environ.get("MEMGRAPH_PORT", "7687")
@@ -21,15 +26,150 @@ MEMGRAPH_PORT = int(MEMGRAPH_PORT)
 
 CHROMA_DATA_DIR = os.environ.get("CHROMA_DATA_DIR")
 CHROMA_VECTOR_SPACE = os.environ.get("CHROMA_VECTOR_SPACE")
+# Upper bound on entries per Chroma write; the client's own max batch size is used if smaller
+CHROMA_WRITE_BATCH_SIZE = os.environ.get("CHROMA_WRITE_BATCH_SIZE", "1000")
+CHROMA_WRITE_BATCH_SIZE = int(CHROMA_WRITE_BATCH_SIZE)
 
 # Embedding configuration
-EMBEDDING_PROVIDER = os.environ.get("EMBEDDING_PROVIDER", "local")  # 'openai' or 'local'
+EMBEDDING_PROVIDER = os.environ.get("EMBEDDING_PROVIDER", "local")  # 'openai', 'local' or 'onnx'
 EMBEDDING_MODEL_NAME = os.environ.get(
-    "EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")  # For local: sentence-transformers model name
+    "EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")  # For local/onnx: sentence-transformers model name
+# For onnx: where the exported models are kept, threads per inference (0 = all cores) and int8 quantization
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "odin", "onnx"))
+ONNX_NUM_THREADS = os.environ.get("ONNX_NUM_THREADS", "0")
+ONNX_NUM_THREADS = int(ONNX_NUM_THREADS)
+ONNX_QUANTIZE = (os.environ.get("ONNX_QUANTIZE", 'True') == 'True')
 
 # LLM model configuration
 LLM_MODEL_NAME = os.environ.get("LLM_MODEL_NAME", "llama3.1:8b")  # For Ollama: model name
 LLM_MODEL_TEMPERATURE = os.environ.get("LLM_MODEL_TEMPERATURE", "0.2")
 LLM_MODEL_TEMPERATURE = float(LLM_MODEL_TEMPERATURE)
 
+# Rows pulled from Memgraph per round-trip by streaming exports
+EXPORT_PAGE_SIZE = os.environ.get("EXPORT_PAGE_SIZE", "1000")
+EXPORT_PAGE_SIZE = int(EXPORT_PAGE_SIZE)
+
+# Nodes per query when writing node embeddings in bulk
+EMBEDDINGS_WRITE_BATCH_SIZE = os.environ.get("EMBEDDINGS_WRITE_BATCH_SIZE", "256")
+EMBEDDINGS_WRITE_BATCH_SIZE = int(EMBEDDINGS_WRITE_BATCH_SIZE)
+
+# Relationships per direction listed when describing a node to an agent
+DESCRIBE_MAX_NEIGHBOURS = os.environ.get("DESCRIBE_MAX_NEIGHBOURS", "25")
+DESCRIBE_MAX_NEIGHBOURS = int(DESCRIBE_MAX_NEIGHBOURS)
+
+# Caps for the neighbourhood endpoint
+NEIGHBOURHOOD_MAX_DEPTH = os.environ.get("NEIGHBOURHOOD_MAX_DEPTH", "4")
+NEIGHBOURHOOD_MAX_DEPTH = int(NEIGHBOURHOOD_MAX_DEPTH)
+NEIGHBOURHOOD_MAX_NODES = os.environ.get("NEIGHBOURHOOD_MAX_NODES", "2000")
+NEIGHBOURHOOD_MAX_NODES = int(NEIGHBOURHOOD_MAX_NODES)
+NEIGHBOURHOOD_MAX_EDGES = os.environ.get("NEIGHBOURHOOD_MAX_EDGES", "10000")
+NEIGHBOURHOOD_MAX_EDGES = int(NEIGHBOURHOOD_MAX_EDGES)
+
+# Most frequent node labels listed per cluster in summarized exports
+SUMMARY_TOP_LABELS = os.environ.get("SUMMARY_TOP_LABELS", "5")
+SUMMARY_TOP_LABELS = int(SUMMARY_TOP_LABELS)
+
+# Query texts whose embeddings Searcher keeps in memory
+QUERY_EMBEDDING_CACHE_SIZE = os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", "1024")
+QUERY_EMBEDDING_CACHE_SIZE = int(QUERY_EMBEDDING_CACHE_SIZE)
+
+# Repos whose node embedding matrices graph search keeps in memory, and the most
+# matches one graph search can ask for
+NODE_VECTOR_INDEX_CACHE_SIZE = os.environ.get("NODE_VECTOR_INDEX_CACHE_SIZE", "8")
+NODE_VECTOR_INDEX_CACHE_SIZE = int(NODE_VECTOR_INDEX_CACHE_SIZE)
+GRAPH_SEARCH_MAX_K = os.environ.get("GRAPH_SEARCH_MAX_K", "100")
+GRAPH_SEARCH_MAX_K = int(GRAPH_SEARCH_MAX_K)
+
+# Fast answers for /ask: sentences and nodes retrieved, size of the context in estimated tokens,
+# and the similarity the best match needs to reach, below which the agent answers instead
+FAST_ANSWER_SENTENCES = os.environ.get("FAST_ANSWER_SENTENCES", "8")
+FAST_ANSWER_SENTENCES = int(FAST_ANSWER_SENTENCES)
+FAST_ANSWER_NODES = os.environ.get("FAST_ANSWER_NODES", "5")
+FAST_ANSWER_NODES = int(FAST_ANSWER_NODES)
+FAST_ANSWER_CONTEXT_TOKENS = os.environ.get("FAST_ANSWER_CONTEXT_TOKENS", "1500")
+FAST_ANSWER_CONTEXT_TOKENS = int(FAST_ANSWER_CONTEXT_TOKENS)
+FAST_ANSWER_MIN_SIMILARITY = os.environ.get("FAST_ANSWER_MIN_SIMILARITY", "0.3")
+FAST_ANSWER_MIN_SIMILARITY = float(FAST_ANSWER_MIN_SIMILARITY)
+
+# Queries slower than this many seconds (0 disables) are written to a rotating log with their plan.
+# SLOW_QUERY_PLAN is 'explain', 'profile' (re-runs read-only queries to measure them) or 'none'
+SLOW_QUERY_SECONDS = os.environ.get("SLOW_QUERY_SECONDS", "1.0")
+SLOW_QUERY_SECONDS = float(SLOW_QUERY_SECONDS)
+SLOW_QUERY_PLAN = os.environ.get("SLOW_QUERY_PLAN", "explain")
+SLOW_QUERY_LOG_PATH = os.environ.get(
+    "SLOW_QUERY_LOG_PATH", os.path.join(os.path.expanduser("~"), ".cache", "odin", "slow_queries.log"))
+SLOW_QUERY_LOG_MAX_BYTES = os.environ.get("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024))
+SLOW_QUERY_LOG_MAX_BYTES = int(SLOW_QUERY_LOG_MAX_BYTES)
+SLOW_QUERY_LOG_BACKUPS = os.environ.get("SLOW_QUERY_LOG_BACKUPS", "5")
+SLOW_QUERY_LOG_BACKUPS = int(SLOW_QUERY_LOG_BACKUPS)
+# Characters of the query text kept per log entry
+SLOW_QUERY_MAX_CHARS = os.environ.get("SLOW_QUERY_MAX_CHARS", "4000")
+SLOW_QUERY_MAX_CHARS = int(SLOW_QUERY_MAX_CHARS)
+
+# How node embeddings are stored in Memgraph: 'float' (list property), 'float16' or 'int8' (packed)
+NODE_EMBEDDINGS_STORAGE = os.environ.get("NODE_EMBEDDINGS_STORAGE", "float")
+
+# Parallel LLM extractions when applying a batch of file changes
+BULK_EXTRACTION_WORKERS = os.environ.get("BULK_EXTRACTION_WORKERS", "4")
+BULK_EXTRACTION_WORKERS = int(BULK_EXTRACTION_WORKERS)
+
+# Quiet period after the last save of a note before it is extracted, and the longest
+# time continuous saves can postpone it
+WRITE_DEBOUNCE_SECONDS = os.environ.get("WRITE_DEBOUNCE_SECONDS", "3")
+WRITE_DEBOUNCE_SECONDS = float(WRITE_DEBOUNCE_SECONDS)
+WRITE_MAX_DELAY_SECONDS = os.environ.get("WRITE_MAX_DELAY_SECONDS", "30")
+WRITE_MAX_DELAY_SECONDS = float(WRITE_MAX_DELAY_SECONDS)
+# A failed batch of writes is retried after WRITE_RETRY_SECONDS, doubled on every further
+# failure, until it failed WRITE_MAX_ATTEMPTS times
+WRITE_RETRY_SECONDS = os.environ.get("WRITE_RETRY_SECONDS", "5")
+WRITE_RETRY_SECONDS = float(WRITE_RETRY_SECONDS)
+WRITE_MAX_ATTEMPTS = os.environ.get("WRITE_MAX_ATTEMPTS", "3")
+WRITE_MAX_ATTEMPTS = int(WRITE_MAX_ATTEMPTS)
+
+# Nodes or edges per bulk load query when a snapshot is restored
+SNAPSHOT_BATCH_SIZE = os.environ.get("SNAPSHOT_BATCH_SIZE", "1000")
+SNAPSHOT_BATCH_SIZE = int(SNAPSHOT_BATCH_SIZE)
+# Snapshot of the mock data, restored on startup in MOCK mode instead of rebuilding it; empty disables
+MOCK_SNAPSHOT_PATH = os.environ.get(
+    "MOCK_SNAPSHOT_PATH", os.path.join(os.path.expanduser("~"), ".cache", "odin", "mock_snapshot.msgpack.gz"))
+
+# Number of change versions per repo for which deleted element ids are kept for delta sync
+SYNC_TOMBSTONE_RETENTION = os.environ.get("SYNC_TOMBSTONE_RETENTION", "1000")
+SYNC_TOMBSTONE_RETENTION = int(SYNC_TOMBSTONE_RETENTION)
+
+# Code index configuration
+CODE_INDEX_CACHE_DIR = os.environ.get(
+    "CODE_INDEX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "odin", "code_index"))
+CODE_INDEX_WORKERS = os.environ.get("CODE_INDEX_WORKERS", "0")  # 0 means one worker per CPU
+CODE_INDEX_WORKERS = int(CODE_INDEX_WORKERS)
+
+# Upper bound on the size of a single code agent tool output, in estimated tokens
+CODE_TOOL_TOKEN_BUDGET = os.environ.get("CODE_TOOL_TOKEN_BUDGET", "2000")
+CODE_TOOL_TOKEN_BUDGET = int(CODE_TOOL_TOKEN_BUDGET)
+# Seconds before the cached repo file listing is rebuilt
+CODE_FILE_INDEX_TTL = os.environ.get("CODE_FILE_INDEX_TTL", "60")
+CODE_FILE_INDEX_TTL = float(CODE_FILE_INDEX_TTL)
+
+# Guardrails for Cypher written by agents: execution timeout, rows returned and size of
+# the result handed back to the agent, in estimated tokens
+AGENT_QUERY_TIMEOUT_SECONDS = os.environ.get("AGENT_QUERY_TIMEOUT_SECONDS", "10")
+AGENT_QUERY_TIMEOUT_SECONDS = float(AGENT_QUERY_TIMEOUT_SECONDS)
+AGENT_QUERY_MAX_ROWS = os.environ.get("AGENT_QUERY_MAX_ROWS", "100")
+AGENT_QUERY_MAX_ROWS = int(AGENT_QUERY_MAX_ROWS)
+AGENT_QUERY_TOKEN_BUDGET = os.environ.get("AGENT_QUERY_TOKEN_BUDGET", "2000")
+AGENT_QUERY_TOKEN_BUDGET = int(AGENT_QUERY_TOKEN_BUDGET)
+
+# Components loaded in the background at startup (embeddings, tokenizer, prompts, llm);
+# /health/ready reports ready once all of them are warm. Failed ones are retried.
+WARMUP_COMPONENTS = os.environ.get("WARMUP_COMPONENTS", "embeddings,tokenizer,prompts,llm")
+WARMUP_COMPONENTS = [c.strip() for c in WARMUP_COMPONENTS.split(',') if c.strip()]
+WARMUP_RETRY_SECONDS = os.environ.get("WARMUP_RETRY_SECONDS", "30")
+WARMUP_RETRY_SECONDS = float(WARMUP_RETRY_SECONDS)
+# Loading a large model into Ollama can take a while
+WARMUP_LLM_TIMEOUT_SECONDS = os.environ.get("WARMUP_LLM_TIMEOUT_SECONDS", "300")
+WARMUP_LLM_TIMEOUT_SECONDS = float(WARMUP_LLM_TIMEOUT_SECONDS)
+# Seconds between keep-alive pings that stop Ollama from unloading the model; 0 pings only at startup
+WARMUP_LLM_PING_SECONDS = os.environ.get("WARMUP_LLM_PING_SECONDS", "0")
+WARMUP_LLM_PING_SECONDS = float(WARMUP_LLM_PING_SECONDS)
+
 MOCK = (os.environ.get("MOCK", 'False') == 'True')
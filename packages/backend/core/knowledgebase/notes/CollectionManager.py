@@ -1,33 +1,66 @@
 from __future__ import annotations
 
-from typing import Union, Optional
+from typing import Union, Optional, Dict, List, Tuple, Any
 
 import pathlib
+import hashlib
 import os
+import uuid
 
-import chromadb
-import nltk
+import numpy as np
 
 import core.knowledgebase.constants as constants
+from core.knowledgebase.Metrics import Metrics
 from core.knowledgebase.Utils import Utils
 
 
+class MeteredEmbeddingFunction:
+    """Chroma embedding function that records the batch size and latency of its calls."""
+
+    def __init__(self: MeteredEmbeddingFunction, ef: Any) -> None:
+        self.ef = ef
+        return
+
+    def __call__(self: MeteredEmbeddingFunction, input: List[str]) -> List[List[float]]:
+        with Metrics.time_embedding('chroma', len(input)):
+            return self.ef(input)
+
+    def __getattr__(self: MeteredEmbeddingFunction, name: str) -> Any:
+        return getattr(self.ef, name)
+
+
+class MeteredCollection:
+    """Chroma collection that records the latency of its reads and writes."""
+
+    OPERATIONS = {'add', 'get', 'query', 'update', 'upsert', 'delete'}
+
+    def __init__(self: MeteredCollection, collection: Any) -> None:
+        self.collection = collection
+        return
+
+    def __getattr__(self: MeteredCollection, name: str) -> Any:
+        attr = getattr(self.collection, name)
+        if name not in MeteredCollection.OPERATIONS:
+            return attr
+        histogram = Metrics.chroma_seconds.labels(operation=name)
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with histogram.time():
+                return attr(*args, **kwargs)
+        return timed
+
+
 class CollectionManager:
+    _embedding_function = None  # Cache, so the embedding model is loaded once per process
+
     def __init__(self: CollectionManager, repo_path: Optional[str] = None) -> None:
+        # Chroma and nltk take seconds to import, so they are loaded on first use rather than at startup
+        import chromadb
 
         self.chroma_client = chromadb.PersistentClient(
             constants.CHROMA_DATA_DIR, settings=chromadb.Settings(allow_reset=True))
 
-        # Initialize embedding function based on provider
-        if constants.EMBEDDING_PROVIDER == "local":
-            self.ada_ef = chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name=constants.EMBEDDING_MODEL_NAME
-            )
-        else:  # openai
-            self.ada_ef = chromadb.utils.embedding_functions.OpenAIEmbeddingFunction(
-                api_key=constants.OPENAI_API_KEY,
-                model_name=constants.EMBEDDING_MODEL_NAME,
-            )
+        self.ada_ef = CollectionManager.get_embedding_function()
 
         if repo_path is not None:
             self.collection_name = Utils.collection_name_from_repo_path(
@@ -36,12 +69,32 @@ class CollectionManager:
 
         return
 
+    @staticmethod
+    def get_embedding_function():
+        if CollectionManager._embedding_function is None:
+            from chromadb.utils import embedding_functions
+            # Initialize embedding function based on provider
+            if constants.EMBEDDING_PROVIDER == "local":
+                ef = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=constants.EMBEDDING_MODEL_NAME
+                )
+            elif constants.EMBEDDING_PROVIDER == "onnx":
+                from core.knowledgebase.notes.OnnxEmbedder import OnnxEmbedder
+                ef = OnnxEmbedder.shared()
+            else:  # openai
+                ef = embedding_functions.OpenAIEmbeddingFunction(
+                    api_key=constants.OPENAI_API_KEY,
+                    model_name=constants.EMBEDDING_MODEL_NAME,
+                )
+            CollectionManager._embedding_function = MeteredEmbeddingFunction(ef)
+        return CollectionManager._embedding_function
+
     def _make_collection(self: CollectionManager, collection_name: str) -> None:
-        self.collection = self.chroma_client.get_or_create_collection(
+        self.collection = MeteredCollection(self.chroma_client.get_or_create_collection(
             name=collection_name,
             metadata={"hnsw:space": constants.CHROMA_VECTOR_SPACE},
             embedding_function=self.ada_ef
-        )
+        ))
         return
 
     def _delete_collection(self: CollectionManager, collection_name: str) -> None:
@@ -52,16 +105,115 @@ class CollectionManager:
         self.chroma_client.reset()
         return
 
+    def collection_names(self: CollectionManager) -> List[str]:
+        # Newer chromadb versions list names, older ones Collection objects
+        return [c if isinstance(c, str) else c.name for c in self.chroma_client.list_collections()]
+
+    def export_collection(self: CollectionManager, collection_name: str) -> Dict[str, Any]:
+        """All entries of a collection, with their stored embeddings as a float32 matrix."""
+        collection = MeteredCollection(self.chroma_client.get_collection(
+            name=collection_name, embedding_function=self.ada_ef))
+        out = {"name": collection_name, "metadata": collection.metadata,
+               "ids": [], "documents": [], "metadatas": []}
+        vectors = []
+        page_size = constants.EXPORT_PAGE_SIZE
+        while True:
+            page = collection.get(include=['documents', 'metadatas', 'embeddings'],
+                                  limit=page_size, offset=len(out['ids']))
+            if not page['ids']:
+                break
+            out['ids'] += page['ids']
+            out['documents'] += page['documents']
+            out['metadatas'] += page['metadatas']
+            vectors.append(np.asarray(page['embeddings'], dtype=np.float32))
+        out['embeddings'] = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return out
+
+    def import_collection(self: CollectionManager, collection_name: str, metadata: Optional[Dict[str, Any]],
+                          ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                          embeddings: np.ndarray) -> None:
+        """Adds entries with their embeddings to the collection, so nothing is embedded again."""
+        collection = MeteredCollection(self.chroma_client.get_or_create_collection(
+            name=collection_name, metadata=metadata, embedding_function=self.ada_ef))
+        batch_size = self._write_batch_size()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            collection.add(ids=ids[start:end], documents=documents[start:end],
+                           metadatas=metadatas[start:end], embeddings=embeddings[start:end].tolist())
+        return
+
+    def _write_batch_size(self: CollectionManager) -> int:
+        try:
+            return min(constants.CHROMA_WRITE_BATCH_SIZE, self.chroma_client.get_max_batch_size())
+        except AttributeError:  # chromadb versions without a max batch size
+            return constants.CHROMA_WRITE_BATCH_SIZE
+
+    @staticmethod
+    def sentence_hash(sentence: str) -> str:
+        return hashlib.sha1(sentence.encode()).hexdigest()
+
+    @staticmethod
+    def sentence_ids(count: int) -> List[str]:
+        # Sentences are matched by the sentence_hash metadata, so ids carry neither the path nor the
+        # content: a renamed file's entries keep theirs, and a new file at the old path can't collide
+        return [uuid.uuid4().hex for _ in range(count)]
+
+    def _add_sentences(self: CollectionManager, file_path: Union[str, os.PathLike], sentences: List[str]) -> None:
+        hashes = [CollectionManager.sentence_hash(s) for s in sentences]
+        sent_ids = CollectionManager.sentence_ids(len(sentences))
+        batch_size = self._write_batch_size()
+        for start in range(0, len(sentences), batch_size):
+            end = start + batch_size
+            self.collection.add(
+                documents=sentences[start:end],
+                metadatas=[{"file_path": str(file_path), "sentence_hash": h} for h in hashes[start:end]],
+                ids=sent_ids[start:end]
+            )
+        return
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        import nltk
+        return nltk.tokenize.sent_tokenize(text)
+
     def add_file(self: CollectionManager, file_path: Union[str, os.PathLike]) -> None:
         text = pathlib.Path(file_path).read_text()
-        sentences = nltk.tokenize.sent_tokenize(text)
-        text_len = len(sentences)
-        sent_ids = [f"{file_path}_{str(ind)}" for ind in range(text_len)]
-        self.collection.add(
-            documents=sentences,
-            metadatas=[{"file_path": str(file_path)}] * text_len,
-            ids=sent_ids
+        sentences = CollectionManager.split_sentences(text)
+        self._add_sentences(file_path, sentences)
+        return
+
+    def update_file(self: CollectionManager, file_path: Union[str, os.PathLike]) -> None:
+        """
+        Brings the file's sentences in line with its content on disk. Unchanged sentences keep
+        their ids and embeddings; only removed sentences are deleted and only new ones embedded.
+        """
+        text = pathlib.Path(file_path).read_text()
+        sentences = CollectionManager.split_sentences(text)
+
+        existing = self.collection.get(
+            where={"file_path": str(file_path)},
+            include=['documents', 'metadatas']
         )
+        # Ids by sentence hash; duplicate sentences have several ids
+        existing_ids = dict()
+        for sent_id, document, metadata in zip(existing['ids'], existing['documents'], existing['metadatas']):
+            h = (metadata or {}).get('sentence_hash') or CollectionManager.sentence_hash(document)
+            existing_ids.setdefault(h, []).append(sent_id)
+
+        new_sentences = []
+        for sentence in sentences:
+            ids = existing_ids.get(CollectionManager.sentence_hash(sentence))
+            if ids:
+                ids.pop()
+            else:
+                new_sentences.append(sentence)
+
+        stale_ids = [sent_id for ids in existing_ids.values() for sent_id in ids]
+        batch_size = self._write_batch_size()
+        for start in range(0, len(stale_ids), batch_size):
+            self.collection.delete(ids=stale_ids[start:start + batch_size])
+
+        self._add_sentences(file_path, new_sentences)
         return
 
     def delete_file(self: CollectionManager, file_path: Union[str, os.PathLike]) -> None:
@@ -71,11 +223,29 @@ class CollectionManager:
         return
 
     def rename_file(self: CollectionManager, old_file_path: Union[str, os.PathLike], new_file_path: Union[str, os.PathLike]) -> None:
-        ids = self.collection.get(
-            where={"file_path": str(old_file_path)}
-        )['ids']
+        self.rename_files([(str(old_file_path), str(new_file_path))])
+        return
+
+    def delete_files(self: CollectionManager, file_paths: List[Union[str, os.PathLike]]) -> None:
+        if not file_paths:
+            return
+        self.collection.delete(
+            where={"file_path": {"$in": [str(p) for p in file_paths]}}
+        )
+        return
+
+    def rename_files(self: CollectionManager, renames: List[Tuple[str, str]]) -> None:
+        if not renames:
+            return
+        new_path_by_old = {str(old): str(new) for old, new in renames}
+        res = self.collection.get(
+            where={"file_path": {"$in": list(new_path_by_old.keys())}},
+            include=['metadatas']
+        )
+        if not res['ids']:
+            return
         self.collection.update(
-            ids, metadatas=[{"file_path": str(new_file_path)}] * len(ids))
+            res['ids'], metadatas=[dict(m, file_path=new_path_by_old[m['file_path']]) for m in res['metadatas']])
         return
 
     def delete_all_from_collection(self: CollectionManager) -> None:
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import List
 
 from core.knowledgebase import constants
+from core.knowledgebase.Metrics import Metrics
 
 
 class Embeddings:
@@ -12,18 +13,46 @@ class Embeddings:
     def get_embedding(text: str, model=None) -> List[float]:
         text = text.replace("\n", " ")
         
-        if constants.EMBEDDING_PROVIDER == "local":
-            # Use local sentence-transformers model
-            if Embeddings._local_model is None:
-                from sentence_transformers import SentenceTransformer
+        with Metrics.time_embedding('embeddings', 1):
+            if constants.EMBEDDING_PROVIDER == "local":
+                # Use local sentence-transformers model
+                if Embeddings._local_model is None:
+                    from sentence_transformers import SentenceTransformer
+                    model_name = model or constants.EMBEDDING_MODEL_NAME
+                    Embeddings._local_model = SentenceTransformer(model_name)
+                return Embeddings._local_model.encode(text).tolist()
+            elif constants.EMBEDDING_PROVIDER == "onnx":
+                from core.knowledgebase.notes.OnnxEmbedder import OnnxEmbedder
+                return OnnxEmbedder.shared().encode([text])[0].tolist()
+            else:  # openai
+                import openai
+                openai.api_key = constants.OPENAI_API_KEY
                 model_name = model or constants.EMBEDDING_MODEL_NAME
-                Embeddings._local_model = SentenceTransformer(model_name)
-            return Embeddings._local_model.encode(text).tolist()
-        else:  # openai
-            import openai
-            openai.api_key = constants.OPENAI_API_KEY
-            model_name = model or constants.EMBEDDING_MODEL_NAME
-            return openai.Embedding.create(input=[text], model=model_name)['data'][0]['embedding']
+                return openai.Embedding.create(input=[text], model=model_name)['data'][0]['embedding']
+
+    @staticmethod
+    def get_embeddings(texts: List[str], model=None) -> List[List[float]]:
+        """Batch variant of get_embedding, one model call for all texts."""
+        if not texts:
+            return []
+        texts = [text.replace("\n", " ") for text in texts]
+
+        with Metrics.time_embedding('embeddings', len(texts)):
+            if constants.EMBEDDING_PROVIDER == "local":
+                if Embeddings._local_model is None:
+                    from sentence_transformers import SentenceTransformer
+                    model_name = model or constants.EMBEDDING_MODEL_NAME
+                    Embeddings._local_model = SentenceTransformer(model_name)
+                return Embeddings._local_model.encode(texts).tolist()
+            elif constants.EMBEDDING_PROVIDER == "onnx":
+                from core.knowledgebase.notes.OnnxEmbedder import OnnxEmbedder
+                return OnnxEmbedder.shared().encode(texts).tolist()
+            else:  # openai
+                import openai
+                openai.api_key = constants.OPENAI_API_KEY
+                model_name = model or constants.EMBEDDING_MODEL_NAME
+                data = openai.Embedding.create(input=texts, model=model_name)['data']
+                return [d['embedding'] for d in sorted(data, key=lambda d: d['index'])]
 
 
 if __name__ == '__main__':
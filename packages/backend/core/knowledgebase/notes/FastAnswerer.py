@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Dict, List, Any, Optional, Tuple
+
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from core.knowledgebase import constants
+from core.knowledgebase.Utils import Utils
+from core.knowledgebase.TextAnalizer import TextAnalizer
+from core.knowledgebase.notes.Searcher import Searcher
+
+
+class FastAnswerer:
+    """
+    Answers a question about a notes repo with a single LLM call: the closest sentences
+    from Chroma and the closest graph nodes are retrieved in parallel, packed into one
+    context of at most FAST_ANSWER_CONTEXT_TOKENS, and handed to the model together.
+
+    answer() returns None when retrieval found nothing similar enough or the model says
+    the context doesn't answer the question, so the caller can fall back to the agent.
+    """
+
+    UNKNOWN = "i don't know"
+    # Retrieval runs concurrently for all requests; each search is short, so a small pool suffices
+    _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='fast-answer')
+
+    def __init__(self: FastAnswerer, repo_path: str) -> None:
+        self.repo_path = repo_path
+        self.searcher = Searcher(repo_path)
+        self.ta = TextAnalizer()
+        return
+
+    def _nodes(self: FastAnswerer, query_embeddings: List[float]) -> List[Tuple[float, str]]:
+        hits = self.searcher.search_graph(query_embeddings=query_embeddings, k=constants.FAST_ANSWER_NODES)
+        descriptions = self.searcher.mm.describe_nodes([hit['ID(node1)'] for hit in hits])
+        return [(hit['cosine_similarity'], descriptions[hit['ID(node1)']])
+                for hit in hits if hit['ID(node1)'] in descriptions]
+
+    @staticmethod
+    def build_context(sentences: List[Dict[str, Any]], nodes: List[Tuple[float, str]], token_budget: int) -> str:
+        """Sentences and node descriptions, best first, alternating between the two, within the budget."""
+        sentence_lines = [f"- {s['document']} ({s['file_path']})"
+                          for s in sorted(sentences, key=lambda s: -s['similarity'])]
+        node_lines = [description.strip() for _, description in sorted(nodes, key=lambda n: -n[0])]
+
+        kept_sentences, kept_nodes = [], []
+        used = 0
+        for i in range(max(len(sentence_lines), len(node_lines))):
+            for lines, kept in ((sentence_lines, kept_sentences), (node_lines, kept_nodes)):
+                if i < len(lines):
+                    cost = Utils.estimate_tokens(lines[i])
+                    if used + cost <= token_budget:
+                        kept.append(lines[i])
+                        used += cost
+        return "<sentences>\n" + '\n'.join(kept_sentences) + "\n\n<nodes>\n" + '\n\n'.join(kept_nodes)
+
+    def answer(self: FastAnswerer, question: str) -> Optional[str]:
+        query_embeddings = Searcher.query_cache.get(question)
+        # Copied contexts keep the slow query log's route and repo on the worker threads
+        sentences_future = FastAnswerer._executor.submit(
+            contextvars.copy_context().run, self.searcher.search_sentences,
+            query_embeddings, constants.FAST_ANSWER_SENTENCES)
+        nodes_future = FastAnswerer._executor.submit(
+            contextvars.copy_context().run, self._nodes, query_embeddings)
+        sentences, nodes = sentences_future.result(), nodes_future.result()
+
+        best = max([s['similarity'] for s in sentences] + [n[0] for n in nodes], default=0.0)
+        if best < constants.FAST_ANSWER_MIN_SIMILARITY:
+            return None
+
+        context = FastAnswerer.build_context(sentences, nodes, constants.FAST_ANSWER_CONTEXT_TOKENS)
+        answer = self.ta.answer_from_context(question, context)
+        if answer.strip().lower().replace('’', "'").startswith(FastAnswerer.UNKNOWN):
+            return None
+        return answer
+
+
+if __name__ == '__main__':
+    example_repopath = os.path.join(os.path.dirname(__file__), '..', 'mock_repos', 'History')
+    print(FastAnswerer(example_repopath).answer("When was Napoleon born?"))
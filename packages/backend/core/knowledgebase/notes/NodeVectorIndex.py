@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core.knowledgebase import constants
+from core.knowledgebase.MemgraphManager import MemgraphManager
+
+
+class NodeVectorIndex:
+    """
+    In-memory matrix of the normalized node embeddings of one repo.
+
+    Indexes are cached per repo and keyed by the repo's change version and
+    embeddings version, so a search only scores the nodes of the repo it is
+    for, and the matrix is only reloaded after the repo's graph or its
+    embeddings changed. At most NODE_VECTOR_INDEX_CACHE_SIZE repos are
+    kept; the least recently searched one is dropped first.
+    """
+
+    _indexes: OrderedDict[str, NodeVectorIndex] = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self: NodeVectorIndex, repo_path: str, key: Tuple[int, int],
+                 node_ids: List[int], embeddings: np.ndarray) -> None:
+        self.repo_path = repo_path
+        self.key = key
+        self.node_ids = node_ids
+        self.matrix = NodeVectorIndex.normalize(np.asarray(embeddings, dtype=np.float32))
+        return
+
+    @staticmethod
+    def for_repo(repo_path: str, mm: MemgraphManager) -> NodeVectorIndex:
+        state = mm.get_sync_state(repo_path)
+        key = (state['version'], state['embeddings_version'])
+        with NodeVectorIndex._lock:
+            index = NodeVectorIndex._indexes.get(repo_path)
+            if index is not None:
+                NodeVectorIndex._indexes.move_to_end(repo_path)
+        if index is None or index.key != key:
+            # Loaded outside the lock, so searches in other repos don't wait for it
+            node_ids, embeddings = mm.node_embeddings_for_repo(repo_path)
+            index = NodeVectorIndex(repo_path, key, node_ids, embeddings)
+            with NodeVectorIndex._lock:
+                NodeVectorIndex._indexes[repo_path] = index
+                NodeVectorIndex._indexes.move_to_end(repo_path)
+                while len(NodeVectorIndex._indexes) > constants.NODE_VECTOR_INDEX_CACHE_SIZE:
+                    NodeVectorIndex._indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        if vectors.size == 0:
+            return vectors
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    @staticmethod
+    def top_k(queries: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and scores of the k best candidates per query, best first. Both inputs normalized."""
+        similarity = queries @ candidates.T
+        k = min(k, candidates.shape[0])
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarity, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return top, np.take_along_axis(similarity, top, axis=1)
+
+    def search(self: NodeVectorIndex, queries: List[List[float]], k: int) -> List[List[Tuple[float, int]]]:
+        """(cosine similarity, node id) of the k nodes closest to each query, best first."""
+        if not self.node_ids:
+            return [[] for _ in queries]
+        q = NodeVectorIndex.normalize(np.asarray(queries, dtype=np.float32))
+        top, scores = NodeVectorIndex.top_k(q, self.matrix, k)
+        return [[(float(s), self.node_ids[j]) for j, s in zip(row, row_scores)]
+                for row, row_scores in zip(top.tolist(), scores.tolist())]
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from typing import Optional, List, Dict, Any, Tuple
+
+import os
+import json
+import logging
+
+import numpy as np
+
+from core.knowledgebase import constants
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxEmbedder:
+    """
+    Runs a sentence-transformers model with ONNX Runtime on the CPU.
+
+    On first use the Hugging Face model is exported to ONNX and, unless disabled,
+    dynamically quantized to int8; both files are kept in ONNX_MODEL_DIR. Pooling,
+    normalization and the maximum sequence length are read from the model's
+    sentence-transformers configuration, so the vectors match the local provider's;
+    models with other modules (e.g. Dense layers) are rejected. Callable with a list
+    of documents, so it can be passed to Chroma as an embedding function.
+    """
+
+    _shared: Optional[OnnxEmbedder] = None  # Cache, so the model is loaded once per process
+
+    BATCH_SIZE = 32
+    MAX_SEQUENCE_LENGTH = 256
+    OPSET_VERSION = 14
+    # Pooling modes in the order sentence-transformers concatenates them
+    POOLING_MODES = ('cls_token', 'max_tokens', 'mean_tokens', 'mean_sqrt_len_tokens')
+
+    def __init__(self: OnnxEmbedder, model_name: Optional[str] = None, model_dir: Optional[str] = None,
+                 num_threads: Optional[int] = None, quantize: Optional[bool] = None) -> None:
+        from transformers import AutoTokenizer
+
+        self.model_name = OnnxEmbedder.hub_model_name(model_name or constants.EMBEDDING_MODEL_NAME)
+        self.model_dir = os.path.join(model_dir or constants.ONNX_MODEL_DIR, self.model_name.replace('/', '__'))
+        self.num_threads = constants.ONNX_NUM_THREADS if num_threads is None else num_threads
+        self.quantize = constants.ONNX_QUANTIZE if quantize is None else quantize
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.pooling_modes, self.normalize, self.max_sequence_length = self._read_pipeline()
+        self.session = self._make_session(self._model_path())
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        return
+
+    @staticmethod
+    def shared() -> OnnxEmbedder:
+        if OnnxEmbedder._shared is None:
+            OnnxEmbedder._shared = OnnxEmbedder()
+        return OnnxEmbedder._shared
+
+    @staticmethod
+    def hub_model_name(model_name: str) -> str:
+        # sentence-transformers accepts bare names like all-MiniLM-L6-v2
+        return model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+
+    def _read_config(self: OnnxEmbedder, filename: str) -> Optional[Any]:
+        """A JSON file of the model, from its directory or the Hugging Face Hub; None if it has none."""
+        if os.path.isdir(self.model_name):
+            path = os.path.join(self.model_name, filename)
+            if not os.path.isfile(path):
+                return None
+        else:
+            from huggingface_hub import hf_hub_download
+            from huggingface_hub.utils import EntryNotFoundError
+
+            try:
+                path = hf_hub_download(self.model_name, filename)
+            except EntryNotFoundError:
+                return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _read_pipeline(self: OnnxEmbedder) -> Tuple[List[str], bool, int]:
+        """Pooling modes, whether to normalize and the maximum sequence length, as sentence-transformers would use them."""
+        modules = self._read_config('modules.json')
+        # sentence-transformers wraps plain Hugging Face models with mean pooling and no normalization
+        pooling_modes, normalize = ['mean_tokens'], False
+        for module in modules or []:
+            kind = module['type'].rsplit('.', 1)[-1]
+            if kind == 'Transformer':
+                continue
+            if kind == 'Normalize':
+                normalize = True
+            elif kind == 'Pooling':
+                config: Dict[str, Any] = self._read_config(f"{module['path']}/config.json") or dict()
+                enabled = {key[len('pooling_mode_'):] for key, value in config.items()
+                           if key.startswith('pooling_mode_') and value}
+                unsupported = enabled - set(OnnxEmbedder.POOLING_MODES)
+                if unsupported or not enabled:
+                    raise ValueError(f"{self.model_name} uses {', '.join(sorted(unsupported)) or 'no'} pooling, "
+                                     f"which the onnx provider doesn't support; use the local provider")
+                pooling_modes = [mode for mode in OnnxEmbedder.POOLING_MODES if mode in enabled]
+            else:
+                raise ValueError(f"{self.model_name} has a {kind} module, which the onnx provider "
+                                 f"doesn't support; use the local provider")
+        config = self._read_config('sentence_bert_config.json') or dict()
+        return pooling_modes, normalize, config.get('max_seq_length') or OnnxEmbedder.MAX_SEQUENCE_LENGTH
+
+    @staticmethod
+    def pool(hidden: np.ndarray, attention_mask: np.ndarray, modes: List[str]) -> np.ndarray:
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        lengths = np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled = []
+        for mode in modes:
+            if mode == 'cls_token':
+                pooled.append(hidden[:, 0])
+            elif mode == 'max_tokens':
+                pooled.append(np.where(mask > 0, hidden, -1e9).max(axis=1))
+            elif mode == 'mean_tokens':
+                pooled.append((hidden * mask).sum(axis=1) / lengths)
+            else:
+                pooled.append((hidden * mask).sum(axis=1) / np.sqrt(lengths))
+        return np.concatenate(pooled, axis=1)
+
+    def _export(self: OnnxEmbedder, path: str) -> None:
+        import torch
+        from transformers import AutoModel
+
+        logger.info(f"Exporting {self.model_name} to {path}")
+        model = AutoModel.from_pretrained(self.model_name)
+        model.eval()
+        dummy = dict(self.tokenizer(["An example sentence."], return_tensors='pt'))
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in dummy}
+        dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model, (dummy,), tmp_path,
+                input_names=list(dummy.keys()),
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic_axes,
+                opset_version=OnnxEmbedder.OPSET_VERSION,
+            )
+        os.replace(tmp_path, path)
+        return
+
+    def _model_path(self: OnnxEmbedder) -> str:
+        os.makedirs(self.model_dir, exist_ok=True)
+        fp32_path = os.path.join(self.model_dir, 'model.onnx')
+        if not os.path.isfile(fp32_path):
+            self._export(fp32_path)
+        if not self.quantize:
+            return fp32_path
+
+        int8_path = os.path.join(self.model_dir, 'model_int8.onnx')
+        if not os.path.isfile(int8_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            logger.info(f"Quantizing {fp32_path} to int8")
+            tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, int8_path)
+        return int8_path
+
+    def _make_session(self: OnnxEmbedder, path: str):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads > 0:
+            # 0 leaves the choice to ONNX Runtime, which uses all physical cores
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+        return onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def encode(self: OnnxEmbedder, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        batch_size = batch_size or OnnxEmbedder.BATCH_SIZE
+        out = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_sequence_length, return_tensors='np')
+            feed = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+            hidden = self.session.run(['last_hidden_state'], feed)[0]
+
+            pooled = OnnxEmbedder.pool(hidden, encoded['attention_mask'], self.pooling_modes)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            out.append(pooled)
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(out)
+
+    def __call__(self: OnnxEmbedder, input: List[str]) -> List[List[float]]:
+        return self.encode(list(input)).tolist()
+
+
+if __name__ == '__main__':
+    embedder = OnnxEmbedder.shared()
+    print(embedder.encode(['bonaparte', 'napoleon']).shape)
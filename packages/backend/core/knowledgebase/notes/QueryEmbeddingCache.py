@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import threading
+from collections import OrderedDict
+
+from core.knowledgebase import constants
+from core.knowledgebase.notes.Embeddings import Embeddings
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU of query text -> embedding vector.
+
+    Texts are normalized (surrounding and repeated whitespace) before lookup, and keys
+    include the embedding provider and model, so switching models never returns stale vectors.
+    """
+
+    def __init__(self: QueryEmbeddingCache, maxsize: Optional[int] = None) -> None:
+        self.maxsize = constants.QUERY_EMBEDDING_CACHE_SIZE if maxsize is None else maxsize
+        self.entries: OrderedDict[Tuple[str, str, str], List[float]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        return
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return ' '.join(text.split())
+
+    @staticmethod
+    def _key(text: str) -> Tuple[str, str, str]:
+        return (constants.EMBEDDING_PROVIDER, constants.EMBEDDING_MODEL_NAME, QueryEmbeddingCache.normalize(text))
+
+    def get(self: QueryEmbeddingCache, text: str) -> List[float]:
+        return self.get_many([text])[0]
+
+    def get_many(self: QueryEmbeddingCache, texts: List[str]) -> List[List[float]]:
+        keys = [QueryEmbeddingCache._key(text) for text in texts]
+        found: Dict[Tuple[str, str, str], List[float]] = dict()
+        with self.lock:
+            for key in keys:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[key] = self.entries[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        # Embedded outside the lock; a text missed by two threads at once is embedded twice
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing:
+            vectors = Embeddings.get_embeddings([key[2] for key in missing])
+            found.update(zip(missing, vectors))
+            with self.lock:
+                for key, vector in zip(missing, vectors):
+                    self.entries[key] = vector
+                    self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def stats(self: QueryEmbeddingCache) -> Dict[str, float]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self.entries),
+            }
+
+    def clear(self: QueryEmbeddingCache) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+        return
@@ -1,52 +1,95 @@
 from __future__ import annotations
 
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Dict
 
 import os
+import heapq
+import itertools
 
-from core.knowledgebase.notes.Embeddings import Embeddings
+from core.knowledgebase import constants
+from core.knowledgebase.notes.QueryEmbeddingCache import QueryEmbeddingCache
 from core.knowledgebase.MemgraphManager import MemgraphManager
+from core.knowledgebase.notes.NodeVectorIndex import NodeVectorIndex
 from core.knowledgebase.notes.CollectionManager import CollectionManager
 
 
 class Searcher:
+    # Shared by all searchers, so repeated queries within an agent run or across requests are embedded once
+    query_cache = QueryEmbeddingCache()
+
     def __init__(self: Searcher, repo_path: str) -> None:
         self.repo_path = repo_path
         self.mm = MemgraphManager()
+        self.cm = None
         return
 
-    def search_graph(self: Searcher, query_text: Optional[str] = None, query_embeddings: Optional[List[float]] = None) -> List[Any]:
+    def _collection_manager(self: Searcher) -> CollectionManager:
+        if self.cm is None:
+            self.cm = CollectionManager(self.repo_path)
+        return self.cm
+
+    def search_graph(self: Searcher, query_text: Optional[str] = None, query_embeddings: Optional[List[float]] = None,
+                     k: int = 3) -> List[Any]:
+        """The k nodes of this repo closest to the query, scored in this repo's NodeVectorIndex."""
         assert (query_text is not None) or (query_embeddings is not None)
         if query_text is not None:
-            emb_vector = Embeddings.get_embedding(query_text)
+            emb_vector = Searcher.query_cache.get(query_text)
         else:
             emb_vector = query_embeddings
 
-        self.mm.create_temp_nodes(emb_vector)
-        results = None
-        try:
-            results = self.mm.vector_search_query()
-        finally:
-            self.mm.delete_temp_nodes()
-        return list(results)
+        hits = NodeVectorIndex.for_repo(self.repo_path, self.mm).search([emb_vector], k)[0]
+        return [{'ID(node1)': node_id, 'cosine_similarity': score} for score, node_id in hits]
+
+    def search_graph_across_repos(self: Searcher, repo_paths: List[str], query_text: Optional[str] = None,
+                                  query_embeddings: Optional[List[float]] = None, k: int = 3) -> List[Any]:
+        """Explicit fan-out: top k of each repo's index, merged into the overall top k."""
+        assert (query_text is not None) or (query_embeddings is not None)
+        if query_text is not None:
+            emb_vector = Searcher.query_cache.get(query_text)
+        else:
+            emb_vector = query_embeddings
+
+        per_repo = []
+        for repo_path in dict.fromkeys(repo_paths):
+            hits = NodeVectorIndex.for_repo(repo_path, self.mm).search([emb_vector], k)[0]
+            per_repo.append([(score, node_id, repo_path) for score, node_id in hits])
+        # Each repo's hits are sorted already, so a k-way heap merge is enough
+        merged = heapq.merge(*per_repo, key=lambda hit: -hit[0])
+        return [{'ID(node1)': node_id, 'cosine_similarity': score, 'repo_path': repo_path}
+                for score, node_id, repo_path in itertools.islice(merged, k)]
 
     def search_graph_tool(self: Searcher, query: str) -> str:
-        results = self.search_graph(query_text=query)
-        out = ""
-        for res in results:
-            out += self.mm.describe_node(res['ID(node1)'])
-            out += "-------------\n"
-        return out
+        ids = [res['ID(node1)'] for res in self.search_graph(query_text=query)]
+        descriptions = self.mm.describe_nodes(ids)
+        return ''.join(f"{descriptions.get(i, '')}-------------\n" for i in ids)
 
     def search_text(self: Searcher, query_text: Optional[str] = None, query_embeddings: Optional[List[float]] = None) -> List[str]:
-        cm = CollectionManager(self.repo_path)
+        if query_text is not None:
+            query_embeddings = Searcher.query_cache.get(query_text)
+        cm = self._collection_manager()
         res = cm.collection.query(
-            query_texts=query_text,
-            query_embeddings=query_embeddings,
+            query_embeddings=[query_embeddings],
             n_results=3,
         )
         return res['documents'][0]
 
+    def search_sentences(self: Searcher, query_embeddings: List[float], n_results: int) -> List[Dict[str, Any]]:
+        """The n_results sentences closest to the query, with their file and similarity, best first."""
+        res = self._collection_manager().collection.query(
+            query_embeddings=[query_embeddings],
+            n_results=n_results,
+            include=['documents', 'metadatas', 'distances']
+        )
+        return [{'document': doc, 'file_path': meta['file_path'], 'similarity': Searcher.distance_to_similarity(d)}
+                for doc, meta, d in zip(res['documents'][0], res['metadatas'][0], res['distances'][0])]
+
+    @staticmethod
+    def distance_to_similarity(distance: float) -> float:
+        # Chroma reports distances in the collection's space; embeddings are normalized
+        if constants.CHROMA_VECTOR_SPACE in ('cosine', 'ip'):
+            return 1 - distance
+        return 1 - distance / 2  # squared l2, Chroma's default
+
     def search_text_tool(self: Searcher, query: str) -> str:
         return '\n'.join(self.search_text(query_text=query))
 
@@ -55,7 +98,7 @@ class Searcher:
         return self.search_text(query_embeddings=emb)
 
     def sentence_to_node_ids(self: Searcher, sentence: str) -> List[int]:
-        cm = CollectionManager(self.repo_path)
+        cm = self._collection_manager()
         res = cm.collection.query(
             query_texts=sentence,
             n_results=1,
@@ -65,15 +108,60 @@ class Searcher:
         return [node['ID(node1)'] for node in self.search_graph(query_embeddings=emb)]
 
     def most_probable_filename_for_text(self: Searcher, query_text: Optional[str] = None) -> str:
-        cm = CollectionManager(self.repo_path)
+        cm = self._collection_manager()
         res = cm.collection.query(
-            query_texts=query_text,
-            query_embeddings=None,
+            query_embeddings=[Searcher.query_cache.get(query_text)],
             n_results=1
         )
         fname = res['metadatas'][0][0]['file_path']
         return fname
 
+    def sentences_to_node_ids(self: Searcher, sentences: List[str], n_results: int = 3) -> List[List[int]]:
+        """Batch variant of sentence_to_node_ids, scored against the nodes of this repo in one matrix product."""
+        if not sentences:
+            return []
+        cm = self._collection_manager()
+        res = cm.collection.query(
+            query_texts=sentences,
+            n_results=1,
+            include=['embeddings']
+        )
+        matched = [i for i, emb in enumerate(res['embeddings']) if len(emb) > 0]
+        if not matched:
+            return [[] for _ in sentences]
+        index = NodeVectorIndex.for_repo(self.repo_path, self.mm)
+        top = index.search([res['embeddings'][i][0] for i in matched], n_results)
+
+        out = [[] for _ in sentences]
+        for i, hits in zip(matched, top):
+            out[i] = [node_id for _, node_id in hits]
+        return out
+
+    def node_ids_to_sentences(self: Searcher, ids: List[int]) -> List[List[str]]:
+        """Batch variant of node_id_to_sentences."""
+        emb_by_id = self.mm.embeddings_for_nodes(ids)
+        known_ids = [i for i in ids if i in emb_by_id]
+        if not known_ids:
+            return [[] for _ in ids]
+        cm = self._collection_manager()
+        res = cm.collection.query(
+            query_embeddings=[emb_by_id[i] for i in known_ids],
+            n_results=3,
+        )
+        sentences_by_id = dict(zip(known_ids, res['documents']))
+        return [sentences_by_id.get(i, []) for i in ids]
+
+    def most_probable_filenames_for_texts(self: Searcher, query_texts: List[str]) -> List[Optional[str]]:
+        """Batch variant of most_probable_filename_for_text."""
+        if not query_texts:
+            return []
+        cm = self._collection_manager()
+        res = cm.collection.query(
+            query_embeddings=Searcher.query_cache.get_many(query_texts),
+            n_results=1
+        )
+        return [m[0]['file_path'] if m else None for m in res['metadatas']]
+
 
 if __name__ == '__main__':
     query_text = "counsul"
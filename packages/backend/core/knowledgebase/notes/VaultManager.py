@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from typing import Any, Dict, List, Optional, Tuple
+
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
 from core.knowledgebase import constants
 from core.knowledgebase.Utils import Utils
+from core.knowledgebase.QueryLog import QueryLog
 from core.knowledgebase.TextAnalizer import TextAnalizer
 from core.knowledgebase.MemgraphManager import MemgraphManager
 from core.knowledgebase.notes.CollectionManager import CollectionManager
@@ -30,9 +34,86 @@ class VaultManager:
                 res_queries = self.ta.data_and_text_to_cypher_update(
                     str(data), file_text, self.vault_path, file_path)
 
-            self.mm.run_update_query(res_queries)
+            with QueryLog.context(file_path=file_path, repo_path=self.vault_path):
+                self.mm.run_update_query(res_queries, self.vault_path, [file_path])
             self.cm.add_file(file_path)
 
         for i, file_path in enumerate(file_paths):
             self.mm.update_embeddings(file_path)
         return
+
+    @staticmethod
+    def coalesce_changes(changes: List[Dict[str, Any]]) -> Tuple[List[str], List[Tuple[str, str]], Dict[str, Optional[str]]]:
+        """
+        Reduces an ordered list of file operations ({"operation": add|update|delete|rename,
+        "path", "content", "new_path"}) to the deleted paths, the renames from original to
+        final path, and the final content of every added or updated path (None means read it from disk).
+        """
+        deleted = []
+        renamed_from = dict()
+        contents = dict()
+        for change in changes:
+            operation, path = change['operation'], change['path']
+            if operation in ('add', 'update'):
+                contents[path] = change.get('content')
+            elif operation == 'delete':
+                contents.pop(path, None)
+                path = renamed_from.pop(path, path)
+                if path not in deleted:
+                    deleted.append(path)
+            elif operation == 'rename':
+                new_path = change['new_path']
+                if path in contents:
+                    contents[new_path] = contents.pop(path)
+                renamed_from[new_path] = renamed_from.pop(path, path)
+
+        renames = [(old, new) for new, old in renamed_from.items() if old != new]
+        return deleted, renames, contents
+
+    def _extract(self: VaultManager, file_path: str, text: str, data: List[Dict[str, Any]]) -> str:
+        # TextAnalizer keeps the last messages on the instance, so every worker gets its own
+        ta = TextAnalizer()
+        if len(data) == 0:
+            return ta.text_to_cypher_create(text, self.vault_path, file_path)
+        return ta.data_and_text_to_cypher_update(str(data), text, self.vault_path, file_path)
+
+    def apply_changes(self: VaultManager, changes: List[Dict[str, Any]]) -> None:
+        """
+        Applies a batch of file operations: deletes and renames first in set-based queries,
+        then LLM extraction of all changed notes in parallel against one snapshot of the graph,
+        and finally a single embedding refresh of every affected file.
+        """
+        deleted, renames, contents = VaultManager.coalesce_changes(changes)
+        changed = list(contents.keys())
+
+        # Files linked to removed nodes need new embeddings too, so collect them before deleting
+        affected = set(self.mm.neighbour_file_paths(deleted))
+        self.mm.delete_graph_for_files(deleted)
+        self.cm.delete_files(deleted)
+        self.mm.rename_files(renames)
+        self.cm.rename_files(renames)
+
+        affected.update(self.mm.neighbour_file_paths(changed))
+        self.mm.delete_graph_for_files(changed)
+
+        if changed:
+            data = self.mm.export_data_for_repo_path(self.vault_path)
+            texts = [contents[p] if contents[p] is not None else pathlib.Path(p).read_text()
+                     for p in changed]
+            with ThreadPoolExecutor(max_workers=constants.BULK_EXTRACTION_WORKERS) as executor:
+                queries = list(executor.map(
+                    lambda args: self._extract(args[0], args[1], data), zip(changed, texts)))
+
+            with self.mm.versioned_update(self.vault_path, changed):
+                for file_path, res_queries in zip(changed, queries):
+                    with QueryLog.context(file_path=file_path, repo_path=self.vault_path):
+                        self.mm.run_update_query(res_queries)
+                    self.cm.update_file(file_path)
+
+        affected.update(changed)
+        affected.update(new for _, new in renames)
+        affected.update(self.mm.neighbour_file_paths(changed))
+        # A path deleted and then added again in the same batch exists and needs its embeddings
+        affected.difference_update(set(deleted) - contents.keys())
+        self.mm.update_embeddings_for_files(list(affected))
+        return
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional
+
+import time
+import logging
+import threading
+from collections import deque
+
+from core.knowledgebase import constants
+from core.knowledgebase.GraphSummarizer import GraphSummarizer
+from core.knowledgebase.notes.VaultManager import VaultManager
+
+logger = logging.getLogger(__name__)
+
+
+class WriteScheduler:
+    """
+    Queues file changes per repo and applies them in the background.
+
+    Adds and updates are debounced per file path: a new write to a path replaces the
+    pending one and restarts its window, so a burst of autosaves becomes one extraction.
+    Deletes and renames are not delayed, but never overtake earlier pending changes.
+    Each repo has at most one worker thread, so writes to one repo never run concurrently.
+    A batch that fails is put back at the front of the queue and retried with backoff;
+    after WRITE_MAX_ATTEMPTS it is dropped and listed by failures().
+    """
+
+    # Failed batches kept per repo for failures()
+    MAX_FAILURES = 100
+
+    def __init__(self: WriteScheduler, debounce_seconds: Optional[float] = None,
+                 max_delay_seconds: Optional[float] = None,
+                 apply: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None) -> None:
+        self.debounce_seconds = constants.WRITE_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        self.max_delay_seconds = constants.WRITE_MAX_DELAY_SECONDS if max_delay_seconds is None else max_delay_seconds
+        self.apply = apply or WriteScheduler.apply_with_vault_manager
+        self.condition = threading.Condition()
+        self.pending: Dict[str, List[Dict[str, Any]]] = dict()
+        self.workers: Dict[str, threading.Thread] = dict()
+        self.failed: Dict[str, deque] = dict()
+        return
+
+    @staticmethod
+    def apply_with_vault_manager(repo_path: str, changes: List[Dict[str, Any]]) -> None:
+        vm = VaultManager(repo_path)
+        vm.apply_changes(changes)
+        # Recomputed here, so the next summarized export doesn't wait for it
+        GraphSummarizer.refresh_cached(repo_path, vm.mm)
+        return
+
+    def schedule(self: WriteScheduler, repo_path: str, change: Dict[str, Any]) -> None:
+        """Queues a change ({"operation", "path", "content", "new_path"}, as for VaultManager.apply_changes)."""
+        now = time.monotonic()
+        with self.condition:
+            queue = self.pending.setdefault(repo_path, [])
+            if change['operation'] in ('add', 'update'):
+                first_at = WriteScheduler._drop_superseded(queue, change['path'])
+                change = dict(change, due_at=now + self.debounce_seconds,
+                              first_at=now if first_at is None else first_at)
+            else:
+                change = dict(change, due_at=now, first_at=now)
+            queue.append(change)
+
+            if repo_path not in self.workers:
+                worker = threading.Thread(
+                    target=self._run, args=(repo_path,), name=f"write-scheduler-{repo_path}", daemon=True)
+                self.workers[repo_path] = worker
+                worker.start()
+            self.condition.notify_all()
+        return
+
+    @staticmethod
+    def _drop_superseded(queue: List[Dict[str, Any]], path: str) -> Optional[float]:
+        """Removes the pending write to path, unless a delete or rename touches it later. Returns its first_at."""
+        for i in range(len(queue) - 1, -1, -1):
+            queued = queue[i]
+            if queued['path'] == path or queued.get('new_path') == path:
+                if queued['operation'] in ('add', 'update'):
+                    del queue[i]
+                    return queued['first_at']
+                return None
+        return None
+
+    def _due_prefix(self: WriteScheduler, queue: List[Dict[str, Any]], now: float) -> int:
+        n = 0
+        for change in queue:
+            # max_delay bounds how long continuous typing can postpone a write
+            if change['due_at'] > now and change['first_at'] + self.max_delay_seconds > now:
+                break
+            n += 1
+        return n
+
+    def _run(self: WriteScheduler, repo_path: str) -> None:
+        while True:
+            with self.condition:
+                queue = self.pending.get(repo_path, [])
+                if not queue:
+                    del self.workers[repo_path]
+                    self.pending.pop(repo_path, None)
+                    self.condition.notify_all()
+                    return
+                now = time.monotonic()
+                n = self._due_prefix(queue, now)
+                if n == 0:
+                    head = queue[0]
+                    wake_at = min(head['due_at'], head['first_at'] + self.max_delay_seconds)
+                    self.condition.wait(timeout=max(wake_at - now, 0.01))
+                    continue
+                batch = queue[:n]
+                del queue[:n]
+
+            changes = [{k: v for k, v in change.items() if k not in ('due_at', 'first_at', 'attempts')}
+                       for change in batch]
+            try:
+                self.apply(repo_path, changes)
+            except Exception as e:
+                logger.exception(f"Applying {len(changes)} changes to {repo_path} failed")
+                self._retry_or_drop(repo_path, batch, e)
+            else:
+                self._clear_failures(repo_path, changes)
+
+    def _retry_or_drop(self: WriteScheduler, repo_path: str, batch: List[Dict[str, Any]], error: Exception) -> None:
+        attempts = max(change.get('attempts', 0) for change in batch) + 1
+        with self.condition:
+            if attempts < constants.WRITE_MAX_ATTEMPTS:
+                retry_at = time.monotonic() + constants.WRITE_RETRY_SECONDS * 2 ** (attempts - 1)
+                # Back at the front, so later changes still apply after it; first_at is moved
+                # too, because max_delay would make the batch due again right away
+                retried = [dict(change, due_at=retry_at, first_at=retry_at, attempts=attempts) for change in batch]
+                self.pending.setdefault(repo_path, [])[:0] = retried
+                return
+            failures = self.failed.setdefault(repo_path, deque(maxlen=WriteScheduler.MAX_FAILURES))
+            failures.append({
+                "paths": sorted({p for change in batch for p in (change['path'], change.get('new_path')) if p}),
+                "operations": [change['operation'] for change in batch],
+                "error": str(error),
+                "attempts": attempts,
+                "failed_at": time.time(),
+            })
+        logger.error(f"Dropped {len(batch)} changes to {repo_path} after {attempts} attempts")
+        return
+
+    def _clear_failures(self: WriteScheduler, repo_path: str, changes: List[Dict[str, Any]]) -> None:
+        # A later successful write of the same files supersedes their failed ones
+        applied = {p for change in changes for p in (change['path'], change.get('new_path')) if p}
+        with self.condition:
+            failures = self.failed.get(repo_path)
+            if failures:
+                remaining = [f for f in failures if not set(f['paths']) <= applied]
+                failures.clear()
+                failures.extend(remaining)
+        return
+
+    def failures(self: WriteScheduler, repo_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Batches of changes that were dropped after WRITE_MAX_ATTEMPTS failed attempts, oldest first."""
+        with self.condition:
+            if repo_path is not None:
+                return [dict(f) for f in self.failed.get(repo_path, [])]
+            return [dict(f, repo_path=path) for path, failures in self.failed.items() for f in failures]
+
+    def pending_count(self: WriteScheduler, repo_path: Optional[str] = None) -> int:
+        with self.condition:
+            if repo_path is not None:
+                return len(self.pending.get(repo_path, []))
+            return sum(len(queue) for queue in self.pending.values())
+
+    def flush(self: WriteScheduler, timeout: Optional[float] = None) -> bool:
+        """Makes all pending changes due now and waits until they are applied. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            for queue in self.pending.values():
+                for change in queue:
+                    change['due_at'] = 0.0
+            self.condition.notify_all()
+            while self.workers:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(timeout=remaining)
+        return True
@@ -1,25 +1,38 @@
-from typing import Union, List
+from typing import Union, List, Dict, Any, Iterator, Optional
 
 from enum import Enum
+import itertools
+import time
+
+import orjson
+
 from core.knowledgebase.Utils import Utils
 
-from fastapi import FastAPI, status, Response
+from fastapi import FastAPI, HTTPException, status, Request, Response, Query
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from core.knowledgebase import constants
 
 from core.knowledgebase.Initializer import Initializer
+from core.knowledgebase.CompactExporter import CompactExporter, EmbeddingsMode
+from core.knowledgebase.GraphSummarizer import GraphSummarizer
+from core.knowledgebase.Metrics import Metrics
 from core.knowledgebase.MemgraphManager import MemgraphManager
+from core.knowledgebase.QueryLog import QueryLog
+from core.knowledgebase.Snapshot import Snapshot
 from core.knowledgebase.TextAnalizer import TextAnalizer
-from core.knowledgebase.QueryAgents import NotesQueryAgent, CodeQueryAgent
+from core.knowledgebase.WarmUp import WarmUp
 
 from core.knowledgebase.notes.VaultManager import VaultManager
 from core.knowledgebase.notes.CollectionManager import CollectionManager
+from core.knowledgebase.notes.FastAnswerer import FastAnswerer
 from core.knowledgebase.notes.Searcher import Searcher
+from core.knowledgebase.notes.WriteScheduler import WriteScheduler
 
 from core.knowledgebase.code.APIRepoManager import APIRepoManager
 from core.knowledgebase.code.LocalRepoManager import LocalRepoManager
@@ -30,6 +43,13 @@ class Type(Enum):
     CODE = "Code"
 
 
+class ExportFormat(Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+    COMPACT = "compact"
+    SUMMARY = "summary"
+
+
 class Repo(BaseModel):
     path: str
     type: Union[Type, None] = None
@@ -46,14 +66,21 @@ class File(BaseModel):
     content: Union[str, None] = None
 
 
+class AnswerMode(Enum):
+    AGENT = "agent"
+    FAST = "fast"
+
+
 class Question(BaseModel):
     repo: Repo
     prompt: str
     type: Union[Type, None] = None
+    mode: AnswerMode = AnswerMode.AGENT
 
 
 class Answer(BaseModel):
     content: str
+    mode: Union[AnswerMode, None] = None
 
 
 class Node(BaseModel):
@@ -66,6 +93,74 @@ class Sentence(BaseModel):
     content: str
 
 
+class Nodes(BaseModel):
+    repo: Repo
+    ids: List[int]
+
+
+class Sentences(BaseModel):
+    repo: Repo
+    contents: List[str]
+
+
+class GraphSearch(BaseModel):
+    repos: List[Repo]
+    content: str
+    k: int = Field(3, ge=1, le=constants.GRAPH_SEARCH_MAX_K)
+
+
+class NodeMatch(BaseModel):
+    repo: Repo
+    id: int
+    score: float
+
+
+class Neighbourhood(BaseModel):
+    ids: List[int]
+    repo: Union[Repo, None] = None
+    depth: int = 1
+    max_nodes: int = 200
+    relationship_types: Union[List[str], None] = None
+
+
+class Cluster(BaseModel):
+    repo: Repo
+    id: int
+
+
+class FileOperation(Enum):
+    ADD = "add"
+    UPDATE = "update"
+    DELETE = "delete"
+    RENAME = "rename"
+
+
+class FileChange(BaseModel):
+    operation: FileOperation
+    path: str
+    content: Union[str, None] = None
+    new_path: Union[str, None] = None
+
+
+class FileChanges(BaseModel):
+    repo: Repo
+    changes: List[FileChange]
+
+
+class WriteFailure(BaseModel):
+    paths: List[str]
+    operations: List[str]
+    error: str
+    attempts: int
+    failed_at: float
+
+
+class WriteStatus(BaseModel):
+    repo: Repo
+    pending: int
+    failures: List[WriteFailure]
+
+
 class Paragraph(BaseModel):
     content: str
 
@@ -73,23 +168,150 @@ class Paragraph(BaseModel):
 app = FastAPI()
 mm = MemgraphManager()
 ta = TextAnalizer()
+ws = WriteScheduler()
+Metrics.watch_query_cache(Searcher.query_cache)
 
 
 @app.on_event("startup")
 def startup() -> None:
     if constants.MOCK and mm.check_if_db_empty():
         Initializer.init_vault_mock_data()
+    # Serving starts right away; /health/ready tells when the models are loaded
+    WarmUp.start()
+    return
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    ws.flush(timeout=constants.WRITE_MAX_DELAY_SECONDS)
     return
 
 
+@app.middleware("http")
+async def record_route_latency(request: Request, call_next) -> Response:
+    start = time.perf_counter()
+    with QueryLog.context(route=request.url.path):
+        response = await call_next(request)
+    # Labelled with the route template, so path parameters don't create new series
+    route = request.scope.get("route")
+    Metrics.http_seconds.labels(method=request.method,
+                                route=route.path if route is not None else "unmatched",
+                                status=response.status_code).observe(time.perf_counter() - start)
+    return response
+
+
+@app.get("/health/ready")
+def health_ready() -> JSONResponse:
+    readiness = WarmUp.status()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=readiness)
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    return Response(content=Metrics.render(), media_type=Metrics.CONTENT_TYPE)
+
+
+def ndjson_response(records: Iterator[Dict[str, Any]]) -> Response:
+    first = next(records, None)
+    if first is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    lines = (orjson.dumps(r) + b"\n" for r in itertools.chain([first], records))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+def sync_etag(sync_state: Dict[str, int], *variant: Any) -> Optional[str]:
+    # Repos written before change versions were recorded have version 0 and get no ETag
+    if sync_state['version'] == 0:
+        return None
+    # Every representation of the same version gets its own tag, and embeddings are versioned separately
+    parts = [sync_state['version'], sync_state['embeddings_version']] + [v for v in variant if v is not None]
+    return '"' + '-'.join(str(getattr(p, 'value', p)) for p in parts) + '"'
+
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def compact_response(records: Iterator[Dict[str, Any]], embeddings: EmbeddingsMode, request: Request) -> Response:
+    payload = CompactExporter(embeddings).encode(records)
+    headers = {"Vary": "Accept-Encoding"}
+    # Clients that don't accept gzip get the plain msgpack
+    if accepts_gzip(request):
+        payload = CompactExporter.compress(payload)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=payload, media_type=CompactExporter.MEDIA_TYPE, headers=headers)
+
+
 @app.post("/knowledge_base/general/get_all_for_repo")
-def get_all_for_repo(repo: Repo) -> Response:
+def get_all_for_repo(repo: Repo, request: Request,
+                     export_format: ExportFormat = Query(ExportFormat.JSON, alias="format"),
+                     since: Optional[int] = None,
+                     embeddings: EmbeddingsMode = EmbeddingsMode.NONE) -> Response:
+    sync_state = mm.get_sync_state(repo.path)
+    sync_version = sync_state['version']
+    etag = sync_etag(sync_state, export_format, embeddings, since)
+    headers = {"ETag": etag} if etag else {}
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if since is not None:
+        if since == sync_version:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        changes = mm.export_changes_for_repo_path(repo.path, since)
+        return JSONResponse(content=jsonable_encoder(changes), headers=headers)
+
+    if export_format == ExportFormat.NDJSON:
+        response = ndjson_response(mm.stream_export_for_repo_path(repo.path))
+        response.headers.update(headers)
+        return response
+    if export_format == ExportFormat.COMPACT:
+        response = compact_response(mm.stream_export_for_repo_path(repo.path), embeddings, request)
+        response.headers.update(headers)
+        return response
+    if export_format == ExportFormat.SUMMARY:
+        summary = GraphSummarizer.for_repo(repo.path, mm).summary
+        return JSONResponse(content=jsonable_encoder(summary), headers=headers)
     data = mm.export_data_for_repo_path(repo.path)
     if data:
         json_data = jsonable_encoder(data)
-        return JSONResponse(content=json_data)
+        return JSONResponse(content=json_data, headers=headers)
     else:
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=headers)
+
+
+@app.post("/knowledge_base/general/neighbourhood")
+def neighbourhood(query: Neighbourhood) -> Response:
+    if not query.ids:
+        raise HTTPException(status_code=422, detail="At least one node id is required")
+    if query.depth < 0 or query.max_nodes < 1:
+        raise HTTPException(status_code=422, detail="depth must be >= 0 and max_nodes >= 1")
+    subgraph = mm.neighbourhood(
+        query.ids,
+        depth=min(query.depth, constants.NEIGHBOURHOOD_MAX_DEPTH),
+        max_nodes=min(query.max_nodes, constants.NEIGHBOURHOOD_MAX_NODES),
+        relationship_types=query.relationship_types,
+        repo_path=query.repo.path if query.repo is not None else None,
+    )
+    return JSONResponse(content=jsonable_encoder(subgraph))
+
+
+@app.post("/knowledge_base/general/expand_cluster")
+def expand_cluster(cluster: Cluster) -> Response:
+    summarizer = GraphSummarizer.for_repo(cluster.repo.path, mm)
+    members = summarizer.members(cluster.id)
+    if not members:
+        raise HTTPException(status_code=404, detail=f"No cluster {cluster.id} in {cluster.repo.path}")
+    max_nodes = constants.NEIGHBOURHOOD_MAX_NODES
+    subgraph = mm.subgraph_for_nodes(members[:max_nodes])
+    subgraph['truncated'] = subgraph['truncated'] or len(members) > max_nodes
+    subgraph['version'] = summarizer.version
+    return JSONResponse(content=jsonable_encoder(subgraph))
 
 
 @app.delete("/knowledge_base/general/delete_all_for_repo")
@@ -103,12 +325,21 @@ def delete_all_for_repo(repo: Repo) -> None:
 
 @app.post("/knowledge_base/general/ask")
 def ask_repo(question: Question) -> Answer:
-    if question.type == Type.NOTES:
-        na = NotesQueryAgent(question.repo.path)
-        return Answer(content=na.ask(question.prompt))
+    # The agents need the whole of langchain, which is imported by the first question instead of at startup
+    from core.knowledgebase.QueryAgents import NotesQueryAgent, CodeQueryAgent
+
+    with QueryLog.context(repo_path=question.repo.path):
+        if question.type == Type.NOTES:
+            # Fast mode makes one LLM call over retrieved context; the agent answers if that isn't enough
+            if question.mode == AnswerMode.FAST:
+                content = FastAnswerer(question.repo.path).answer(question.prompt)
+                if content is not None:
+                    return Answer(content=content, mode=AnswerMode.FAST)
+            na = NotesQueryAgent(question.repo.path)
+            return Answer(content=na.ask(question.prompt), mode=AnswerMode.AGENT)
 
-    ca = CodeQueryAgent(question.repo.path)
-    return Answer(content=ca.ask(question.prompt))
+        ca = CodeQueryAgent(question.repo.path)
+        return Answer(content=ca.ask(question.prompt), mode=AnswerMode.AGENT)
 
 
 @app.post("/knowledge_base/general/get_schema")
@@ -123,7 +354,8 @@ def init_repo(repo: Repo) -> None:
     if repo.type == Type.CODE:
         lrm = LocalRepoManager(repo.path)
         cypher = lrm.generate_cypher()
-        mm.run_update_query(cypher)
+        mm.run_update_query(cypher, lrm.root_path)
+        mm.create_symbol_index()
         return
     vm = VaultManager(repo.path)
     vm.populate_vault()
@@ -138,6 +370,23 @@ def delete_all() -> None:
     return
 
 
+@app.get("/knowledge_base/general/export_snapshot")
+def export_snapshot() -> Response:
+    return Response(content=Snapshot.export(),
+                    media_type=Snapshot.MEDIA_TYPE,
+                    headers={"Content-Disposition": f'attachment; filename="{Snapshot.FILE_NAME}"'})
+
+
+@app.post("/knowledge_base/general/restore_snapshot")
+async def restore_snapshot(request: Request) -> Dict[str, Any]:
+    # The request body is the file returned by export_snapshot
+    payload = await request.body()
+    try:
+        return await run_in_threadpool(Snapshot.restore, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @app.post("/knowledge_base/text_analizer/code/optimize_style")
 def optimize_syle(paragraph: Paragraph) -> Answer:
     ta = TextAnalizer()
@@ -163,8 +412,13 @@ def generate_questions(paragraph: Paragraph) -> Answer:
 
 
 @app.post("/knowledge_base/notes/get_for_path")
-def get_for_path(file: File) -> Response:
+def get_for_path(file: File, request: Request, export_format: ExportFormat = Query(ExportFormat.JSON, alias="format"),
+                 embeddings: EmbeddingsMode = EmbeddingsMode.NONE) -> Response:
     mm = MemgraphManager()
+    if export_format == ExportFormat.NDJSON:
+        return ndjson_response(mm.stream_export_for_file_path(file.path))
+    if export_format == ExportFormat.COMPACT:
+        return compact_response(mm.stream_export_for_file_path(file.path), embeddings, request)
     data = mm.export_data_for_file_path(file.path)
     if data:
         json_data = jsonable_encoder(data)
@@ -176,80 +430,62 @@ def get_for_path(file: File) -> Response:
 
 
 @app.put("/knowledge_base/notes/update_file")
-def update_file(file: File) -> None:
-    mm = MemgraphManager()
+def update_file(file: File) -> Response:
     repo_path = Utils.repo_path_from_file_path(file.path)
-
-    cm = CollectionManager(repo_path)
-    ta = TextAnalizer()
-
-    data = mm.export_data_for_repo_path(repo_path)
-
-    mm.delete_graph_for_file(file.path)
-    cm.delete_file(file.path)
-
-    if isinstance(data, list) and len(data) == 0:
-        res_queries = ta.text_to_cypher_create(
-            file.content, repo_path, file.path)
-    else:
-        res_queries = ta.data_and_text_to_cypher_update(
-            data, file.content, repo_path, file.path)
-
-    mm.run_update_query(res_queries)
-    cm.add_file(file.path)
-
-    for path in Utils.get_all_files_recursive(repo_path):
-        mm.update_embeddings(path)
-
-    return
+    ws.schedule(repo_path, {"operation": "update", "path": file.path, "content": file.content})
+    return Response(status_code=status.HTTP_202_ACCEPTED)
 
 # TODO: test with GPT4
 
 
 @app.put("/knowledge_base/notes/add_file")
-def add_file(file: File) -> None:
-    mm = MemgraphManager()
+def add_file(file: File) -> Response:
     repo_path = Utils.repo_path_from_file_path(file.path)
+    ws.schedule(repo_path, {"operation": "add", "path": file.path, "content": file.content})
+    return Response(status_code=status.HTTP_202_ACCEPTED)
 
-    cm = CollectionManager(repo_path)
-    ta = TextAnalizer()
 
-    data = mm.export_data_for_repo_path(repo_path)
+@app.delete("/knowledge_base/notes/delete_file")
+def delete_file(file: File) -> Response:
+    repo_path = Utils.repo_path_from_file_path(file.path)
+    ws.schedule(repo_path, {"operation": "delete", "path": file.path})
+    return Response(status_code=status.HTTP_202_ACCEPTED)
 
-    if isinstance(data, list) and len(data) == 0:
-        res_queries = ta.text_to_cypher_create(
-            file.content, repo_path, file.path)
-    else:
-        res_queries = ta.data_and_text_to_cypher_update(
-            data, file.content, repo_path, file.path)
 
-    mm.run_update_query(res_queries)
-    cm.add_file(file.path)
+@app.post("/knowledge_base/notes/rename_file")
+def rename_file(old_file: File, new_file: File) -> Response:
+    repo_path = Utils.repo_path_from_file_path(old_file.path)
+    ws.schedule(repo_path, {"operation": "rename", "path": old_file.path, "new_path": new_file.path})
+    return Response(status_code=status.HTTP_202_ACCEPTED)
 
-    for path in Utils.get_all_files_recursive(repo_path):
-        mm.update_embeddings(path)
 
+@app.post("/knowledge_base/notes/flush_writes")
+def flush_writes() -> None:
+    ws.flush()
     return
 
 
-@app.delete("/knowledge_base/notes/delete_file")
-def delete_file(file: File) -> None:
-    repo_path = Utils.repo_path_from_file_path(file.path)
-    mm = MemgraphManager()
-    cm = CollectionManager(repo_path)
-    mm.delete_graph_for_file(file.path)
-    cm.delete_file(file.path)
-    return
+@app.post("/knowledge_base/notes/write_status")
+def write_status(repo: Repo) -> WriteStatus:
+    return WriteStatus(repo=repo, pending=ws.pending_count(repo.path),
+                       failures=[WriteFailure(**f) for f in ws.failures(repo.path)])
 
 
-@app.post("/knowledge_base/notes/rename_file")
-def rename_file(old_file: File, new_file: File) -> None:
-    repo_path = Utils.repo_path_from_file_path(old_file.path)
-    mm = MemgraphManager()
-    cm = CollectionManager(repo_path)
-    mm.rename_file(old_file.path, new_file.path)
-    cm.rename_file(old_file.path, new_file.path)
-    return
+@app.post("/knowledge_base/notes/apply_changes")
+def apply_changes(file_changes: FileChanges) -> Response:
+    for change in file_changes.changes:
+        if change.operation == FileOperation.RENAME and change.new_path is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=f"rename of {change.path} needs a new_path")
+    # Goes through the write scheduler, so it is serialized with single-file writes to the same repo
+    for change in file_changes.changes:
+        ws.schedule(file_changes.repo.path, {
+            "operation": change.operation.value,
+            "path": change.path,
+            "content": change.content,
+            "new_path": change.new_path,
+        })
+    return Response(status_code=status.HTTP_202_ACCEPTED)
 
 
 @app.post("/knowledge_base/notes/node_to_sentences")
@@ -270,12 +506,49 @@ def suggest_link(sentence: Sentence) -> File:
     return File(path=searcher.most_probable_filename_for_text(query_text=sentence.content))
 
 
+@app.post("/knowledge_base/notes/nodes_to_sentences")
+def nodes_to_sentences(nodes: Nodes) -> List[List[Sentence]]:
+    searcher = Searcher(nodes.repo.path)
+    return [[Sentence(repo=nodes.repo, content=c) for c in contents]
+            for contents in searcher.node_ids_to_sentences(nodes.ids)]
+
+
+@app.post("/knowledge_base/notes/sentences_to_nodes")
+def sentences_to_nodes(sentences: Sentences) -> List[List[Node]]:
+    searcher = Searcher(sentences.repo.path)
+    return [[Node(repo=sentences.repo, id=i) for i in ids]
+            for ids in searcher.sentences_to_node_ids(sentences.contents)]
+
+
+@app.post("/knowledge_base/notes/suggest_links")
+def suggest_links(sentences: Sentences) -> List[Optional[File]]:
+    searcher = Searcher(sentences.repo.path)
+    return [File(path=path) if path is not None else None
+            for path in searcher.most_probable_filenames_for_texts(sentences.contents)]
+
+
+@app.post("/knowledge_base/notes/search_graph")
+def search_graph(graph_search: GraphSearch) -> List[NodeMatch]:
+    if not graph_search.repos:
+        raise HTTPException(status_code=422, detail="At least one repo is required")
+    repos_by_path = {repo.path: repo for repo in graph_search.repos}
+    searcher = Searcher(graph_search.repos[0].path)
+    if len(repos_by_path) == 1:
+        results = [dict(res, repo_path=searcher.repo_path)
+                   for res in searcher.search_graph(query_text=graph_search.content, k=graph_search.k)]
+    else:
+        results = searcher.search_graph_across_repos(
+            list(repos_by_path.keys()), query_text=graph_search.content, k=graph_search.k)
+    return [NodeMatch(repo=repos_by_path[res['repo_path']], id=res['ID(node1)'], score=res['cosine_similarity'])
+            for res in results]
+
+
 @app.post("/knowledge_base/code/init_repo_from_api")
 def init_repo_from_api(remote_repo: RemoteRepo) -> None:
     mm = MemgraphManager()
     arm = APIRepoManager(remote_repo.owner, remote_repo.repo)
     cypher = arm.generate_cypher()
-    mm.run_update_query(cypher)
+    mm.run_update_query(cypher, arm.repo)
     return
 
 
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Import Time Benchmark Script
+
+Measures how long `import core.restapi.api` takes in a fresh interpreter, which is the
+cold start every uvicorn worker pays before it can serve a request. Each run starts
+`python -X importtime`, parses its per-module report and takes the median total over
+all runs; the modules with the largest cumulative import time are listed.
+
+It exits with status 1 if:
+
+- a heavy dependency that should only be loaded on first use is imported eagerly
+  (langchain, langchain_openai, langchain_community, chromadb, nltk,
+  sentence_transformers, torch, onnxruntime, gqlalchemy),
+- the median total exceeds --max-ms, or
+- given a baseline report, the median total grew by more than the allowed ratio.
+
+Prerequisites:
+    Must be run in conda environment: conda activate odin_backend
+    Neither Memgraph nor an LLM is needed; nothing is connected to at import.
+
+Usage:
+    conda activate odin_backend
+    python scripts/benchmark-import-time.py [--runs 5] [--top 20] [--json report.json]
+    python scripts/benchmark-import-time.py --baseline report.json --max-regression 0.25
+
+Options:
+    --module NAME           Module to import (default: core.restapi.api)
+    --runs N                Fresh interpreters to measure (default: 5)
+    --top N                 Modules to list by cumulative import time (default: 20)
+    --max-ms MS             Fail if the median total exceeds this
+    --json PATH             Write the report as JSON
+    --baseline PATH         Compare against a previous JSON report
+    --max-regression R      Allowed relative increase of the median total (default: 0.2)
+    --noise-ms MS           Ignore changes smaller than this (default: 50)
+"""
+
+import sys
+import re
+import json
+import argparse
+import logging
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Any
+
+backend_path = Path(__file__).parent.parent / "packages" / "backend"
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# Loaded on first use by the code that needs them; importing the API must not pull them in
+LAZY_PACKAGES = ('langchain', 'langchain_openai', 'langchain_community', 'chromadb', 'nltk',
+                 'sentence_transformers', 'torch', 'onnxruntime', 'gqlalchemy')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def measure(module: str) -> Dict[str, Any]:
+    """Self and cumulative import time in microseconds of every module imported by one fresh interpreter."""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=backend_path, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-4000:]}")
+
+    modules = dict()
+    total_us = 0
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(4)
+        # A module can appear more than once when an import of it failed and was retried
+        previous = modules.get(name, {"self_us": 0, "cumulative_us": 0})
+        modules[name] = {"self_us": previous["self_us"] + self_us,
+                         "cumulative_us": max(previous["cumulative_us"], cumulative_us)}
+        total_us += self_us
+    return {"total_us": total_us, "modules": modules}
+
+
+def run(module: str, runs: int, top: int) -> Dict[str, Any]:
+    measurements = [measure(module) for _ in range(runs)]
+    median = sorted(measurements, key=lambda m: m["total_us"])[len(measurements) // 2]
+    imported = set(median["modules"])
+    slowest = sorted(median["modules"].items(), key=lambda item: -item[1]["cumulative_us"])[:top]
+    return {
+        "module": module,
+        "runs": runs,
+        "total_ms": round(median["total_us"] / 1000, 2),
+        "totals_ms": [round(m["total_us"] / 1000, 2) for m in measurements],
+        "stdev_ms": round(statistics.pstdev(m["total_us"] for m in measurements) / 1000, 2),
+        "modules_imported": len(imported),
+        "eager_lazy_packages": sorted({name.split('.')[0] for name in imported
+                                       if name.split('.')[0] in LAZY_PACKAGES}),
+        "slowest": [{"module": name, "cumulative_ms": round(t["cumulative_us"] / 1000, 2),
+                     "self_ms": round(t["self_us"] / 1000, 2)} for name, t in slowest],
+    }
+
+
+def regressions(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float,
+                noise_ms: float) -> List[str]:
+    total, total_before = report["total_ms"], baseline.get("total_ms")
+    if total_before is None:
+        return []
+    if total - total_before > noise_ms and total > total_before * (1 + max_regression):
+        return [f"import {report['module']}: {total_before:.1f}ms -> {total:.1f}ms"]
+    return []
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    logger.info("\n" + "=" * 72)
+    logger.info(f"import {report['module']}: median {report['total_ms']:.1f}ms over {report['runs']} runs "
+                f"(stdev {report['stdev_ms']:.1f}ms), {report['modules_imported']} modules")
+    logger.info("=" * 72)
+    logger.info(f"{'module':<48}{'cumulative ms':>14}{'self ms':>10}")
+    for entry in report["slowest"]:
+        logger.info(f"{entry['module'][:47]:<48}{entry['cumulative_ms']:>14.1f}{entry['self_ms']:>10.1f}")
+    logger.info("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the import time of the backend API')
+    parser.add_argument('--module', default='core.restapi.api', help='Module to import')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure')
+    parser.add_argument('--top', type=int, default=20, help='Modules to list by cumulative import time')
+    parser.add_argument('--max-ms', type=float, help='Fail if the median total exceeds this')
+    parser.add_argument('--json', help='Write the report to this JSON file')
+    parser.add_argument('--baseline', help='Previous JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='Allowed relative increase')
+    parser.add_argument('--noise-ms', type=float, default=50.0, help='Ignore changes smaller than this')
+    args = parser.parse_args()
+
+    report = run(args.module, max(args.runs, 1), args.top)
+    print_report(report)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        logger.info(f"Report written to {args.json}")
+
+    found = []
+    if report["eager_lazy_packages"]:
+        found.append(f"imported at startup instead of on first use: {', '.join(report['eager_lazy_packages'])}")
+    if args.max_ms is not None and report["total_ms"] > args.max_ms:
+        found.append(f"import {args.module}: {report['total_ms']:.1f}ms exceeds {args.max_ms:.1f}ms")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        found += regressions(report, baseline, args.max_regression, args.noise_ms)
+
+    if found:
+        logger.error("Import time regressions:")
+        for message in found:
+            logger.error(f"   {message}")
+        sys.exit(1)
+    logger.info("No import time regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Ingestion Benchmark Script
+
+Generates synthetic vaults of configurable size and link density and ingests them
+through the real pipeline (VaultManager, MemgraphManager, CollectionManager), with the
+LLM and the embedding models replaced by deterministic stand-ins:
+
+- A fake chat model behind TextAnalizer that answers with canned Cypher built from the
+  note's title and [[links]], after an optional simulated latency
+- A fake hash-based embedder behind Embeddings and CollectionManager
+
+It reports, per vault size, the throughput and latency percentiles of populate_vault,
+of adding and updating single notes (through VaultManager.apply_changes, as the API does)
+and of the stages inside them (extraction, export, graph writes, Chroma writes, embeddings).
+
+Prerequisites:
+    1. Memgraph must be running (./scripts/start-dev.sh or docker compose up memgraph)
+    2. Must be run in conda environment: conda activate odin_backend
+
+Chroma data goes to a temporary directory; the synthetic vaults' graphs are removed
+from Memgraph before and after each run.
+
+Usage:
+    conda activate odin_backend
+    python scripts/benchmark-ingestion.py [--sizes 100,1000,10000] [--json report.json]
+
+Options:
+    --sizes LIST          Vault sizes in notes (default: 100,1000,10000)
+    --links N             Average [[links]] per note (default: 3)
+    --edits N             Single-note adds and updates measured per size (default: 20)
+    --llm-latency-ms N    Simulated LLM latency per extraction (default: 0)
+    --embed-latency-ms N  Simulated embedding latency per call (default: 0)
+    --json PATH           Also write the report as JSON
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import logging
+import tempfile
+import inspect
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Chroma writes go to a throwaway directory, not the configured one
+os.environ["CHROMA_DATA_DIR"] = tempfile.mkdtemp(prefix="odin-bench-chroma-")
+os.environ.setdefault("CHROMA_VECTOR_SPACE", "cosine")
+
+# Add backend to Python path
+backend_path = Path(__file__).parent.parent / "packages" / "backend"
+sys.path.insert(0, str(backend_path))
+
+from core.knowledgebase.TextAnalizer import TextAnalizer
+from core.knowledgebase.MemgraphManager import MemgraphManager
+from core.knowledgebase.notes.Embeddings import Embeddings
+from core.knowledgebase.notes.CollectionManager import CollectionManager
+from core.knowledgebase.notes.VaultManager import VaultManager
+from core.knowledgebase.Utils import Utils
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 384
+WORDS = ("empire battle river treaty engine steam coal voltage coil army senate consul "
+         "island harbour revolution campaign border tax trade railway pressure piston").split()
+
+
+def generate_vault(root: Path, size: int, links_per_note: int, seed: int = 0) -> List[Path]:
+    """Notes titled 'Note 00000'.. with a few sentences and links to earlier notes."""
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(size):
+        rng = random.Random(seed * 1_000_003 + i)
+        sentences = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + '.'
+                     for _ in range(rng.randint(3, 8))]
+        n_links = min(i, max(0, int(rng.expovariate(1 / links_per_note)))) if links_per_note else 0
+        links = [f"[[{note_title(rng.randrange(i))}]]" for _ in range(n_links)]
+        path = root / f"{note_title(i)}.md"
+        path.write_text(f"# {note_title(i)}\n\n{' '.join(sentences)}\n\n{' '.join(links)}\n")
+        paths.append(path)
+    return paths
+
+
+def note_title(i: int) -> str:
+    return f"Note {i:05d}"
+
+
+class FakeMessage:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class FakeChatModel:
+    """Stands in for ChatOllama/ChatOpenAI: one Note node per file and one Topic node per link."""
+
+    def __init__(self, latency_s: float) -> None:
+        self.latency_s = latency_s
+
+    def predict_messages(self, messages) -> FakeMessage:
+        prompt = messages[-1].content
+        title = re.search(r'^# (Note \d+)', prompt, re.MULTILINE).group(1)
+        file_path = Utils.escape_cypher_value(FakeChatModel.tagged(prompt, 'file_path'))
+        repo_path = Utils.escape_cypher_value(FakeChatModel.tagged(prompt, 'repo_path'))
+        owner = f"file_path: '{file_path}', repo_path: '{repo_path}'"
+
+        lines = [f"MERGE (n:Note {{name: '{title}', {owner}}})"]
+        text = prompt[prompt.index(f"# {title}"):]
+        for j, link in enumerate(dict.fromkeys(re.findall(r'\[\[(Note \d+)\]\]', text))):
+            lines.append(f"MERGE (t{j}:Topic {{name: '{link}', {owner}}})")
+            lines.append(f"MERGE (n)-[:LINKS_TO {{{owner}}}]->(t{j})")
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return FakeMessage("```cypher\n" + '\n'.join(lines) + "\n```")
+
+    @staticmethod
+    def tagged(prompt: str, tag: str) -> str:
+        # The prompts put each path on the line after its <tag> line
+        return re.search(rf"^<{tag}>\n(.*)$", prompt, re.MULTILINE).group(1)
+
+
+class FakeEmbedder:
+    """Deterministic unit vectors derived from a hash of the text."""
+
+    def __init__(self, latency_s: float) -> None:
+        self.latency_s = latency_s
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode()).digest()[:8], 'little')
+            v = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+            vectors.append((v / np.linalg.norm(v)).tolist())
+        return vectors
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embed(list(input))
+
+
+class StageTimer:
+    """Wraps methods so that every call records its duration under a stage name."""
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, List[float]] = dict()
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.durations.setdefault(stage, []).append(seconds)
+
+    def wrap(self, cls: type, name: str, stage: str) -> None:
+        original = inspect.getattr_static(cls, name)
+        is_static = isinstance(original, staticmethod)
+        func = original.__func__ if is_static else original
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        setattr(cls, name, staticmethod(timed) if is_static else timed)
+
+    def time(self, stage: str, fn: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        out = dict()
+        for stage, durations in self.durations.items():
+            ms = np.asarray(durations) * 1000
+            total = float(np.sum(durations))
+            out[stage] = {
+                "calls": len(durations),
+                "total_s": round(total, 3),
+                "per_s": round(len(durations) / total, 2) if total else None,
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            }
+        return out
+
+
+def install_fakes(llm_latency_s: float, embed_latency_s: float) -> None:
+    embedder = FakeEmbedder(embed_latency_s)
+    TextAnalizer.make_model = staticmethod(lambda: FakeChatModel(llm_latency_s))
+    Embeddings.get_embeddings = staticmethod(lambda texts, model=None: embedder.embed(texts))
+    Embeddings.get_embedding = staticmethod(lambda text, model=None: embedder.embed([text])[0])
+    CollectionManager._embedding_function = embedder
+
+
+def install_timers(timer: StageTimer) -> None:
+    timer.wrap(TextAnalizer, 'text_to_cypher_create', 'extract')
+    timer.wrap(TextAnalizer, 'data_and_text_to_cypher_update', 'extract')
+    timer.wrap(MemgraphManager, 'export_data_for_repo_path', 'export')
+    timer.wrap(MemgraphManager, 'run_update_query', 'graph_write')
+    timer.wrap(MemgraphManager, 'update_embeddings', 'node_embeddings')
+    timer.wrap(MemgraphManager, 'update_embeddings_for_files', 'node_embeddings')
+    timer.wrap(CollectionManager, 'add_file', 'chroma_write')
+    timer.wrap(CollectionManager, 'update_file', 'chroma_write')
+    timer.wrap(Embeddings, 'get_embeddings', 'embed')
+
+
+def clean(vault_path: str) -> None:
+    MemgraphManager().delete_all_for_repo(vault_path)
+    CollectionManager(vault_path).delete_all_from_collection()
+
+
+def run_size(size: int, links: int, edits: int, work_dir: Path) -> Tuple[Dict, float]:
+    vault = work_dir / f"vault-{size}"
+    vault_path = str(vault.resolve())
+    generate_vault(vault, size, links)
+    clean(vault_path)
+
+    timer = StageTimer()
+    install_timers(timer)
+    vm = VaultManager(vault_path)
+
+    logger.info(f"[{size} notes] populate_vault")
+    start = time.perf_counter()
+    timer.time('populate_vault', vm.populate_vault)
+    populate_s = time.perf_counter() - start
+
+    edits = min(edits, size)
+    logger.info(f"[{size} notes] {edits} single-note adds and updates")
+    for i in range(edits):
+        path = vault / f"{note_title(size + i)}.md"
+        content = f"# {note_title(size + i)}\n\nA new note about the {WORDS[i % len(WORDS)]}. [[{note_title(i)}]]\n"
+        path.write_text(content)
+        timer.time('add_file', vm.apply_changes, [{"operation": "add", "path": str(path.resolve()), "content": content}])
+    for i in range(edits):
+        path = vault / f"{note_title(i)}.md"
+        content = path.read_text() + f"\nAn edit mentioning the {WORDS[-1 - i % len(WORDS)]}.\n"
+        path.write_text(content)
+        timer.time('update_file', vm.apply_changes, [{"operation": "update", "path": str(path.resolve()), "content": content}])
+
+    clean(vault_path)
+    return timer.report(), populate_s
+
+
+def print_report(size: int, stages: Dict[str, Dict[str, float]], populate_s: float) -> None:
+    logger.info("\n" + "=" * 86)
+    logger.info(f"{size} NOTES - populate_vault {populate_s:.1f}s, {size / populate_s:.1f} notes/s")
+    logger.info("=" * 86)
+    logger.info(f"{'stage':<18}{'calls':>8}{'total s':>10}{'per s':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for stage, r in sorted(stages.items()):
+        per_s = f"{r['per_s']:.1f}" if r['per_s'] else "-"
+        logger.info(f"{stage:<18}{r['calls']:>8}{r['total_s']:>10.2f}{per_s:>10}"
+                    f"{r['p50_ms']:>12.2f}{r['p95_ms']:>12.2f}{r['p99_ms']:>12.2f}")
+    logger.info("=" * 86)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vault ingestion with fake LLM and embedders')
+    parser.add_argument('--sizes', default='100,1000,10000', help='Vault sizes in notes, comma separated')
+    parser.add_argument('--links', type=int, default=3, help='Average [[links]] per note')
+    parser.add_argument('--edits', type=int, default=20, help='Single-note adds and updates per size')
+    parser.add_argument('--llm-latency-ms', type=float, default=0, help='Simulated LLM latency per extraction')
+    parser.add_argument('--embed-latency-ms', type=float, default=0, help='Simulated latency per embedding call')
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    install_fakes(args.llm_latency_ms / 1000, args.embed_latency_ms / 1000)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    report = {"settings": vars(args), "sizes": {}}
+    with tempfile.TemporaryDirectory(prefix="odin-bench-vaults-") as work_dir:
+        for size in sizes:
+            stages, populate_s = run_size(size, args.links, args.edits, Path(work_dir))
+            print_report(size, stages, populate_s)
+            report["sizes"][str(size)] = {"populate_notes_per_s": round(size / populate_s, 2), "stages": stages}
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        logger.info(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
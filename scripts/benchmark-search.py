@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Search Benchmark Script
+
+Loads graphs of increasing size into Memgraph and Chroma by replicating the mock vaults
+(core/knowledgebase/mock_repos and mock_cypherls) under synthetic file paths, then measures
+the search entry points the API exposes:
+
+- search_graph           (Searcher.search_graph)
+- search_text            (Searcher.search_text)
+- sentence_to_node_ids   (Searcher.sentence_to_node_ids)
+- suggest_link           (Searcher.most_probable_filename_for_text)
+
+For every size and entry point it records the first call separately (it builds the
+per-repo caches), p50/p95/p99 latency of the following calls and the peak Python memory
+traced during them, and writes everything to a JSON report. Given a baseline report, it
+exits with status 1 if any p95 or peak memory regressed by more than the allowed ratio.
+
+Embeddings come from a deterministic hash-based stand-in unless --real-embeddings is
+given, so the numbers measure search itself rather than the embedding model.
+
+Prerequisites:
+    1. Memgraph must be running (./scripts/start-dev.sh or docker compose up memgraph)
+    2. Must be run in conda environment: conda activate odin_backend
+
+Chroma data goes to a temporary directory; the synthetic repos are removed from
+Memgraph before and after each run.
+
+Usage:
+    conda activate odin_backend
+    python scripts/benchmark-search.py [--copies 10,100,1000] [--json report.json]
+    python scripts/benchmark-search.py --baseline report.json --max-regression 0.25
+
+Options:
+    --copies LIST           Copies of the 5-note mock vault per size (default: 10,100,1000)
+    --queries N             Timed calls per entry point and size (default: 200)
+    --real-embeddings       Use the configured embedding model instead of the stand-in
+    --warm-cache            Keep the query embedding cache between calls
+    --json PATH             Write the report as JSON
+    --baseline PATH         Compare against a previous JSON report
+    --max-regression R      Allowed relative increase of p95 latency (default: 0.2)
+    --max-memory-regression R
+                            Allowed relative increase of peak memory (default: 0.2)
+    --noise-ms MS           Ignore latency changes smaller than this (default: 1.0)
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import logging
+import tempfile
+import tracemalloc
+import resource
+from pathlib import Path
+from typing import Callable, Dict, List, Any
+
+import numpy as np
+
+# Chroma writes go to a throwaway directory, not the configured one
+os.environ["CHROMA_DATA_DIR"] = tempfile.mkdtemp(prefix="odin-bench-chroma-")
+os.environ.setdefault("CHROMA_VECTOR_SPACE", "cosine")
+
+# Add backend to Python path
+backend_path = Path(__file__).parent.parent / "packages" / "backend"
+sys.path.insert(0, str(backend_path))
+
+from core.knowledgebase.MemgraphManager import MemgraphManager
+from core.knowledgebase.notes.Embeddings import Embeddings
+from core.knowledgebase.notes.CollectionManager import CollectionManager
+from core.knowledgebase.notes.Searcher import Searcher
+from core.knowledgebase.Utils import Utils
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+KNOWLEDGEBASE = backend_path / "core" / "knowledgebase"
+MOCK_NOTES = {
+    'History': ['alexander', 'caesar', 'napoleon'],
+    'Technology': ['generator', 'steam_engine'],
+}
+EMBEDDING_DIM = 384
+LOAD_BATCH_FILES = 500
+
+ENTRY_POINTS: Dict[str, Callable[[Searcher, str], Any]] = {
+    'search_graph': lambda searcher, q: searcher.search_graph(query_text=q),
+    'search_text': lambda searcher, q: searcher.search_text(query_text=q),
+    'sentence_to_node_ids': lambda searcher, q: searcher.sentence_to_node_ids(q),
+    'suggest_link': lambda searcher, q: searcher.most_probable_filename_for_text(query_text=q),
+}
+
+
+class FakeEmbedder:
+    """Deterministic unit vectors derived from a hash of the text."""
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode()).digest()[:8], 'little')
+            v = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+            vectors.append((v / np.linalg.norm(v)).tolist())
+        return vectors
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embed(list(input))
+
+
+def install_fake_embeddings() -> None:
+    embedder = FakeEmbedder()
+    Embeddings.get_embeddings = staticmethod(lambda texts, model=None: embedder.embed(texts))
+    Embeddings.get_embedding = staticmethod(lambda text, model=None: embedder.embed([text])[0])
+    CollectionManager._embedding_function = embedder
+
+
+def load_repo(repo: Path, copies: int) -> List[str]:
+    """Writes `copies` copies of the mock notes under repo and loads their graphs and sentences."""
+    repo_path = str(repo.resolve())
+    mm = MemgraphManager()
+    cm = CollectionManager(repo_path)
+    mm.delete_all_for_repo(repo_path)
+    cm.delete_all_from_collection()
+
+    file_paths = []
+    for copy in range(copies):
+        for vault, notes in MOCK_NOTES.items():
+            for note in notes:
+                file_path = repo / f"copy{copy:05d}" / vault / f"{note}.md"
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(KNOWLEDGEBASE / "mock_repos" / vault / f"{note}.md", file_path)
+                cypherl = (KNOWLEDGEBASE / "mock_cypherls" / vault / f"{note}_cypherl.txt").read_text()
+                mm.run_update_query(retarget(cypherl, str(file_path.resolve()), repo_path))
+                cm.add_file(str(file_path.resolve()))
+                file_paths.append(str(file_path.resolve()))
+    mm.record_sync_version(repo_path)
+
+    for start in range(0, len(file_paths), LOAD_BATCH_FILES):
+        mm.update_embeddings_for_files(file_paths[start:start + LOAD_BATCH_FILES])
+    return file_paths
+
+
+def retarget(cypherl: str, file_path: str, repo_path: str) -> str:
+    """Points the file_path and repo_path properties of a mock cypherl file at the copy."""
+    cypherl = re.sub(r"file_path: '[^']*'", lambda _: f"file_path: '{Utils.escape_cypher_value(file_path)}'", cypherl)
+    return re.sub(r"repo_path: '[^']*'", lambda _: f"repo_path: '{Utils.escape_cypher_value(repo_path)}'", cypherl)
+
+
+def mock_sentences() -> List[str]:
+    sentences = []
+    for vault, notes in MOCK_NOTES.items():
+        for note in notes:
+            text = (KNOWLEDGEBASE / "mock_repos" / vault / f"{note}.md").read_text()
+            sentences.extend(s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if len(s.split()) > 3)
+    return sentences
+
+
+def measure(name: str, searcher: Searcher, queries: List[str], warm_cache: bool) -> Dict[str, float]:
+    call = ENTRY_POINTS[name]
+    Searcher.query_cache.clear()
+
+    start = time.perf_counter()
+    call(searcher, queries[0])
+    first_ms = (time.perf_counter() - start) * 1000
+
+    durations = []
+    tracemalloc.start()
+    for query in queries[1:]:
+        if not warm_cache:
+            Searcher.query_cache.clear()
+        start = time.perf_counter()
+        call(searcher, query)
+        durations.append((time.perf_counter() - start) * 1000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = np.asarray(durations)
+    return {
+        "calls": len(durations),
+        "first_call_ms": round(first_ms, 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "peak_traced_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def run_size(copies: int, n_queries: int, warm_cache: bool, work_dir: Path) -> Dict[str, Any]:
+    repo = work_dir / f"repo-{copies}"
+    repo_path = str(repo.resolve())
+
+    logger.info(f"[{copies} copies] loading")
+    start = time.perf_counter()
+    file_paths = load_repo(repo, copies)
+    load_s = time.perf_counter() - start
+    mm = MemgraphManager()
+    n_nodes = len(mm.node_embeddings_for_repo(repo_path)[0])
+    logger.info(f"[{copies} copies] {len(file_paths)} files, {n_nodes} nodes loaded in {load_s:.1f}s")
+
+    # Vary the queries, so Chroma and the query cache never see the same text twice in a row
+    sentences = mock_sentences()
+    queries = [f"{sentences[i % len(sentences)]} ({i})" for i in range(n_queries + 1)]
+    searcher = Searcher(repo_path)
+    entry_points = dict()
+    for name in ENTRY_POINTS:
+        logger.info(f"[{copies} copies] {name}")
+        entry_points[name] = measure(name, searcher, queries, warm_cache)
+
+    mm.delete_all_for_repo(repo_path)
+    CollectionManager(repo_path).delete_all_from_collection()
+    return {
+        "files": len(file_paths),
+        "nodes": n_nodes,
+        "load_s": round(load_s, 2),
+        "max_rss_mb": max_rss_mb(),
+        "entry_points": entry_points,
+    }
+
+
+def regressions(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float,
+                max_memory_regression: float, noise_ms: float) -> List[str]:
+    """Entry points whose p95 latency or peak memory grew beyond the allowed ratio, as messages."""
+    found = []
+    for size, result in report["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        for name, stats in result["entry_points"].items():
+            before = previous["entry_points"].get(name)
+            if before is None:
+                continue
+            p95, p95_before = stats["p95_ms"], before["p95_ms"]
+            if p95 - p95_before > noise_ms and p95 > p95_before * (1 + max_regression):
+                found.append(f"{size} copies, {name}: p95 {p95_before:.2f}ms -> {p95:.2f}ms")
+            mem, mem_before = stats["peak_traced_mb"], before["peak_traced_mb"]
+            if mem_before > 0 and mem > mem_before * (1 + max_memory_regression):
+                found.append(f"{size} copies, {name}: peak memory {mem_before:.2f}MB -> {mem:.2f}MB")
+    return found
+
+
+def print_report(copies: int, result: Dict[str, Any]) -> None:
+    logger.info("\n" + "=" * 84)
+    logger.info(f"{copies} COPIES - {result['files']} files, {result['nodes']} nodes, "
+                f"max RSS {result['max_rss_mb']}MB")
+    logger.info("=" * 84)
+    logger.info(f"{'entry point':<24}{'first ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MB':>10}")
+    for name, s in result["entry_points"].items():
+        logger.info(f"{name:<24}{s['first_call_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+                    f"{s['p99_ms']:>10.2f}{s['peak_traced_mb']:>10.2f}")
+    logger.info("=" * 84)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark search latency against graph size')
+    parser.add_argument('--copies', default='10,100,1000', help='Copies of the mock vault per size, comma separated')
+    parser.add_argument('--queries', type=int, default=200, help='Timed calls per entry point and size')
+    parser.add_argument('--real-embeddings', action='store_true', help='Use the configured embedding model')
+    parser.add_argument('--warm-cache', action='store_true', help='Keep the query embedding cache between calls')
+    parser.add_argument('--json', help='Write the report to this JSON file')
+    parser.add_argument('--baseline', help='Previous JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='Allowed relative p95 increase')
+    parser.add_argument('--max-memory-regression', type=float, default=0.2, help='Allowed relative peak memory increase')
+    parser.add_argument('--noise-ms', type=float, default=1.0, help='Ignore p95 changes smaller than this')
+    args = parser.parse_args()
+
+    if not args.real_embeddings:
+        install_fake_embeddings()
+
+    report = {"settings": vars(args), "sizes": {}}
+    with tempfile.TemporaryDirectory(prefix="odin-bench-repos-") as work_dir:
+        for copies in [int(c) for c in args.copies.split(',') if c.strip()]:
+            result = run_size(copies, args.queries, args.warm_cache, Path(work_dir))
+            print_report(copies, result)
+            report["sizes"][str(copies)] = result
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        logger.info(f"Report written to {args.json}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        found = regressions(report, baseline, args.max_regression, args.max_memory_regression, args.noise_ms)
+        if found:
+            logger.error("Regressions against the baseline:")
+            for message in found:
+                logger.error(f"   {message}")
+            sys.exit(1)
+        logger.info("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Embedding Backend Comparison Script
+
+Embeds the sentences of a vault (the backend's mock vault by default) with the
+PyTorch sentence-transformers backend (EMBEDDING_PROVIDER="local") and the ONNX
+Runtime backend (EMBEDDING_PROVIDER="onnx"), fp32 and int8, and reports:
+
+- Throughput (sentences/s) and per-batch latency of each backend
+- Cosine similarity of each ONNX vector to the PyTorch vector of the same sentence
+- Nearest-neighbour agreement: overlap of each sentence's top-k neighbours with PyTorch's
+
+Prerequisites:
+    Must be run in conda environment: conda activate odin_backend
+
+Usage:
+    conda activate odin_backend
+    python scripts/compare-embedding-backends.py [--vault PATH] [--threads N]
+
+Options:
+    --vault PATH   Vault to read sentences from (default: backend mock vault)
+    --threads N    CPU threads for every backend (default: 0 = library default)
+    --runs N       Timed runs per backend, best one is reported (default: 3)
+    --k N          Neighbours compared for agreement (default: 5)
+"""
+
+import sys
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Add backend to Python path
+backend_path = Path(__file__).parent.parent / "packages" / "backend"
+sys.path.insert(0, str(backend_path))
+
+import nltk
+
+from core.knowledgebase.notes.OnnxEmbedder import OnnxEmbedder
+from core.knowledgebase import constants
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 32
+
+
+def load_sentences(vault_path: str) -> List[str]:
+    """Sentence-tokenizes every markdown file, the same way CollectionManager does."""
+    sentences = []
+    for file_path in sorted(Path(vault_path).rglob('*.md')):
+        sentences.extend(nltk.tokenize.sent_tokenize(file_path.read_text()))
+    return sentences
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def time_backend(encode: Callable[[List[str]], np.ndarray], sentences: List[str], runs: int) -> Dict:
+    """Encodes all sentences in batches, runs times; keeps the fastest run."""
+    encode(sentences[:BATCH_SIZE])  # warm-up
+    best = None
+    for _ in range(runs):
+        batch_times, vectors = [], []
+        for start in range(0, len(sentences), BATCH_SIZE):
+            t0 = time.perf_counter()
+            vectors.append(np.asarray(encode(sentences[start:start + BATCH_SIZE])))
+            batch_times.append(time.perf_counter() - t0)
+        total = sum(batch_times)
+        if best is None or total < best['total']:
+            best = {"total": total, "batch_times": batch_times, "vectors": normalize(np.concatenate(vectors))}
+    return best
+
+
+def neighbour_agreement(reference: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    """Mean overlap of each sentence's top-k cosine neighbours (excluding itself)."""
+    def top_k(vectors: np.ndarray) -> np.ndarray:
+        scores = vectors @ vectors.T
+        np.fill_diagonal(scores, -np.inf)
+        return np.argsort(-scores, axis=1)[:, :k]
+
+    ref, cand = top_k(reference), top_k(candidate)
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref, cand)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare PyTorch and ONNX embedding backends')
+    parser.add_argument('--vault', default=str(backend_path / "core" / "knowledgebase" / "mock_repos"),
+                        help='Vault to read sentences from (default: backend mock vault)')
+    parser.add_argument('--threads', type=int, default=0, help='CPU threads per backend (0 = library default)')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs per backend')
+    parser.add_argument('--k', type=int, default=5, help='Neighbours compared for agreement')
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.vault)
+    if len(sentences) <= args.k:
+        logger.error(f"Need more than {args.k} sentences, found {len(sentences)} in {args.vault}")
+        sys.exit(1)
+    logger.info(f"{len(sentences)} sentences from {args.vault}, model {constants.EMBEDDING_MODEL_NAME}")
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    torch_model = SentenceTransformer(constants.EMBEDDING_MODEL_NAME, device='cpu')
+
+    backends = {
+        "pytorch": lambda texts: torch_model.encode(texts, batch_size=BATCH_SIZE),
+        "onnx-fp32": OnnxEmbedder(num_threads=args.threads, quantize=False).encode,
+        "onnx-int8": OnnxEmbedder(num_threads=args.threads, quantize=True).encode,
+    }
+
+    results = {name: time_backend(encode, sentences, args.runs) for name, encode in backends.items()}
+    reference = results["pytorch"]
+
+    logger.info("\n" + "=" * 86)
+    logger.info(f"{'backend':<12}{'sent/s':>10}{'speedup':>10}{'p50 ms':>10}{'p95 ms':>10}"
+                f"{'cos mean':>11}{'cos min':>10}{f'top-{args.k}':>10}")
+    logger.info("=" * 86)
+    for name, result in results.items():
+        batch_ms = np.asarray(result['batch_times']) * 1000
+        cosines = np.sum(result['vectors'] * reference['vectors'], axis=1)
+        agreement = neighbour_agreement(reference['vectors'], result['vectors'], args.k)
+        logger.info(f"{name:<12}{len(sentences) / result['total']:>10.1f}"
+                    f"{reference['total'] / result['total']:>9.2f}x"
+                    f"{np.percentile(batch_ms, 50):>10.1f}{np.percentile(batch_ms, 95):>10.1f}"
+                    f"{cosines.mean():>11.4f}{cosines.min():>10.4f}{agreement:>10.3f}")
+    logger.info("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
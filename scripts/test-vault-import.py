@@ -211,7 +211,7 @@ def import_vault_files(vault_path: str, file_paths: List[str], clear_db: bool =
             
             # Execute Cypher query
             db_start = time.time()
-            mm.run_update_query(res_queries)
+            mm.run_update_query(res_queries, vault_path)
             db_time = time.time() - db_start
             stats['db_time'] += db_time
             logger.info(f"  Executed in Memgraph ({format_time(db_time)})")